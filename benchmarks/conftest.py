@@ -0,0 +1,124 @@
+"""
+Бенчмарки: фикстура bench замеряет функцию, сравнивает лучшее время с базовой
+линией (baseline.json) и отмечает регрессию, если оно больше базового в
+threshold раз (лучшее из нескольких замеров устойчивее к шуму, чем медиана).
+
+    python -m pytest benchmarks -q                        # замер и сравнение
+    python -m pytest benchmarks -q --bench-save           # записать базовую линию
+    python -m pytest benchmarks -q --bench-threshold 2.0  # допуск регрессии
+
+Последние результаты всегда пишутся в benchmarks/results.json.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+RESULTS_PATH = Path(__file__).with_name("results.json")
+DEFAULT_THRESHOLD = 2.0  # на общих машинах разброс между запусками доходит до ×1.5
+MIN_ROUND_TIME = 0.05  # с; быстрые функции повторяются в замере до этого времени
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "бенчмарки плана")
+    group.addoption("--bench-save", action="store_true", help="записать результаты как базовую линию")
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=float(os.environ.get("BENCH_THRESHOLD", DEFAULT_THRESHOLD)),
+        help=f"допустимое замедление относительно базовой линии (по умолчанию {DEFAULT_THRESHOLD})",
+    )
+
+
+def _load_baseline() -> dict:
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text(encoding="utf-8")).get("benchmarks", {})
+    return {}
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    return _load_baseline()
+
+
+@pytest.fixture
+def bench(request, baseline):
+    """
+    bench(func, rounds=5, warmup=1, setup=None) -> медиана, с.
+    setup() вызывается перед каждым замером (не входит во время), его результат
+    передаётся в func. Быстрые функции без setup вызываются в одном замере
+    несколько раз (не меньше MIN_ROUND_TIME), время делится на число вызовов.
+    """
+    name = request.node.name
+    threshold = request.config.getoption("--bench-threshold")
+    save = request.config.getoption("--bench-save")
+
+    def run(func, rounds: int = 5, warmup: int = 1, setup=None):
+        elapsed = 0.0
+        number = 1  # вызовов func на один замер
+        for _ in range(warmup):
+            args = (setup(),) if setup else ()
+            t0 = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - t0
+        if setup is None and elapsed < MIN_ROUND_TIME:
+            # быстрые функции: несколько вызовов на замер, как в timeit.autorange
+            number = max(1, int(MIN_ROUND_TIME / max(elapsed, 1e-7)))
+            rounds = max(rounds, 10)
+        times = []
+        for _ in range(rounds):
+            args = (setup(),) if setup else ()
+            t0 = time.perf_counter()
+            for _ in range(number):
+                func(*args)
+            times.append((time.perf_counter() - t0) / number)
+        median, best = statistics.median(times), min(times)
+        _results[name] = {"median": median, "min": best, "rounds": rounds}
+
+        base = baseline.get(name)
+        if base and not save and best > base["min"] * threshold:
+            pytest.fail(
+                f"Регрессия {name}: лучшее время {best * 1000:.2f} мс, базовая линия "
+                f"{base['min'] * 1000:.2f} мс (допуск ×{threshold})"
+            )
+        return median
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    payload = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "benchmarks": dict(sorted(_results.items())),
+    }
+    RESULTS_PATH.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    if session.config.getoption("--bench-save"):
+        merged = {**_load_baseline(), **_results}
+        payload["benchmarks"] = dict(sorted(merged.items()))
+        BASELINE_PATH.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    base = _load_baseline()
+    terminalreporter.section("бенчмарки (лучшее / медиана)")
+    for name, r in sorted(_results.items()):
+        ref = base.get(name)
+        ratio = f"  ×{r['min'] / ref['min']:.2f} к базовой" if ref else ""
+        terminalreporter.write_line(f"{r['min'] * 1000:12.3f} / {r['median'] * 1000:10.3f} мс  {name}{ratio}")
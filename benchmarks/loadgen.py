@@ -0,0 +1,137 @@
+"""
+Генератор нагрузки для HTTP-сервиса планирования (planner.api).
+
+Поднимает сервис в отдельном процессе (или берёт готовый по --url) и шлёт
+пакеты планов с заданной конкурентностью; печатает планов/с, запросов/с и
+задержки. По умолчанию все планы разные (промахи кэшей); --repeat N —
+каждый пакет повторяется N раз (попадания в кэш ответов).
+
+    python -m benchmarks.loadgen --plans 20000 --batch 500 --concurrency 8
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --batch 1 --plans 2000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import orjson
+
+from benchmarks.synthetic import TASKS_PER_PLAN, plan_inputs
+
+
+def _request_body(inputs) -> bytes:
+    return orjson.dumps({"plans": [
+        {
+            "dzo_name": pi.dzo_name,
+            "info_date": pi.info_date,
+            "controls": [{"name": c.name, "dur": c.dur, "order": c.order} for c in pi.controls if c.enabled],
+        }
+        for pi in inputs
+    ]})
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, pool_workers: int | None) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "planner.api", "--port", str(port), "--workers", str(workers)]
+    if pool_workers is not None:
+        cmd += ["--pool-workers", str(pool_workers)]
+    return subprocess.Popen(cmd)
+
+
+async def _wait_ready(client, url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get(f"{url}/health")).status_code == 200:
+                return
+        except Exception:
+            if time.perf_counter() > deadline:
+                raise
+        await asyncio.sleep(0.2)
+
+
+async def run_load(url: str, bodies: list[bytes], batch: int, concurrency: int) -> dict:
+    import httpx
+
+    latencies = []
+    queue = list(reversed(bodies))
+    errors = 0
+
+    async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=concurrency)) as client:
+        await _wait_ready(client, url)
+
+        async def worker():
+            nonlocal errors
+            while queue:
+                body = queue.pop()
+                t0 = time.perf_counter()
+                r = await client.post(f"{url}/plans/batch", content=body,
+                                      headers={"content-type": "application/json"})
+                latencies.append(time.perf_counter() - t0)
+                if r.status_code != 200 or r.json()["errors"]:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "plans": len(latencies) * batch,
+        "errors": errors,
+        "elapsed": elapsed,
+        "plans_per_s": len(latencies) * batch / elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if len(latencies) > 1 else latencies[0] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузка на planner.api")
+    parser.add_argument("--url", default=None, help="адрес работающего сервиса (иначе поднимается локально)")
+    parser.add_argument("--plans", type=int, default=20_000, help="всего планов")
+    parser.add_argument("--batch", type=int, default=500, help="планов в запросе")
+    parser.add_argument("--concurrency", type=int, default=8, help="одновременных запросов")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз повторить каждый пакет")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессы uvicorn")
+    parser.add_argument("--pool-workers", type=int, default=0, help="пул процессов сервиса для крупных пакетов")
+    args = parser.parse_args(argv)
+
+    inputs = plan_inputs(args.plans * TASKS_PER_PLAN)[:args.plans]
+    bodies = [_request_body(inputs[i:i + args.batch]) for i in range(0, len(inputs), args.batch)] * args.repeat
+
+    server, url = None, args.url
+    if url is None:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.workers, args.pool_workers)
+    try:
+        result = asyncio.run(run_load(url, bodies, args.batch, args.concurrency))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(
+        f"Запросов: {result['requests']} (ошибок {result['errors']}), планов: {result['plans']} "
+        f"за {result['elapsed']:.2f} с -> {result['plans_per_s']:.0f} планов/с, "
+        f"{result['requests_per_s']:.1f} запросов/с; задержка p50 {result['p50_ms']:.1f} мс, "
+        f"p95 {result['p95_ms']:.1f} мс"
+    )
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
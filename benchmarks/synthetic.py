@@ -0,0 +1,69 @@
+"""
+Синтетические входы для бенчмарков: планы ДЗО, «склеенный» план на N задач
+и случайный граф задач.
+"""
+
+import dataclasses
+import random
+from datetime import date, timedelta
+
+from planner.catalog import get_catalog
+from planner.engine import ControlInput, PlanInput, schedule
+from planner.graph import FS, SS, TaskGraph
+
+CATALOG = get_catalog()
+TASKS_PER_PLAN = len(CATALOG)  # все контроли включены
+
+SIZES = {"13": 13, "1k": 1_000, "100k": 100_000}
+
+
+def plan_inputs(n_tasks: int, long: bool = False, seed: int = 0) -> list[PlanInput]:
+    """
+    Планы со всеми включёнными контролями — всего не меньше n_tasks задач.
+    long=True — длительности 20–250 раб. дн. (план на несколько лет).
+    """
+    rnd = random.Random(seed)
+    n_plans = -(-n_tasks // TASKS_PER_PLAN)
+    inputs = []
+    for i in range(n_plans):
+        info_date = date(2025, 1, 1) + timedelta(days=rnd.randrange(5 * 365))
+        controls = tuple(
+            ControlInput(
+                name,
+                enabled=True,
+                dur=rnd.randint(20, 250) if long else None,
+                order=(k + 1) if name in CATALOG.dzo else None,
+            )
+            for k, name in enumerate(CATALOG.input_controls)
+        )
+        inputs.append(PlanInput(f"ДЗО {i}", info_date, controls))
+    return inputs
+
+
+def merged_plan(n_tasks: int, long: bool = False):
+    """
+    Один Plan ровно на n_tasks задач (для выгрузки и диаграммы): задачи
+    нескольких планов с уникальными именами.
+    """
+    plans = [schedule(pi) for pi in plan_inputs(n_tasks, long)]
+    tasks = [
+        dataclasses.replace(t, name=f"{t.name} · {p.input.dzo_name}")
+        for p in plans
+        for t in p.tasks
+    ][:n_tasks]
+    return dataclasses.replace(plans[0], tasks=tuple(tasks))
+
+
+def random_graph(n_tasks: int, fan_in: int = 3, window: int = 200, seed: int = 0):
+    """
+    Случайный DAG: у каждой задачи до fan_in предшественников среди window
+    предыдущих, связи FS/SS с лагом 0–3. -> (граф, длительности)
+    """
+    rnd = random.Random(seed)
+    names = [f"t{i}" for i in range(n_tasks)]
+    edges = []
+    for i in range(1, n_tasks):
+        for j in {rnd.randrange(max(0, i - window), i) for _ in range(fan_in)}:
+            edges.append((names[j], names[i], rnd.choice((FS, SS)), rnd.randint(0, 3)))
+    durations = [rnd.randint(1, 60) for _ in range(n_tasks)]
+    return TaskGraph(names, edges), durations
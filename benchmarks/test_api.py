@@ -0,0 +1,45 @@
+"""
+HTTP-сервис (planner.api) в процессе, без сети: пакет из 500 разных планов
+(расчёт без кэшей) и тот же пакет повторно (ответ из кэша).
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+TestClient = pytest.importorskip("starlette.testclient").TestClient
+
+from benchmarks.loadgen import _request_body  # noqa: E402
+from benchmarks.synthetic import TASKS_PER_PLAN, plan_inputs  # noqa: E402
+from planner import api  # noqa: E402
+
+BATCH = 500
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(api.create_app(pool_workers=0)) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def body():
+    return _request_body(plan_inputs(BATCH * TASKS_PER_PLAN)[:BATCH])
+
+
+def _post(client, body):
+    r = client.post("/plans/batch", content=body, headers={"content-type": api.JSON_MIME})
+    assert r.status_code == 200 and not r.json()["errors"]
+
+
+def test_api_batch(bench, client, body):
+    def setup():
+        api.plan_cache.clear()
+        api.response_cache.clear()
+        return body
+
+    bench(lambda b: _post(client, b), rounds=5, setup=setup)
+
+
+def test_api_batch_cached(bench, client, body):
+    _post(client, body)
+    bench(lambda: _post(client, body))
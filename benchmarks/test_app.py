@@ -0,0 +1,58 @@
+"""
+Прогоны страницы main2.py без браузера (streamlit.testing): первый прогон,
+полный перезапуск после изменения контроля и расчёт результатов.
+"""
+
+from pathlib import Path
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+SCRIPT = str(Path(__file__).resolve().parent.parent / "main2.py")
+
+
+def _app():
+    return AppTest.from_file(SCRIPT, default_timeout=120)
+
+
+def test_app_first_run(bench):
+    def first_run(at):
+        at.run()
+        assert not at.exception
+
+    bench(first_run, rounds=5, setup=_app)
+
+
+def test_app_full_rerun_after_toggle(bench):
+    def setup():
+        at = _app()
+        at.run()
+        assert not at.exception
+        return at
+
+    def toggle(at):
+        at.checkbox[0].check()
+        at.run()
+        assert not at.exception
+
+    bench(toggle, rounds=5, setup=setup)
+
+
+def test_app_results_rerun(bench):
+    def setup():
+        at = _app()
+        at.run()
+        assert not at.exception
+        for cb in at.checkbox[:4]:
+            cb.check()
+        at.run()
+        assert not at.exception
+        return at
+
+    def calculate(at):
+        at.button[0].click()
+        at.run()
+        assert not at.exception
+
+    bench(calculate, rounds=5, setup=setup)
@@ -0,0 +1,41 @@
+"""
+Колоночная выгрузка портфеля на 100k задач: таблица Arrow из столбцов,
+запись Parquet/Arrow и обратное чтение (Arrow — через отображение в память).
+"""
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from benchmarks.synthetic import SIZES, plan_inputs  # noqa: E402
+from planner.columnar import (  # noqa: E402
+    COLUMNAR_FORMATS, append_run, read_arrow, read_run, schedule_table, table_bytes, timeline_from_table, write_arrow,
+)
+from planner.engine import schedule  # noqa: E402
+from planner.gantt import timeline_from_plans  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def timeline_100k():
+    return timeline_from_plans(schedule(pi) for pi in plan_inputs(SIZES["100k"]))
+
+
+def test_columnar_table(bench, timeline_100k):
+    bench(lambda: schedule_table(timeline_100k))
+
+
+@pytest.mark.parametrize("fmt", COLUMNAR_FORMATS)
+def test_columnar_write(bench, timeline_100k, fmt):
+    table = schedule_table(timeline_100k)
+    bench(lambda: table_bytes(table, fmt))
+
+
+def test_columnar_read_arrow(bench, timeline_100k, tmp_path):
+    path = str(tmp_path / "portfolio.arrow")
+    write_arrow(schedule_table(timeline_100k), path)
+    bench(lambda: timeline_from_table(read_arrow(path)))
+
+
+def test_columnar_read_run(bench, timeline_100k, tmp_path):
+    run = append_run(schedule_table(timeline_100k), str(tmp_path))
+    bench(lambda: timeline_from_table(read_run(run, str(tmp_path))))
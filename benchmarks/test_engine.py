@@ -0,0 +1,42 @@
+"""
+Расчёт плана: цепочка ДЗО, проверка в БИБ и отчет (engine.schedule),
+метод критического пути на больших графах и пакетный расчёт.
+"""
+
+import pytest
+
+from benchmarks.synthetic import SIZES, plan_inputs, random_graph
+from planner.batch import schedule_many
+from planner.engine import schedule
+from planner.graph import critical_path_method
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("long", [False, True], ids=["short", "long"])
+def test_schedule_plans(bench, size, long):
+    inputs = plan_inputs(SIZES[size], long=long)
+
+    def run():
+        for pi in inputs:
+            schedule(pi)
+
+    bench(run, rounds=3 if size == "100k" else 5)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_critical_path_graph(bench, size):
+    graph, durations = random_graph(SIZES[size])
+    bench(lambda: critical_path_method(graph, durations), rounds=3 if size == "100k" else 5)
+
+
+def test_incremental_reschedule(bench):
+    graph, durations = random_graph(SIZES["100k"])
+    previous = critical_path_method(graph, durations)
+    changed = list(durations)
+    changed[len(changed) // 2] += 5
+    bench(lambda: critical_path_method(graph, changed, previous=previous))
+
+
+def test_schedule_many_single_process(bench):
+    inputs = plan_inputs(SIZES["100k"])
+    bench(lambda: schedule_many(inputs, workers=1), rounds=3)
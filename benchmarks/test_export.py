@@ -0,0 +1,43 @@
+"""
+Выгрузка в Excel (xlsxwriter): книга одного плана, сводная книга пакета и
+книга-портфель; импорт выгруженной книги.
+"""
+
+import io
+
+import pytest
+
+from benchmarks.synthetic import SIZES, plan_inputs
+from planner.batch import schedule_many, write_result
+from planner.engine import schedule
+from planner.export import PlanMeta, build_plan_workbook, write_portfolio
+from planner.importer import read_plan_workbook
+
+
+@pytest.mark.parametrize("long", [False, True], ids=["short", "long"])
+def test_plan_workbook(bench, long):
+    # Книга одного плана — 13 задач; большие объёмы — в сводной книге пакета
+    plan = schedule(plan_inputs(SIZES["13"], long=long)[0])
+    meta = PlanMeta(plan.input.dzo_name, plan.input.info_date, "Цели", "Объекты", "Иванов И.И., пентестер", "")
+    bench(lambda: build_plan_workbook(plan, meta))
+
+
+@pytest.mark.parametrize("size", ["1k", "100k"])
+def test_batch_workbook(bench, size):
+    result = schedule_many(plan_inputs(SIZES[size]), workers=1)
+    bench(lambda: write_result(result), rounds=3 if size == "100k" else 5)
+
+
+def test_portfolio_workbook(bench, tmp_path):
+    # Книга-портфель пишется потоково в файл, лист на каждый план: 1k задач — 77 листов
+    # (5k ДЗО — около 25 с, для набора бенчмарков долго; см. python -m planner.batch --portfolio)
+    plans = [schedule(pi) for pi in plan_inputs(SIZES["1k"])]
+    target = tmp_path / "portfolio.xlsx"
+    bench(lambda: write_portfolio(plans, str(target)), rounds=3)
+
+
+def test_import_workbook(bench):
+    # Обратная операция: разбор выгруженной книги и восстановление входа плана
+    plan = schedule(plan_inputs(SIZES["13"])[0])
+    data = build_plan_workbook(plan, PlanMeta(plan.input.dzo_name, plan.input.info_date))
+    bench(lambda: read_plan_workbook(io.BytesIO(data)))
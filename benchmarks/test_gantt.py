@@ -0,0 +1,40 @@
+"""
+Построение диаграммы Ганта (plotly) и её сериализация в JSON для браузера;
+диаграмма портфеля на 50k задач; статичные SVG/PNG для 20 планов.
+"""
+
+import pytest
+
+from benchmarks.synthetic import SIZES, merged_plan, plan_inputs
+from planner.engine import schedule
+from planner.gantt import build_gantt_figure, build_timeline_figure, timeline_from_plans
+from planner.render import gantt_png, gantt_svg
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_gantt_figure(bench, size):
+    plan = merged_plan(SIZES[size])
+    bench(lambda: build_gantt_figure(plan), rounds=3 if size == "100k" else 5)
+
+
+@pytest.mark.parametrize("size", ["13", "1k"])
+def test_gantt_to_json(bench, size):
+    fig = build_gantt_figure(merged_plan(SIZES[size]))
+    bench(fig.to_json)
+
+
+@pytest.fixture(scope="module")
+def timeline_50k():
+    return timeline_from_plans(schedule(pi) for pi in plan_inputs(50_000))
+
+
+def test_timeline_figure(bench, timeline_50k):
+    bench(lambda: build_timeline_figure(timeline_50k).to_json())
+
+
+@pytest.mark.parametrize("fmt", ["svg", "png"])
+def test_gantt_render(bench, fmt):
+    plans = [schedule(pi) for pi in plan_inputs(13 * 20)]
+    render = gantt_svg if fmt == "svg" else gantt_png
+    render(plans[0])
+    bench(lambda: [render(p) for p in plans], rounds=3)
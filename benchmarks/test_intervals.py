@@ -0,0 +1,40 @@
+"""
+Интервальный индекс на 1M задач (≈77k планов за пять лет): точечный запрос,
+пересечения задач команды с периодом задачи и замена задач одного плана.
+"""
+
+import numpy as np
+import pytest
+
+from planner.intervals import IntervalIndex
+
+N_INTERVALS = 1_000_000
+N_PLANS = -(-N_INTERVALS // 13)
+DAY0 = 739_252      # 01.01.2025 (date.toordinal)
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    plan = np.repeat(np.arange(N_PLANS), 13)[:N_INTERVALS]
+    start = (DAY0 + rng.integers(0, 5 * 365, N_INTERVALS)).astype(np.int32)
+    length = np.minimum(rng.geometric(1 / 12, N_INTERVALS), 400).astype(np.int32)
+    ix = IntervalIndex()
+    ix.add(plan, rng.integers(0, 13, N_INTERVALS), rng.integers(0, 3, N_INTERVALS), start, start + length - 1)
+    return ix
+
+
+def test_interval_stabbing(bench, index):
+    bench(lambda: index.stabbing(DAY0 + 400, team=1))
+
+
+def test_interval_conflicts(bench, index):
+    bench(lambda: index.overlapping(DAY0 + 400, DAY0 + 409, team=1, exclude_plan=5))
+
+
+def test_interval_replace_plan(bench, index):
+    def replace():
+        index.remove_plan(7)
+        index.add(np.full(13, 7), np.arange(13), np.ones(13), np.full(13, DAY0 + 100), np.full(13, DAY0 + 120))
+
+    bench(replace)
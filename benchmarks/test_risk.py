@@ -0,0 +1,18 @@
+"""
+Риск сроков плана (planner.risk): 100 тыс. сэмплов длительностей всех
+контролей справочника одним векторным проходом по графу задач.
+"""
+
+from datetime import date
+
+from planner.catalog import get_catalog
+from planner.engine import ControlInput, PlanInput
+from planner.risk import RISK_SAMPLES, simulate
+
+
+def test_risk_simulate(bench):
+    catalog = get_catalog()
+    pi = PlanInput("ДЗО", date(2026, 3, 2), tuple(ControlInput(n, True) for n in catalog.input_controls))
+    result = simulate(pi)
+    assert len(result) == RISK_SAMPLES and result.percentile(50) <= result.percentile(95)
+    bench(lambda: simulate(pi))
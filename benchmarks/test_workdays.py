@@ -0,0 +1,85 @@
+"""
+Арифметика рабочих дней: end_date_by_workdays и next_workday; даты окончания
+на майских и новогодних праздниках закреплены отдельным тестом.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from planner.workdays import CalendarCoverageWarning, end_date_by_workdays, get_calendar, next_workday
+
+CALLS = {"13": 13, "1k": 1_000, "100k": 100_000}
+
+# (начало, раб. дней, окончание) — через майские и новогодние праздники
+HOLIDAY_END_DATES = [
+    (date(2025, 4, 28), 5, date(2025, 5, 6)),
+    (date(2026, 4, 29), 5, date(2026, 5, 6)),
+    (date(2027, 4, 28), 5, date(2027, 5, 5)),
+    (date(2025, 12, 29), 3, date(2026, 1, 12)),
+    (date(2026, 12, 28), 5, date(2027, 1, 12)),
+]
+
+
+def _dates(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    return [date(2024, 1, 1) + timedelta(days=rnd.randrange(6 * 365)) for _ in range(n)]
+
+
+@pytest.mark.parametrize("size", CALLS)
+def test_end_date_by_workdays(bench, size):
+    days = _dates(CALLS[size])
+    durations = [random.Random(1).randint(1, 250) for _ in days]
+    get_calendar()
+
+    def run():
+        for d, n in zip(days, durations):
+            end_date_by_workdays(d, n)
+
+    bench(run)
+
+
+@pytest.mark.parametrize("size", CALLS)
+def test_next_workday(bench, size):
+    days = _dates(CALLS[size])
+    get_calendar()
+
+    def run():
+        for d in days:
+            next_workday(d)
+
+    bench(run)
+
+
+def test_end_date_long_durations(bench):
+    # Длительности до ~10 лет: время не должно зависеть от длины интервала
+    days = _dates(10_000)
+    get_calendar()
+
+    def run():
+        for i, d in enumerate(days):
+            end_date_by_workdays(d, 500 + (i % 2000))
+
+    bench(run)
+
+
+def test_calendar_build(bench):
+    from planner.workdays import WorkCalendar
+
+    cal = get_calendar()
+    bench(lambda: WorkCalendar(holidays=cal.holidays, workdays=cal.workdays), rounds=3)
+
+
+@pytest.mark.parametrize("start, n, end", HOLIDAY_END_DATES, ids=lambda v: str(v))
+def test_holiday_end_dates(start, n, end):
+    assert end_date_by_workdays(start, n) == end
+
+
+def test_uncovered_year_warns():
+    from planner.workdays import WorkCalendar
+
+    cal = WorkCalendar(covered_years=(2023, 2027))
+    assert cal.covers(date(2027, 12, 31)) and not cal.covers(date(2028, 1, 1))
+    with pytest.warns(CalendarCoverageWarning):
+        cal.end_date_by_workdays(date(2027, 12, 27), 10)
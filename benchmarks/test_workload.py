@@ -0,0 +1,27 @@
+"""
+Загрузка портфеля по рабочим дням: агрегация 100k интервалов разностными
+массивами и календарь-тепловая карта года.
+"""
+
+from datetime import date
+
+import pytest
+
+from benchmarks.synthetic import SIZES, plan_inputs
+from planner.engine import schedule
+from planner.gantt import timeline_from_plans
+from planner.workload import build_workload_heatmap, workload
+
+
+@pytest.fixture(scope="module")
+def timeline_100k():
+    return timeline_from_plans(schedule(pi) for pi in plan_inputs(SIZES["100k"]))
+
+
+def test_workload_aggregate(bench, timeline_100k):
+    bench(lambda: workload(timeline_100k))
+
+
+def test_workload_heatmap(bench, timeline_100k):
+    load = workload(timeline_100k, (date(2026, 1, 1), date(2026, 12, 31)))
+    bench(lambda: build_workload_heatmap(load).to_json())
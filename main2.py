@@ -1,16 +1,76 @@
 import streamlit as st
-import pandas as pd
-from datetime import date, timedelta
-import plotly.express as px
-from io import BytesIO
+from datetime import date
+import functools
+import io
+import os
+import sqlite3
+import uuid
 import warnings 
 
+from planner.catalog import PIB_NAME, REPORT_NAME, TEAM_PENTEST, catalog_error, get_catalog
+from planner.batch import (
+    plan_inputs_from_frame, read_table, run_batch, table_fingerprint, template_csv, write_portfolio_book,
+    write_result,
+)
+from planner.cache import figure_cache, fingerprint, risk_cache, schedule_cache, workbook_cache
+from planner.columnar import (
+    COLUMNAR_FORMATS, COLUMNAR_MIME, append_run, list_runs, read_run, schedule_table, stored_schedule_table,
+    table_bytes, timeline_from_table,
+)
+from planner.engine import MAX_CONTROL_VALUE, ControlInput, schedule, validate_controls
+from planner.export import EXCEL_MIME, PlanMeta, build_plan_workbook
+from planner.gantt import build_gantt_figure, build_timeline_figure, schedule_frame, timeline_data
+from planner.importer import batch_frame, import_workbooks, read_plan_workbook, save_imported
+from planner.intervals import get_task_index
+from planner.jobs import get_job_queue, read_artifact
+from planner.render import gantt_png, gantt_svg
+from planner.repository import STATUSES, get_repository
+from planner.resources import level_plans, leveling_frames, parse_roster, team_capacity
+from planner.risk import RISK_PERCENTILES, duration_ranges, simulate
+from planner.scenarios import DEFAULT_MULTIPLIERS, sweep
+from planner.state import PlanState
+from planner.workdays import get_calendar
+from planner.workload import WORKLOAD_METRICS, build_workload_heatmap, clicked_day, day_frame, workload
+from planner.profiler import NullProfiler, SessionProfiler, instrument_mapping
+
 
 warnings.filterwarnings('ignore')
 
 # --- НАСТРОЙКА СТРАНИЦЫ ---
 st.set_page_config(page_title="План проведения контроля ИБ", layout="wide")
 
+
+# --- ПРОФИЛИРОВАНИЕ (ПО ЗАПРОСУ) ---
+# Включается переменной окружения PLAN_PROFILE=1 или параметром страницы ?profile=1.
+# Замеры — в боковой панели и в JSON-логе PLAN_PROFILE_LOG (по умолчанию profile_log.jsonl).
+
+def get_profiler():
+    if os.environ.get("PLAN_PROFILE") != "1" and st.query_params.get("profile") != "1":
+        return NullProfiler()
+    if "_profiler" not in st.session_state:
+        instrument_mapping(type(st.session_state))
+        st.session_state["_profiler"] = SessionProfiler(
+            uuid.uuid4().hex[:12], os.environ.get("PLAN_PROFILE_LOG", "profile_log.jsonl")
+        )
+    return st.session_state["_profiler"]
+
+
+def profiled(name: str):
+    """
+    Замер фрагмента: при собственном перезапуске — отдельный прогон, внутри полного — секция.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.run(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+profiler = get_profiler()
+profiler.begin_run("script")
+
 # --- CSS СТИЛИ ---
 st.markdown(
     """
@@ -29,6 +89,225 @@ st.markdown(
 
 st.title("План проведения контроля ИБ")
 
+# --- СПРАВОЧНИК КОНТРОЛЕЙ ---
+# Общий для всех сессий; правка planner/data/controls.json подхватывается
+# при следующем прогоне без перезапуска сервера.
+catalog = get_catalog()
+if catalog_error():
+    st.warning(f"Справочник контролей не обновлён, действует прежняя версия. {catalog_error()}")
+
+
+# --- СОСТОЯНИЕ ПЛАНА СЕССИИ ---
+# Настройки контролей хранятся в одном объекте PlanState (planner/state.py).
+# Виджеты строк привязаны к нему через bound_widget: значение берётся из
+# состояния, изменение записывается в него колбэком.
+
+def plan_state() -> PlanState:
+    state = st.session_state.get("plan_state")
+    if state is not None and state.catalog is catalog:
+        return state
+    state = PlanState(catalog) if state is None else state.for_catalog(catalog)
+    st.session_state["plan_state"] = state
+    return state
+
+
+def on_bound_change(key: str, name: str, field: str):
+    plan_state().set(name, field, st.session_state[key])
+    rerun_dependents("planning")
+
+
+def bound_widget(widget, field: str, name: str, default=None, **kwargs):
+    """
+    Виджет поля field контроля name. Если значение в состоянии не задано
+    (старт по правилам), показывается default, и ключ виджета зависит от него:
+    при новом значении по правилам виджет пересоздаётся.
+    """
+    state = plan_state()
+    value = state.get(name, field)
+    key = f"{field}:{state.version}:{state.index[name]}"
+    if value is None:
+        value = default
+        key += f":{default}"
+    return widget(value=value, key=key, on_change=on_bound_change, args=(key, name, field), **kwargs)
+
+
+def current_plan(dzo_name: str, info_date: date):
+    """
+    (план, отпечаток входа) по текущему состоянию формы. Одинаковые входы
+    (в т.ч. из других сессий и других фрагментов этого прогона) берутся из кэша.
+    Новый план считается от предыдущего плана сессии: пересчитываются только
+    изменившиеся задачи и их последователи.
+    """
+    plan_input = plan_state().plan_input(dzo_name, info_date)
+    plan_fp = fingerprint(catalog.fingerprint, plan_input)
+    previous = st.session_state.get("last_plan")
+    def compute():
+        with profiler.section("plan.schedule"):
+            return schedule(plan_input, previous=previous, catalog=catalog)
+
+    plan = schedule_cache.get_or_create(plan_fp, compute)
+    st.session_state["last_plan"] = plan
+    return plan, plan_fp
+
+
+# --- ФРАГМЕНТЫ СТРАНИЦЫ И ИХ ЗАВИСИМОСТИ ---
+# Каждый блок — отдельный фрагмент: правка виджета перезапускает только
+# фрагменты, зависящие от изменённых данных, а не весь скрипт.
+#   planning    — таблицы контролей ДЗО и инструментальных проверок (виджеты строк)
+#   info_report — проверка в Блоке ИБ и отчет (зависит от строк)
+#   results     — таблица этапов, выгрузка и диаграмма (зависит от строк и кнопки расчёта)
+#   badge       — итоговая дата в шапке (зависит от строк и кнопки расчёта)
+#   meta        — цели, объекты и состав группы (влияют только на выгрузку в results)
+FRAGMENT_DEPENDENTS = {
+    "planning": ["planning", "info_report", "results", "badge", "scenarios"],
+    "results": ["results", "badge"],
+    "meta": ["results"],
+}
+
+
+def rerun_dependents(source: str):
+    """
+    Колбэк виджета: перезапуск фрагментов, зависящих от источника изменения.
+    """
+    st.rerun(FRAGMENT_DEPENDENTS[source])
+
+
+def risk_ranges(plan) -> dict:
+    """
+    Таблица диапазонов длительностей включённых контролей: по умолчанию — из
+    справочника, правки хранятся в сессии. -> {имя: (мин, вер., макс)} для
+    контролей с ненулевым диапазоном.
+    """
+    defaults = duration_ranges(plan.input)
+    overrides = st.session_state.setdefault("risk_overrides", {})
+    rows = []
+    for t in plan.tasks:
+        if t.name in (PIB_NAME, REPORT_NAME):
+            continue
+        lo, _, hi = defaults.get(t.name, (t.duration, t.duration, t.duration))
+        lo, hi = overrides.get(t.name, (lo, hi))
+        rows.append({"Контроль": t.name, "Мин": min(lo, t.duration), "Вер.": t.duration, "Макс": max(hi, t.duration)})
+
+    edited = st.data_editor(
+        rows,
+        # Строки таблицы — включённые контроли: при смене набора — новая таблица
+        key="risk_ranges_" + fingerprint(tuple(r["Контроль"] for r in rows)),
+        disabled=("Контроль", "Вер."),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Мин": st.column_config.NumberColumn(min_value=1, step=1),
+            "Макс": st.column_config.NumberColumn(min_value=1, step=1),
+        },
+    )
+
+    ranges = {}
+    for row in edited:
+        name, likely = row["Контроль"], row["Вер."]
+        lo, _, hi = defaults.get(name, (likely, likely, likely))
+        lo = min(int(row["Мин"] or lo), likely)
+        hi = max(int(row["Макс"] or hi), likely)
+        if (lo, likely, hi) == defaults.get(name, (likely, likely, likely)):
+            overrides.pop(name, None)
+        else:
+            overrides[name] = (lo, hi)
+        if lo < hi:
+            ranges[name] = (lo, likely, hi)
+    return ranges
+
+
+def schedule_risk(plan, plan_fp: str):
+    """
+    Риск сроков рядом с итоговой датой: P50/P80/P95 по 100 тыс. сэмплов плана
+    (planner.risk.simulate) и контроли, чаще всего определяющие окончание.
+    Оценка считается только при открытом popover (его открытие перезапускает
+    фрагмент), правки диапазонов хранятся в сессии и при закрытом.
+    """
+    summary = st.empty()
+    popover = st.popover("Риск сроков", use_container_width=True, key="risk_open", on_change="rerun")
+    if not popover.open:
+        return
+    with popover:
+        results = st.container()
+        st.markdown("**Диапазоны длительностей, раб. дн**")
+        ranges = risk_ranges(plan)
+
+    if not ranges:
+        summary.caption("Диапазоны длительностей не заданы — риск сроков не оценивается.")
+        return
+    try:
+        risk = risk_cache.get_or_create(fingerprint(plan_fp, ranges), lambda: simulate(plan.input, ranges))
+    except ValueError as e:
+        results.error(str(e))
+        return
+
+    percentiles = risk.percentiles()
+    summary.caption(" · ".join(f"P{p}: {d.strftime('%d.%m.%Y')}" for p, d in percentiles.items()))
+    with results:
+        cols = st.columns(len(RISK_PERCENTILES))
+        for col, (p, d) in zip(cols, percentiles.items()):
+            col.metric(f"P{p}", d.strftime("%d.%m.%Y"))
+        samples = f"{len(risk):,}".replace(",", " ")
+        st.caption(
+            f"Вероятность завершить к {plan.overall_end.strftime('%d.%m.%Y')}: "
+            f"{risk.probability(plan.overall_end):.0%}. Сэмплов: {samples}, расчёт {risk.elapsed * 1000:.0f} мс."
+        )
+        st.bar_chart(risk.distribution(), height=200)
+        st.markdown("**Что определяет окончание**")
+        st.dataframe(risk.drivers_frame(), use_container_width=True, hide_index=True)
+
+
+@st.fragment(key="badge")
+@profiled("badge")
+def overall_end_badge(dzo_name: str, info_date: date):
+    plan, plan_fp = current_plan(dzo_name, info_date)
+    overall_end = plan.overall_end if st.session_state.get("plan_ready") else None
+
+    if overall_end:
+        # Есть итоговая дата – окрашенный блок
+        st.markdown(
+            f"""
+            <div style="
+                display:flex;
+                align-items:center;
+                margin-top:28px;
+                justify-content:center;
+                height: 40px;
+                border-radius: 8px;
+                background-color:#fff7e6;
+                border:1px solid #fa8c16;
+                font-size:14px;
+                font-weight:600;
+                color:#d46b08;
+            ">
+                Планируемая дата завершения: {overall_end.strftime('%d.%m.%Y')}
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+        schedule_risk(plan, plan_fp)
+    else:
+        # Даты нет — серая заглушка
+        st.markdown(
+            f"""
+            <div style="
+                display:flex;
+                align-items:center;
+                margin-top:28px;
+                justify-content:center;
+                height: 40px;
+                border-radius: 8px;
+                background-color:#f5f5f5;
+                border:1px dashed #bfbfbf;
+                font-size:14px;
+                color:#8c8c8c;
+            ">
+                Итоговая дата не рассчитана
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+
 
 # --- 1. ОБЩИЕ СВЕДЕНИЯ ---
 st.markdown('<div class="header-box">Общие сведения</div>', unsafe_allow_html=True)
@@ -36,138 +315,55 @@ with st.container():
     st.markdown('<div class="form-row">', unsafe_allow_html=True)
     c1, c2, c3 = st.columns([2, 1, 1])
     with c1:
-        dzo_name = st.text_input("**Название ДЗО**", placeholder="Введите название...")
+        dzo_name = st.text_input("**Название ДЗО**", placeholder="Введите название...", key="dzo_name")
     with c2:
-        # Эта дата влияет на общий план и старт ряда активностей
-        info_date = st.date_input("**Дата начала контроля ИБ**", value=date.today())
+        # Эта дата влияет на общий план и старт ряда активностей;
+        # значение — через session_state, чтобы его мог задать план из хранилища
+        st.session_state.setdefault("info_date", date.today())
+        info_date = st.date_input("**Дата начала контроля ИБ**", key="info_date")
     with c3:
-        overall_end = st.session_state.get("overall_end_date")
-
-        if overall_end:
-            # Есть итоговая дата – окрашенный блок
-            st.markdown(
-                f"""
-                <div style="
-                    display:flex;
-                    align-items:center;
-                    margin-top:28px;
-                    justify-content:center;
-                    height: 40px;
-                    border-radius: 8px;
-                    background-color:#fff7e6;
-                    border:1px solid #fa8c16;
-                    font-size:14px;
-                    font-weight:600;
-                    color:#d46b08;
-                ">
-                    Планируемая дата завершения: {overall_end.strftime('%d.%m.%Y')}
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-        else:
-            # Даты нет — серая заглушка
-            st.markdown(
-                f"""
-                <div style="
-                    display:flex;
-                    align-items:center;
-                    margin-top:28px;
-                    justify-content:center;
-                    height: 40px;
-                    border-radius: 8px;
-                    background-color:#f5f5f5;
-                    border:1px dashed #bfbfbf;
-                    font-size:14px;
-                    color:#8c8c8c;
-                ">
-                    Итоговая дата не рассчитана
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
+        overall_end_badge(dzo_name, info_date)
 
     with st.container():
         c1, c2 = st.columns(2)
         with c1:
-            goals = st.text_area("**Цели и задачи контроля ИБ**", height=100)
+            st.text_area(
+                "**Цели и задачи контроля ИБ**", height=100, key="goals", on_change=rerun_dependents, args=("meta",)
+            )
         with c2:
-            objects = st.text_area("**Объекты контроля ИБ**", height=80)
+            st.text_area(
+                "**Объекты контроля ИБ**", height=80, key="objects", on_change=rerun_dependents, args=("meta",)
+            )
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Визуальный разделитель между блоками
 st.markdown("<br>", unsafe_allow_html=True)
 
 # --- 2. СОСТАВ ГРУППЫ ---
+ROSTER_HELP = (
+    "По участнику в строке: «ФИО, должность». Пентестеры и аналитики ИБ учитываются "
+    "при выравнивании загрузки; число через «;» в конце строки — сколько проверок "
+    "участник ведёт одновременно (по умолчанию 1)."
+)
+
 st.markdown('<div class="header-box">Состав группы контроля ИБ</div>', unsafe_allow_html=True)
 with st.container():
     st.markdown('<div class="form-row">', unsafe_allow_html=True)
     col_g1, col_g2 = st.columns(2)
     with col_g1:
-        group_rt = st.text_area("**ФИО, должности (Ростелеком)**", height=120)
+        st.text_area(
+            "**ФИО, должности (Ростелеком)**", height=120, key="group_rt", on_change=rerun_dependents, args=("meta",),
+            help=ROSTER_HELP,
+        )
     with col_g2:
-        group_dzo = st.text_area("**ФИО, должности (ДЗО)**", height=120)
+        st.text_area(
+            "**ФИО, должности (ДЗО)**", height=120, key="group_dzo", on_change=rerun_dependents, args=("meta",)
+        )
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Ещё один визуальный разделитель
 st.markdown("<br>", unsafe_allow_html=True)
 
-# --- БАЗА ДАННЫХ КОНТРОЛЕЙ ---
-CONTROLS_DB = {
-    "Визитка": {"cat": "Опросные листы", "dur": 5},
-    "Индекс КБ": {"cat": "Опросные листы", "dur": 5},
-    "Комплаенс 152-ФЗ": {"cat": "Опросные листы", "dur": 3},
-    "Комплаенс 187-ФЗ": {"cat": "Опросные листы", "dur": 3},
-    "Комплаенс ГИС": {"cat": "Опросные листы", "dur": 2},
-    "КТ, Лицензирование": {"cat": "Опросные листы", "dur": 2},
-    "Безопасная разработка ПО": {"cat": "Опросные листы", "dur": 5},
-    "Защищенность среды виртуализации": {"cat": "Опросные листы", "dur": 5},
-    '"Здоровье AD"': {"cat": "Инструментальные проверки", "dur": 5},
-    "Сканирование уязвимостей внутренней сети": {"cat": "Инструментальные проверки", "dur": 20},
-    "Внутренний пентест": {"cat": "Инструментальные проверки", "dur": 20},
-    "Проверка информации в Блоке ИБ": {"cat": "Информация и отчет", "dur": 5},  # будет пересчитана
-    "Подготовка и согласование Отчета": {"cat": "Информация и отчет", "dur": 1},
-}
-
-# Порядок контролей для экспорта и графика
-CONTROLS_ORDER = list(CONTROLS_DB.keys())
-
-
-def key_base_from_name(name: str) -> str:
-    return name.replace(" ", "_").replace('"', "")
-
-
-# --- РАБОТА С РАБОЧИМИ ДНЯМИ ---
-
-def end_date_by_workdays(start: date, duration_workdays: int) -> date:
-    """
-    Возвращает дату окончания при заданном количестве рабочих дней (понедельник–пятница),
-    считая start включительно.
-    Выходные (сб/вс) пропускаются, но могут попадать в календарный интервал.
-    """
-    if duration_workdays <= 0:
-        return start
-    current = start
-    remaining = duration_workdays
-    while True:
-        if current.weekday() < 5:  # 0-4 = пн-пт
-            remaining -= 1
-            if remaining == 0:
-                return current
-        current += timedelta(days=1)
-
-
-def next_workday(d: date) -> date:
-    """
-    Возвращает следующий рабочий день после даты d.
-    """
-    current = d + timedelta(days=1)
-    while current.weekday() >= 5:
-        current += timedelta(days=1)
-    return current
-
-
 # --- ХЕЛПЕР ДЛЯ ЗАГОЛОВКА ТАБЛИЦЫ ---
 def render_table_header(with_order: bool = False):
     if with_order:
@@ -183,25 +379,38 @@ def render_table_header(with_order: bool = False):
     st.markdown("<hr style='margin: 5px 0 15px 0;'>", unsafe_allow_html=True)
 
 
-# --- РЕНДЕР НЕЗАВИСИМОГО КОНТРОЛЯ ---
-def render_control_row_independent(name, default_start: date, with_order: bool = False):
-    props = CONTROLS_DB[name]
-    default_dur = props["dur"]
-    kb = key_base_from_name(name)
+# --- ПЕРЕСЕЧЕНИЯ С ХРАНИМЫМИ ПЛАНАМИ ---
+# Задачи команд Ростелеком (пентест и др.) сверяются с задачами тех же команд
+# в сохранённых планах по интервальному индексу (planner/intervals.py).
+MAX_CONFLICTS_SHOWN = 10
+
+
+def stored_conflicts(plan) -> dict:
+    """
+    {задача: [задачи той же команды в других хранимых планах в те же даты]}.
+    Индекс хранилища строится только при включённом «Работать с хранилищем».
+    """
+    if not st.session_state.get("repo_on"):
+        return {}
+    try:
+        index = get_task_index(get_repository())
+    except (sqlite3.Error, ValueError):
+        return {}
+    loaded = st.session_state.get("loaded_plan")
+    with profiler.section("plan.conflicts"):
+        return index.conflicts(
+            plan, lambda name: catalog[name].team if name in catalog else None,
+            exclude_plan=loaded[0] if loaded else None,
+        )
 
-    # гарантируем наличие длительности
-    if f"{kb}_dur" not in st.session_state:
-        st.session_state[f"{kb}_dur"] = default_dur
 
+# --- РЕНДЕР НЕЗАВИСИМОГО КОНТРОЛЯ ---
+def render_control_row_independent(name, default_start: date, task=None, with_order: bool = False, conflicts=()):
     if with_order:
         c0, c1, c2, c3, c4, c5 = st.columns([0.4, 3, 1, 2, 1.5, 2])
-        order_key = f"{kb}_order"
         with c0:
-            st.number_input(
-                "№",
-                min_value=1,
-                value=st.session_state.get(order_key, 1),
-                key=order_key,
+            bound_widget(
+                st.number_input, "order", name, label="№", min_value=1, max_value=MAX_CONTROL_VALUE,
                 label_visibility="collapsed",
             )
     else:
@@ -209,41 +418,34 @@ def render_control_row_independent(name, default_start: date, with_order: bool =
 
     with c1:
         st.write(f"**{name}**")
+        if conflicts and task is not None:
+            st.caption(
+                f"⚠️ Команда «{conflicts[0].team}» в эти даты занята в других планах: {len(conflicts)}",
+                help="  \n".join(
+                    f"№{c.plan_id} {c.dzo_name} — {c.task}, {c.start:%d.%m.%Y}–{c.end:%d.%m.%Y}"
+                    for c in conflicts[:MAX_CONFLICTS_SHOWN]
+                ) + (" и др." if len(conflicts) > MAX_CONFLICTS_SHOWN else ""),
+            )
 
     with c2:
-        is_checked = st.checkbox("ДА", key=f"{kb}_check", label_visibility="collapsed")
+        is_checked = bound_widget(st.checkbox, "check", name, label="ДА", label_visibility="collapsed")
 
     if is_checked:
         with c3:
-            start_val = st.session_state.get(f"{kb}_start", default_start)
-            start_val = st.date_input(
-                "Start",
-                value=start_val,
-                key=f"{kb}_start",
-                label_visibility="collapsed",
+            start_val = bound_widget(
+                st.date_input, "start", name, default=default_start, label="Start", label_visibility="collapsed"
             )
 
         with c4:
-            dur_val = st.number_input(
-                "Dur",
-                min_value=1,
-                value=st.session_state.get(f"{kb}_dur", default_dur),
-                key=f"{kb}_dur",
+            bound_widget(
+                st.number_input, "dur", name, label="Dur", min_value=1, max_value=MAX_CONTROL_VALUE,
                 label_visibility="collapsed",
             )
 
-        # рассчитываем дату окончания по рабочим дням
-        end_val = end_date_by_workdays(start_val, int(dur_val))
-        st.session_state[f"{kb}_end"] = end_val
-
+        # дата окончания — из рассчитанного плана (только показ, в состоянии не хранится)
+        end_val = task.end if task is not None else start_val
         with c5:
-            st.date_input(
-                "End",
-                value=end_val,
-                key=f"{kb}_end",
-                label_visibility="collapsed",
-                disabled=True,
-            )
+            st.write(end_val.strftime("%d.%m.%Y"))
     else:
         with c3:
             st.write("-")
@@ -255,413 +457,953 @@ def render_control_row_independent(name, default_start: date, with_order: bool =
     st.markdown("<hr style='margin: 5px 0; border-top: 1px dashed #eee;'>", unsafe_allow_html=True)
 
 
-# --- ВЫЧИСЛЕНИЕ БЛОКА "ПРОВЕРКА ИНФОРМАЦИИ В БЛОКЕ ИБ" + "ОТЧЕТ" ---
+# --- РЕЖИМ ТАБЛИЦЫ-РЕДАКТОРА ---
+# Альтернатива строкам виджетов: один st.data_editor на блок. Правка приходит
+# одним изменением таблицы и пишется в то же состояние PlanState.
 
-def compute_info_and_report(dzo_controls_sorted, instrumental_core):
-    """
-    1. Суммируем длительности (в рабочих днях) всех включённых контролей ДЗО.
-    2. Суммируем длительности выбранных инструментальных проверок (ядро).
-    3. Длительность проверки в Блоке ИБ = max(∑ ДЗО, ∑ БИБ) + 5 раб. дн.
-    4. Старт проверки = дата окончания первого (по порядку) выбранного контроля ДЗО.
-       Если ни один контроль ДЗО не выбран — fallback к info_date.
-    5. Окончание проверки считаем по рабочим дням.
-    6. Отчет стартует в следующий рабочий день после окончания проверки и длится 1 рабочий день.
-    Всё сохраняем в session_state.
-    """
-    # 1. Суммарная длительность блоков ДЗО
-    total_dzo_dur = 0
-    for name, props in CONTROLS_DB.items():
-        if props["cat"] == "Опросные листы":
-            kb = key_base_from_name(name)
-            if st.session_state.get(f"{kb}_check", False):
-                dur = int(st.session_state.get(f"{kb}_dur", props["dur"]))
-                total_dzo_dur += dur
-
-    # 2. Суммарная длительность инструмента
-    total_instr_dur = 0
-    for name in instrumental_core:
-        props = CONTROLS_DB[name]
-        kb = key_base_from_name(name)
-        if st.session_state.get(f"{kb}_check", False):
-            dur = int(st.session_state.get(f"{kb}_dur", props["dur"]))
-            total_instr_dur += dur
-
-    # 3. Длительность проверки в БИБ
-    pib_name = "Проверка информации в Блоке ИБ"
-    pib_kb = key_base_from_name(pib_name)
-
-    pib_dur = max(total_dzo_dur, total_instr_dur) + 5
-
-    # 4. Старт проверки — от даты окончания первого по порядку выбранного ДЗО
-    first_dzo_end = None
-    for name in dzo_controls_sorted:
-        kb = key_base_from_name(name)
-        if st.session_state.get(f"{kb}_check", False):
-            first_dzo_end = st.session_state.get(f"{kb}_end")
-            break
-
-    if first_dzo_end is not None:
-        pib_start = next_workday(first_dzo_end)
-    else:
-        # если ДЗО не выбраны — fallback на дату начала контроля ИБ
-        pib_start = next_workday(info_date)
+TABLE_MODE_ROWS = "Строки"
+TABLE_MODE_EDITOR = "Таблица-редактор"
+
+EDITOR_FIELDS = {
+    "№": "order",
+    "Включено": "check",
+    "Дата начала (план)": "start",
+    "Длительность (раб. дн)": "dur",
+}
+
+
+def editor_mode() -> bool:
+    return st.session_state.get("table_mode") == TABLE_MODE_EDITOR
 
-    pib_end = end_date_by_workdays(pib_start, pib_dur)
 
-    st.session_state[f"{pib_kb}_check"] = True
-    st.session_state[f"{pib_kb}_dur"] = pib_dur
-    st.session_state[f"{pib_kb}_start"] = pib_start
-    st.session_state[f"{pib_kb}_end"] = pib_end
+def editor_key(block: str) -> str:
+    # версия в ключе: после применения правок редактор пересоздаётся по новым данным
+    return f"editor_{block}_{plan_state().version}"
 
-    # 5–6. Подготовка и согласование отчета
-    report_name = "Подготовка и согласование Отчета"
-    report_kb = key_base_from_name(report_name)
 
-    report_dur = 1
-    report_start = next_workday(pib_end)
-    report_end = report_start
+def editor_frame(names, plan, with_order: bool):
+    import pandas as pd
 
-    st.session_state[f"{report_kb}_check"] = True
-    st.session_state[f"{report_kb}_dur"] = report_dur
-    st.session_state[f"{report_kb}_start"] = report_start
-    st.session_state[f"{report_kb}_end"] = report_end
+    state = plan_state()
+    rows = []
+    for name in names:
+        task = plan.task(name)
+        row = {"№": state.get(name, "order")} if with_order else {}
+        row.update({
+            "Наименование контроля": name,
+            "Включено": task is not None,
+            "Дата начала (план)": task.start if task else plan.default_starts.get(name),
+            "Длительность (раб. дн)": (
+                task.duration if task else state.get(name, "dur")
+            ),
+            "Дата завершения (план)": task.end if task else None,
+        })
+        rows.append(row)
+    return pd.DataFrame(rows)
 
-    return total_dzo_dur, total_instr_dur, pib_dur
+
+def apply_editor_edits(block: str, names):
+    """
+    Колбэк редактора: пакетная проверка всех изменённых строк и запись в PlanState.
+    При ошибке не применяется ни одна правка из пакета.
+    """
+    edits = st.session_state.get(editor_key(block), {}).get("edited_rows", {})
+
+    updates = {}
+    checked = []
+    for row, changes in edits.items():
+        name = names[int(row)]
+        values = {}
+        for column, value in changes.items():
+            field = EDITOR_FIELDS.get(column)
+            if field is None:
+                continue
+            if field == "start" and value is not None:
+                value = date.fromisoformat(str(value)[:10])
+            if field in ("dur", "order") and value is not None and float(value).is_integer():
+                value = int(value)  # редактор может вернуть 3.0 — виджеты строк ждут int
+            values[field] = value
+            updates[(name, field)] = value  # None — вернуть значение по умолчанию
+        checked.append(ControlInput(name, dur=values.get("dur"), order=values.get("order")))
+
+    errors = validate_controls(checked, catalog)
+    st.session_state[f"editor_{block}_errors"] = errors
+    # при ошибке версия всё равно растёт — редактор пересоздаётся без отклонённых правок
+    plan_state().update({} if errors else updates)
+    rerun_dependents("planning")
+
+
+def render_editor_table(block: str, names, plan, with_order: bool = False):
+    column_config = {
+        "№": st.column_config.NumberColumn(min_value=1, max_value=MAX_CONTROL_VALUE, step=1, width="small"),
+        "Наименование контроля": st.column_config.TextColumn(width="large"),
+        "Включено": st.column_config.CheckboxColumn(),
+        "Дата начала (план)": st.column_config.DateColumn(format="DD.MM.YYYY"),
+        "Длительность (раб. дн)": st.column_config.NumberColumn(min_value=1, max_value=MAX_CONTROL_VALUE, step=1),
+        "Дата завершения (план)": st.column_config.DateColumn(format="DD.MM.YYYY"),
+    }
+    st.data_editor(
+        editor_frame(names, plan, with_order),
+        key=editor_key(block),
+        column_config=column_config,
+        disabled=["Наименование контроля", "Дата завершения (план)"],
+        hide_index=True,
+        use_container_width=True,
+        on_change=apply_editor_edits,
+        args=(block, list(names)),
+    )
+    for error in st.session_state.get(f"editor_{block}_errors", []):
+        st.error(error)
 
 
 # --- 3. ВЫБОР КОНТРОЛЕЙ / ПЛАНИРОВАНИЕ ЭТАПОВ ---
 
-st.markdown('<div class="header-box">Планирование этапов (Контроли)</div>', unsafe_allow_html=True)
+# режим ввода: строки виджетов или таблица-редактор
+with st.sidebar:
+    st.radio(
+        "Ввод контролей",
+        [TABLE_MODE_ROWS, TABLE_MODE_EDITOR],
+        key="table_mode",
+        help="«Таблица-редактор» — одна редактируемая таблица на блок вместо строки виджетов на каждый контроль.",
+    )
 
-# --- Блок 3.1. Заполнение в ДЗО опросных листов ---
-st.markdown('<div class="header-box" style="font-size:16px;">Заполнение в ДЗО опросных листов</div>', unsafe_allow_html=True)
-st.markdown('<div class="form-row">', unsafe_allow_html=True)
 
-# список контролей ДЗО
-dzo_controls = [name for name, props in CONTROLS_DB.items() if props["cat"] == "Опросные листы"]
+st.markdown('<div class="header-box">Планирование этапов (Контроли)</div>', unsafe_allow_html=True)
 
-# инициализируем порядок по умолчанию (как в словаре)
-for idx, name in enumerate(dzo_controls):
-    order_key = f"{key_base_from_name(name)}_order"
-    if order_key not in st.session_state:
-        st.session_state[order_key] = idx + 1
 
-# сортировка по текущему порядку
-dzo_controls_sorted = sorted(
-    dzo_controls,
-    key=lambda n: st.session_state.get(f"{key_base_from_name(n)}_order", 999),
-)
+@st.fragment(key="planning")
+@profiled("planning")
+def planning_tables(dzo_name: str, info_date: date):
+    plan, _ = current_plan(dzo_name, info_date)
+    conflicts = stored_conflicts(plan)
 
-render_table_header(with_order=True)
+    # --- Блок 3.1. Заполнение в ДЗО опросных листов ---
+    st.markdown('<div class="header-box" style="font-size:16px;">Заполнение в ДЗО опросных листов</div>', unsafe_allow_html=True)
+    st.markdown('<div class="form-row">', unsafe_allow_html=True)
 
-prev_end = None  # окончание предыдущего выбранного контроля
+    if editor_mode():
+        render_editor_table("dzo", plan.dzo_order, plan, with_order=True)
+    else:
+        render_table_header(with_order=True)
+
+        # строки — в текущем порядке; старт по умолчанию и окончание берутся из плана
+        for name in plan.dzo_order:
+            render_control_row_independent(
+                name,
+                default_start=plan.default_starts[name],
+                task=plan.task(name),
+                with_order=True,
+                conflicts=conflicts.get(name, ()),
+            )
 
-for name in dzo_controls_sorted:
-    kb = key_base_from_name(name)
+    st.markdown("</div>", unsafe_allow_html=True)
 
-    if prev_end is None:
-        # первый контроль ДЗО — от даты начала контроля ИБ
-        default_start = info_date
+    # --- Блок 3.2. Инструментальные проверки ---
+    st.markdown('<div class="header-box" style="font-size:16px;">Инструментальные проверки</div>', unsafe_allow_html=True)
+    st.markdown('<div class="form-row">', unsafe_allow_html=True)
+    if editor_mode():
+        render_editor_table("instrumental", catalog.instrumental, plan)
     else:
-        # последующие — со следующего рабочего дня после окончания предыдущего
-        default_start = next_workday(prev_end)
+        render_table_header(with_order=False)
+        for name in catalog.instrumental:
+            render_control_row_independent(
+                name, default_start=info_date, task=plan.task(name), with_order=False,
+                conflicts=conflicts.get(name, ()),
+            )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.fragment(key="info_report")
+@profiled("info_report")
+def info_report_block(dzo_name: str, info_date: date):
+    plan, _ = current_plan(dzo_name, info_date)
+
+    st.markdown('<div class="header-box" style="font-size:16px;">Проверка информации в Блоке ИБ и подготовка отчета</div>', unsafe_allow_html=True)
+    st.markdown('<div class="form-row">', unsafe_allow_html=True)
+
+    if editor_mode():
+        # расчётный блок: таблица только для чтения
+        st.dataframe(editor_frame(catalog.info, plan, with_order=False), hide_index=True, use_container_width=True)
+        st.caption(
+            f"• Проверка в БИБ: старт от даты окончания первого выбранного контроля ДЗО, длительность = "
+            f"max(∑ ДЗО = {plan.total_dzo_dur}; ∑ БИБ = {plan.total_instr_dur}) + 5 = {plan.pib_dur} раб. дн."
+        )
+        st.caption("• Отчет: старт в следующий рабочий день после окончания проверки в БИБ, длительность 1 раб. дн.")
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+
+    render_table_header(with_order=False)
+
+    # Рендер статичных строк для проверки и отчета (расчётные значения — только показ)
+    for name in catalog.info:
+        task = plan.task(name)
+        dur, start, end = task.duration, task.start, task.end
+
+        c1, c2, c3, c4, c5 = st.columns([3, 1, 2, 1.5, 2])
+
+        with c1:
+            st.write(f"**{name}**")
+            if name == PIB_NAME:
+                st.caption(
+                    "• Старт от даты окончания первого выбранного контроля ДЗО "
+                    "(если ДЗО не выбраны — от даты начала контроля ИБ)."
+                )
+                st.caption(
+                    f"• Длительность = max(∑ ДЗО = {plan.total_dzo_dur}; "
+                    f"∑ БИБ = {plan.total_instr_dur}) + 5 = {dur} раб. дн."
+                )
+            if name == REPORT_NAME:
+                st.caption("• Старт в следующий рабочий день после окончания проверки в БИБ, длительность 1 раб. дн.")
 
-    # внутри функция:
-    #   - возьмёт default_start только если нет st.session_state[f"{kb}_start"]
-    #   - посчитает end по рабочим дням и запишет в session_state[f"{kb}_end"]
-    render_control_row_independent(name, default_start=default_start, with_order=True)
+        with c2:
+            st.write("ДА")
+        with c3:
+            st.write(start.strftime("%d.%m.%Y"))
+        with c4:
+            st.write(str(dur))
+        with c5:
+            st.write(end.strftime("%d.%m.%Y"))
 
-    # после рендера обновляем prev_end, если контроль включён
-    if st.session_state.get(f"{kb}_check", False):
-        prev_end = st.session_state.get(f"{kb}_end", prev_end)
+        st.markdown("<hr style='margin: 5px 0; border-top: 1px dashed #eee;'>", unsafe_allow_html=True)
 
-st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
 
 
-# --- Блок 3.2. Инструментальные проверки ---
-st.markdown('<div class="header-box" style="font-size:16px;">Инструментальные проверки</div>', unsafe_allow_html=True)
-st.markdown('<div class="form-row">', unsafe_allow_html=True)
-render_table_header(with_order=False)
-instrumental_core = ['"Здоровье AD"', "Сканирование уязвимостей внутренней сети", "Внутренний пентест"]
-for name in instrumental_core:
-    render_control_row_independent(name, default_start=info_date, with_order=False)
-st.markdown("</div>", unsafe_allow_html=True)
+# --- Блок 3.1–3.2. Контроли ДЗО и инструментальные проверки ---
+planning_tables(dzo_name, info_date)
 
 st.markdown("<br>", unsafe_allow_html=True)
 
 # --- Блок 3.3. Проверка информации в Блоке ИБ + Отчет ---
-total_dzo_dur, total_instr_dur, pib_dur = compute_info_and_report(dzo_controls_sorted, instrumental_core)
+info_report_block(dzo_name, info_date)
 
-st.markdown('<div class="header-box" style="font-size:16px;">Проверка информации в Блоке ИБ и подготовка отчета</div>', unsafe_allow_html=True)
-st.markdown('<div class="form-row">', unsafe_allow_html=True)
-render_table_header(with_order=False)
 
-# Рендер статичных строк для проверки и отчета
-for name in ["Проверка информации в Блоке ИБ", "Подготовка и согласование Отчета"]:
-    kb = key_base_from_name(name)
-    dur = st.session_state.get(f"{kb}_dur", CONTROLS_DB[name]["dur"])
-    start = st.session_state.get(f"{kb}_start", info_date)
-    end = st.session_state.get(f"{kb}_end", end_date_by_workdays(start, int(dur)))
+# --- 4. РАСЧЕТ И РЕЗУЛЬТАТ ---
 
-    c1, c2, c3, c4, c5 = st.columns([3, 1, 2, 1.5, 2])
+def mark_plan_ready():
+    st.session_state["plan_ready"] = True
+    rerun_dependents("results")
 
-    with c1:
-        st.write(f"**{name}**")
-        if name == "Проверка информации в Блоке ИБ":
-            st.caption(
-                "• Старт от даты окончания первого выбранного контроля ДЗО "
-                "(если ДЗО не выбраны — от даты начала контроля ИБ)."
+
+@st.fragment(key="results")
+@profiled("results")
+def results_section(dzo_name: str, info_date: date):
+    plan, plan_fp = current_plan(dzo_name, info_date)
+    meta = PlanMeta(
+        dzo_name,
+        info_date,
+        *(st.session_state.get(k, "") for k in ("goals", "objects", "group_rt", "group_dzo")),
+    )
+
+    st.markdown("### Результаты планирования")
+    st.button("Рассчитать план и График", type="primary", on_click=mark_plan_ready)
+
+    if st.session_state.get("plan_ready"):
+        if not plan.tasks:
+            st.warning("Не выбрано ни одного контроля.")
+        else:
+            cal = get_calendar(dzo_name)
+            if not (cal.covers(info_date) and cal.covers(plan.overall_end)):
+                st.warning(
+                    f"Праздники производственного календаря известны на {cal.covered_from.year}–"
+                    f"{cal.covered_to.year} гг.: за их пределами учтены только выходные сб/вс, "
+                    "даты этапов могут сместиться."
+                )
+            with profiler.section("results.table"):
+                df = schedule_frame(plan)
+
+                # --- ОТОБРАЖЕНИЕ ТАБЛИЦЫ ---
+                df_display = df.copy()
+                df_display["Начало"] = df_display["Начало"].apply(lambda x: x.strftime("%d.%m.%Y"))
+                df_display["Окончание"] = df_display["Окончание"].apply(lambda x: x.strftime("%d.%m.%Y"))
+
+                st.subheader("Таблица этапов")
+                st.dataframe(
+                    df_display[["Задача", "Начало", "Окончание", "Длительность (раб. дн)"]].sort_values(by="Начало"),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+            # --- EXCEL EXPORT ---
+            def build_workbook():
+                with profiler.section("results.excel_build"):
+                    return build_plan_workbook(plan, meta)
+
+            excel_data = workbook_cache.get_or_create(fingerprint(plan_fp, meta), build_workbook)
+            profiler.record_size("workbook.bytes", len(excel_data))
+
+            st.download_button(
+                label="📥 Скачать план в Excel",
+                data=excel_data,
+                file_name=f"plan_{dzo_name if dzo_name else 'DZO'}.xlsx",
+                mime=EXCEL_MIME,
+                on_click="ignore",
             )
-            st.caption(
-                f"• Длительность = max(∑ ДЗО = {total_dzo_dur}; "
-                f"∑ БИБ = {total_instr_dur}) + 5 = {dur} раб. дн."
+
+        # --- ДИАГРАММА ГАНТА ---
+        st.subheader("Диаграмма Ганта")
+
+        def build_figure():
+            with profiler.section("results.gantt_build"):
+                return build_gantt_figure(plan)
+
+        fig = figure_cache.get_or_create(plan_fp, build_figure)
+        if profiler.enabled:
+            profiler.record_size("figure.json_bytes", len(fig.to_json()))
+
+        with profiler.section("results.plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+        if plan.tasks:
+            # Картинка для отчётов и писем: рисуется только по нажатию (data — функция)
+            c1, c2, _ = st.columns([1, 1, 4])
+            chart_name = f"gantt_{dzo_name if dzo_name else 'DZO'}"
+            c1.download_button(
+                "🖼 Диаграмма SVG", data=lambda: gantt_svg(plan), file_name=f"{chart_name}.svg",
+                mime="image/svg+xml", on_click="ignore", key="gantt_svg",
             )
-        if name == "Подготовка и согласование Отчета":
-            st.caption("• Старт в следующий рабочий день после окончания проверки в БИБ, длительность 1 раб. дн.")
+            c2.download_button(
+                "🖼 Диаграмма PNG", data=lambda: gantt_png(plan, scale=2), file_name=f"{chart_name}.png",
+                mime="image/png", on_click="ignore", key="gantt_png",
+            )
+        if plan.critical_path:
+            st.caption("🔴 Критический путь: " + " → ".join(plan.critical_path))
 
-    with c2:
-        st.write("ДА")
-        st.session_state[f"{kb}_check"] = True
+        # --- ЗАГРУЗКА ГРУППЫ ---
+        resources = parse_roster(meta.group_rt)
+        if plan.tasks and team_capacity(resources):
+            with profiler.section("results.leveling"):
+                leveling = level_plans([plan], resources)
+            if leveling.delayed:
+                _, delayed_df = leveling_frames(leveling)
+                shift = leveling.plan_delays.get(dzo_name, 0)
+                st.warning(
+                    "Состава группы Ростелеком не хватает на параллельные проверки — часть задач сдвигается"
+                    + (f", окончание плана — на {shift} раб. дн." if shift else "; окончание плана не меняется.")
+                )
+                st.dataframe(delayed_df.drop(columns=["ДЗО"]), use_container_width=True, hide_index=True)
+            else:
+                st.caption("Состава группы Ростелеком хватает на все проверки без сдвигов.")
 
-    with c3:
-        st.date_input(
-            "Start",
-            value=start,
-            key=f"{kb}_start",
-            label_visibility="collapsed",
-            disabled=True,
+
+results_section(dzo_name, info_date)
+
+
+# --- 4.1 СЦЕНАРИИ: ПОДБОР ДАТЫ НАЧАЛА ---
+SCENARIO_MULTIPLIERS = [0.5, 0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 1.5, 2.0]
+
+
+@st.fragment(key="scenarios")
+@profiled("scenarios")
+def scenario_panel(dzo_name: str, info_date: date):
+    """
+    Окончание плана для всех дат начала из диапазона и множителей длительностей
+    (planner.scenarios.sweep) — без перезапуска страницы на каждую пробу.
+    """
+    plan, _ = current_plan(dzo_name, info_date)
+
+    with st.expander("Сценарии: подбор даты начала и запас по длительностям"):
+        # Содержимое свёрнутого expander всё равно выполняется — расчёт и графики только по запросу
+        if not st.toggle("Рассчитать сценарии", key="scenario_on"):
+            return
+
+        import plotly.express as px
+
+        c1, c2, c3 = st.columns([2, 2, 1])
+        with c1:
+            period = st.date_input(
+                "Диапазон дат начала",
+                value=(info_date, date(info_date.year + 1, info_date.month, 1)),
+                format="DD.MM.YYYY",
+                key="scenario_period",
+            )
+        with c2:
+            multipliers = st.multiselect(
+                "Множители длительностей",
+                SCENARIO_MULTIPLIERS,
+                default=list(DEFAULT_MULTIPLIERS),
+                key="scenario_multipliers",
+            )
+        with c3:
+            target = st.date_input(
+                "Завершить не позже", value=None, format="DD.MM.YYYY", key="scenario_target",
+                help="По умолчанию — окончание текущего плана",
+            ) or plan.overall_end
+
+        keep_pinned = st.checkbox(
+            "Учитывать заданные в таблицах даты начала контролей",
+            value=False,
+            key="scenario_keep_pinned",
+            help="Без отметки все контроли идут по правилам плана от каждой даты начала из диапазона",
         )
 
-    with c4:
-        st.number_input(
-            "Dur",
-            min_value=1,
-            value=int(dur),
-            key=f"{kb}_dur",
-            label_visibility="collapsed",
-            disabled=True,
+        if len(period) != 2 or not multipliers:
+            st.info("Выберите диапазон дат начала и хотя бы один множитель.")
+            return
+
+        try:
+            result = sweep(plan.input, period[0], period[1], sorted(multipliers), keep_pinned=keep_pinned)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        rows = []
+        for m in result.multipliers:
+            latest = result.latest_start(target, m)
+            start, finish = result.earliest_finish(m)
+            rows.append({
+                "Множитель": f"×{m:g}",
+                "Начать не позже": latest.strftime("%d.%m.%Y") if latest else "—",
+                "Самое раннее окончание": finish.strftime("%d.%m.%Y"),
+                "при старте": start.strftime("%d.%m.%Y"),
+            })
+
+        target_str = target.strftime("%d.%m.%Y")
+        if 1.0 in result.multipliers:
+            best = result.latest_start(target, 1.0)
+            if best:
+                st.success(f"При плановых длительностях начать нужно не позже {best.strftime('%d.%m.%Y')}, чтобы завершить к {target_str}.")
+            else:
+                st.warning(f"При плановых длительностях в выбранном диапазоне к {target_str} не успеть.")
+        st.caption(f"Сценариев: {result.finish.size}, расчёт {result.elapsed * 1000:.1f} мс.")
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+        df = result.frame()
+        df["Множитель длительностей"] = df["Множитель длительностей"].map(lambda m: f"×{m:g}")
+        fig_line = px.line(df, x="Дата начала", y="Окончание", color="Множитель длительностей")
+        fig_line.add_hline(y=target, line_dash="dash", line_color="#e8002a")
+        fig_line.update_layout(height=380, legend_title_text=None)
+        st.plotly_chart(fig_line, use_container_width=True)
+
+        fig_hist = px.histogram(df, x="Окончание", color="Множитель длительностей", nbins=60, barmode="overlay")
+        fig_hist.add_vline(x=target, line_dash="dash", line_color="#e8002a")
+        fig_hist.update_layout(height=320, yaxis_title="Сценариев", legend_title_text=None)
+        st.plotly_chart(fig_hist, use_container_width=True)
+
+
+scenario_panel(dzo_name, info_date)
+
+
+# --- 5. ПАКЕТНОЕ ПЛАНИРОВАНИЕ ---
+@st.fragment(key="portfolio_timeline")
+@profiled("portfolio_timeline")
+def portfolio_timeline():
+    """
+    Диаграмма портфеля по результату пакетного расчёта: ДЗО свёрнуты в строки,
+    развёрнутые показывают задачи; смена периода и дорожек не перезапускает страницу.
+    """
+    data = st.session_state.get("batch_timeline")
+    if data is None or not len(data) or not st.toggle("Диаграмма портфеля", key="timeline_on"):
+        return
+
+    first, last = data.period
+    c1, c2 = st.columns([3, 2])
+    with c1:
+        expanded = st.multiselect("Развернуть ДЗО", data.lanes, key="timeline_expanded")
+    with c2:
+        window = st.date_input(
+            "Период", value=(first, last), min_value=first, max_value=last,
+            format="DD.MM.YYYY", key="timeline_window",
+        )
+    if len(window) != 2:
+        return
+    with profiler.section("timeline.figure"):
+        fig = build_timeline_figure(data, expanded=expanded, window=window)
+    meta = fig.layout.meta
+    if meta["bars"] < meta["tasks"]:
+        st.caption(
+            f"Задач: {meta['tasks']}, баров: {meta['bars']} — близкие задачи одной строки объединены"
+            + (f", строки сгруппированы по {meta['band']}." if meta["band"] > 1 else ".")
+            + " Сузьте период или разверните ДЗО для подробностей."
         )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment(key="portfolio_workload")
+@profiled("portfolio_workload")
+def portfolio_workload():
+    """
+    Загрузка портфеля по рабочим дням года (календарь-тепловая карта); клик по
+    дню показывает ДЗО и контроли, идущие в этот день.
+    """
+    data = st.session_state.get("batch_timeline")
+    if data is None or not len(data) or not st.toggle("Загрузка по дням", key="workload_on"):
+        return
+
+    first, last = data.period
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        year = st.selectbox("Год", range(first.year, last.year + 1), key="workload_year")
+    with c2:
+        metric = st.radio("Показатель", WORKLOAD_METRICS, horizontal=True, key="workload_metric")
+    with profiler.section("workload.aggregate"):
+        load = workload(data, (date(year, 1, 1), date(year, 12, 31)))
+    with profiler.section("workload.figure"):
+        fig = build_workload_heatmap(load, metric)
+    event = st.plotly_chart(
+        fig, use_container_width=True, on_select="rerun", selection_mode="points", key="workload_chart",
+    )
+
+    points = event.selection.points if event else []
+    day = clicked_day(points[0]) if points else None
+    if day is None:
+        busiest = int(load.metric(metric).argmax()) if len(load) else None
+        if busiest is None:
+            return
+        day = load.days[busiest].astype(date)
+        st.caption("Нажмите на день, чтобы увидеть идущие в нём проверки. Ниже — самый загруженный день.")
+
+    tasks = day_frame(data, day)
+    st.markdown(f"**{day.strftime('%d.%m.%Y')}**: проверок — {tasks['ДЗО'].nunique()}, контролей — {len(tasks)}")
+    if tasks.empty:
+        return
+    by_dzo = tasks.pivot_table(index="ДЗО", columns="Категория", values="Задача", aggfunc="count", fill_value=0)
+    st.dataframe(by_dzo, use_container_width=True)
+    dzo = st.selectbox("Контроли ДЗО", by_dzo.index, key="workload_dzo")
+    st.dataframe(
+        tasks[tasks["ДЗО"] == dzo].drop(columns="ДЗО"), use_container_width=True, hide_index=True,
+        column_config={
+            "Начало": st.column_config.DateColumn(format="DD.MM.YYYY"),
+            "Окончание": st.column_config.DateColumn(format="DD.MM.YYYY"),
+        },
+    )
+
+
+JOB_POLL_SECONDS = 1.0
+
+jobs = get_job_queue()
+
 
-    with c5:
-        st.date_input(
-            "End",
-            value=end,
-            key=f"{kb}_end",
-            label_visibility="collapsed",
-            disabled=True,
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def export_job_progress(key: str):
+    """
+    Опрос очереди, пока задание выполняется. Фрагмент выводится только для
+    незавершённого задания: по завершении — перезапуск страницы, и опрос
+    прекращается (дальше состояние показывает export_job_status).
+    """
+    job = jobs.get(key)
+    if job is None or not job.pending:
+        st.rerun()
+    status = "в очереди" if job.state == "queued" else "собирается"
+    st.info(f"{job.title}: {status}, {job.elapsed:.0f} с...")
+
+
+def export_job_status(state_key: str, label: str, file_name: str, mime: str):
+    """
+    Состояние фонового задания выгрузки (ключ задания — в session_state[state_key]):
+    пока файл собирается — опрос очереди, готовый файл — кнопка скачивания.
+    """
+    key = st.session_state.get(state_key)
+    job = jobs.get(key) if key else None
+    if job is None:
+        return
+    if job.pending:
+        export_job_progress(key)
+    elif job.error:
+        st.error(f"{job.title}: ошибка сборки — {job.error}")
+    elif os.path.exists(job.path):
+        st.download_button(
+            label=label, data=functools.partial(read_artifact, job.path), file_name=file_name, mime=mime,
+            on_click="ignore", key=f"{state_key}_download",
         )
+        st.caption(f"{job.title} собрана за {job.elapsed:.1f} с.")
+    else:
+        st.warning(f"{job.title}: файл удалён из кэша выгрузок — сформируйте заново.")
 
-    st.markdown("<hr style='margin: 5px 0; border-top: 1px dashed #eee;'>", unsafe_allow_html=True)
 
-st.markdown("</div>", unsafe_allow_html=True)
+def columnar_file(data, fmt: str) -> bytes:
+    return table_bytes(schedule_table(data), fmt)
 
-# --- 4. РАСЧЕТ И РЕЗУЛЬТАТ ---
-st.markdown("### Результаты планирования (нажать дважды)")
 
-if st.button("Рассчитать план и График", type="primary"):
-    # считаем и сохраняем всё в session_state
-    st.session_state["plan_ready"] = True
-    
-if st.session_state.get("plan_ready"):    
-    final_schedule = []
+def stored_columnar_file(plan_ids, fmt: str) -> bytes:
+    # Хранимые планы — с номером ревизии каждого плана
+    return table_bytes(stored_schedule_table(get_repository(), plan_ids), fmt)
 
-    for name in CONTROLS_ORDER:
-        props = CONTROLS_DB[name]
-        kb = key_base_from_name(name)
 
-        if not st.session_state.get(f"{kb}_check", False):
-            continue
+def load_archived_run(run: str):
+    """
+    Колбэк: прогон из архива -> диаграмма портфеля и загрузка по дням.
+    """
+    try:
+        with profiler.section("batch.archive_load"):
+            data = timeline_from_table(read_run(run))
+    except (ValueError, OSError) as e:
+        st.session_state["batch_archive_message"] = ("error", f"Прогон {run} не открыт: {e}")
+        return
+    st.session_state["batch_timeline"] = data
+    st.session_state["batch_archive_message"] = (
+        "info", f"Показан прогон {run} из архива: ДЗО {len(data.lanes)}, задач {len(data)}."
+    )
+
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+with st.expander("Пакетное планирование для нескольких ДЗО (CSV / Excel)"):
+    st.caption(
+        "Столбцы: «ДЗО», «Дата начала» и наименования контролей. "
+        "Ячейка контроля: ДА — включён с длительностью по умолчанию, число — длительность (раб. дн), "
+        "пусто или НЕТ — выключен. Правила расчёта те же, что и для одного ДЗО."
+    )
+    st.download_button(
+        label="Шаблон таблицы (CSV)",
+        data=template_csv(),
+        file_name="batch_template.csv",
+        mime="text/csv",
+    )
+
+    uploaded = st.file_uploader("Таблица ДЗО", type=["csv", "xlsx"], key="batch_upload")
+
+    if uploaded is not None and st.button("Рассчитать планы", key="batch_run"):
+        progress_bar = st.progress(0.0, text="Чтение таблицы...")
+
+        def batch_progress(done, total):
+            progress_bar.progress(done / total, text=f"Рассчитано планов: {done}/{total}")
 
-        start_date = st.session_state.get(f"{kb}_start")
-        end_date_inclusive = st.session_state.get(f"{kb}_end")
-        duration = int(st.session_state.get(f"{kb}_dur", props["dur"]))
-
-        final_schedule.append(
-            {
-                "Задача": name,
-                "Категория": props["cat"],
-                "Начало": start_date,
-                "Окончание": end_date_inclusive,
-                "Длительность (раб. дн)": duration,
-            }
+        try:
+            with profiler.section("batch.run"):
+                batch_table = read_table(uploaded, uploaded.name)
+                batch_result = run_batch(batch_table, progress=batch_progress)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.session_state["batch_table"] = batch_table
+            st.session_state.pop("batch_leveling", None)
+            st.session_state["batch_xlsx"] = write_result(batch_result)
+            st.session_state["batch_timeline"] = timeline_data(batch_result.rows)
+            st.session_state["batch_stats"] = (
+                len(batch_result.summary), len(batch_result.rows), batch_result.errors, batch_result.elapsed
+            )
+            st.session_state.pop("batch_archive_message", None)
+
+    if st.session_state.get("batch_xlsx"):
+        n_plans, n_tasks, batch_errors, elapsed = st.session_state["batch_stats"]
+        st.success(f"Рассчитано планов: {n_plans}, задач: {n_tasks} за {elapsed:.2f} с.")
+        for e in batch_errors[:20]:
+            st.warning(f"Строка {e.row} ({e.dzo_name or '—'}): {e.message}")
+        if len(batch_errors) > 20:
+            st.warning(f"... и ещё {len(batch_errors) - 20} ошибок (см. лист «Ошибки»).")
+        st.download_button(
+            label="📥 Скачать сводный план в Excel",
+            data=st.session_state["batch_xlsx"],
+            file_name="batch_plan.xlsx",
+            mime=EXCEL_MIME,
+        )
+
+        # --- КОЛОНОЧНАЯ ВЫГРУЗКА ДЛЯ BI (planner/columnar.py) ---
+        batch_timeline = st.session_state["batch_timeline"]
+        c1, c2, c3 = st.columns(3)
+        for col, fmt in zip((c1, c2), COLUMNAR_FORMATS):
+            col.download_button(
+                label=f"📥 График в {fmt.capitalize()}", data=functools.partial(columnar_file, batch_timeline, fmt),
+                file_name=f"batch_plan.{fmt}", mime=COLUMNAR_MIME[fmt], on_click="ignore", key=f"batch_{fmt}",
+            )
+        if c3.button("Сохранить прогон в архив", key="batch_archive_save"):
+            run = append_run(schedule_table(batch_timeline))
+            st.success(f"Прогон {run} сохранён в архив ({len(batch_timeline)} задач).")
+
+        # --- КНИГА-ПОРТФЕЛЬ ---
+        # Собирается фоновым заданием (planner.jobs): страница не ждёт сборку,
+        # повторный запрос той же таблицы получает готовую книгу из кэша
+        if st.button("Сформировать книгу-портфель (лист на каждое ДЗО)", key="batch_portfolio_run"):
+            batch_table = st.session_state["batch_table"]
+            job = jobs.submit(
+                fingerprint(catalog.fingerprint, table_fingerprint(batch_table)), "xlsx",
+                write_portfolio_book, batch_table, title="Книга-портфель",
+            )
+            st.session_state["batch_portfolio_job"] = job.key
+        export_job_status("batch_portfolio_job", "📥 Скачать книгу-портфель", "portfolio.xlsx", EXCEL_MIME)
+
+        # --- ВЫРАВНИВАНИЕ ПО КОМАНДАМ ---
+        st.markdown("**Выравнивание по загрузке команд**")
+        roster_text = st.text_area(
+            "Состав команд Ростелеком", value=st.session_state.get("group_rt", ""), key="batch_roster",
+            height=120, help=ROSTER_HELP,
         )
+        if st.button("Выровнять планы", key="batch_level"):
+            resources = parse_roster(roster_text)
+            if not team_capacity(resources):
+                st.warning("В составе не найдено пентестеров или аналитиков ИБ — ограничивать нечего.")
+            else:
+                inputs, _ = plan_inputs_from_frame(st.session_state["batch_table"])
+                try:
+                    st.session_state["batch_leveling"] = level_plans([schedule(pi) for pi in inputs], resources)
+                except ValueError as e:
+                    st.error(str(e))
+
+        leveling = st.session_state.get("batch_leveling")
+        if leveling is not None:
+            plans_df, delayed_df = leveling_frames(leveling)
+            st.info(
+                f"Сдвинуто планов: {len(plans_df)} из {len(leveling.plan_delays)}, задач: {len(delayed_df)}; "
+                f"максимальный сдвиг — {int(plans_df.iloc[:, 1].max()) if len(plans_df) else 0} раб. дн. "
+                f"(расчёт {leveling.elapsed:.2f} с)."
+            )
+            if len(plans_df):
+                st.dataframe(plans_df, use_container_width=True, hide_index=True)
+                st.dataframe(delayed_df, use_container_width=True, hide_index=True)
+
+    # --- АРХИВ ПРОГОНОВ ---
+    # Сохранённые прогоны (Parquet, каталог PORTFOLIO_ARCHIVE_DIR) открываются
+    # на диаграмме портфеля и в загрузке по дням без пересчёта
+    archived_runs = list_runs()
+    if archived_runs:
+        c1, c2 = st.columns([3, 1])
+        with c1:
+            archived_run = st.selectbox("Прогон из архива", archived_runs, key="batch_archive_run")
+        c2.button("Открыть прогон", key="batch_archive_load", on_click=load_archived_run, args=(archived_run,))
+    kind, message = st.session_state.get("batch_archive_message", (None, None))
+    if message:
+        getattr(st, kind)(message)
+
+    if st.session_state.get("batch_timeline") is not None:
+        portfolio_timeline()
+        portfolio_workload()
+
+
+# --- 6. ХРАНИЛИЩЕ ПЛАНОВ ---
+# Планы сохраняются в SQLite (planner/repository.py, путь — PLAN_DB).
+# Загрузка заполняет форму из колбэка, до отрисовки виджетов.
+META_KEYS = ("goals", "objects", "group_rt", "group_dzo")
 
-    if not final_schedule:
-        st.warning("Не выбрано ни одного контроля.")
+
+def fill_form(plan_input, meta: dict, loaded=None):
+    """
+    Колбэк: форма по входу плана и текстовым полям (хранилище, импорт из Excel).
+    """
+    plan_state().load(plan_input)
+    st.session_state["dzo_name"] = plan_input.dzo_name
+    st.session_state["info_date"] = plan_input.info_date
+    for k in META_KEYS:
+        st.session_state[k] = meta.get(k, "")
+    if loaded is None:
+        st.session_state.pop("loaded_plan", None)
     else:
-        df = pd.DataFrame(final_schedule)
+        st.session_state["loaded_plan"] = loaded
+    st.session_state["plan_ready"] = True
 
-        # Запоминаем максимальную дату окончания для отображения в шапке
-        st.session_state["overall_end_date"] = df["Окончание"].max()
 
+def load_stored_plan(plan_id: int, revision: int | None = None):
+    stored = get_repository().load(plan_id, revision)
+    fill_form(stored.input, stored.meta, (plan_id, stored.revision))
 
-        # --- ОТОБРАЖЕНИЕ ТАБЛИЦЫ ---
-        df_display = df.copy()
-        df_display["Начало"] = df_display["Начало"].apply(lambda x: x.strftime("%d.%m.%Y"))
-        df_display["Окончание"] = df_display["Окончание"].apply(lambda x: x.strftime("%d.%m.%Y"))
 
-        st.subheader("Таблица этапов")
-        st.dataframe(
-            df_display[["Задача", "Начало", "Окончание", "Длительность (раб. дн)"]].sort_values(by="Начало"),
-            use_container_width=True,
-            hide_index=True,
+def duplicate_stored_plan(plan_id: int):
+    load_stored_plan(get_repository().duplicate(plan_id))
+
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+try:
+    repo, repo_error = get_repository(), None
+except (sqlite3.Error, ValueError) as e:
+    repo, repo_error = None, e
+
+with st.expander("Хранилище планов"):
+    if repo is None:
+        st.error(f"Хранилище планов недоступно: {repo_error}")
+    # Содержимое свёрнутого expander всё равно выполняется — запросы к хранилищу только по запросу
+    elif st.toggle("Работать с хранилищем", key="repo_on"):
+        loaded = st.session_state.get("loaded_plan")
+        st.caption(
+            f"Планов в хранилище: {repo.count()}. "
+            + (f"Открыт план №{loaded[0]}, ревизия {loaded[1]}." if loaded else "Текущий план не сохранён.")
         )
 
-        # --- EXCEL EXPORT ---
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            workbook = writer.book
-            worksheet = workbook.add_worksheet("Plan")
-            writer.sheets["Plan"] = worksheet
-
-            # Форматы
-            bold = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "vcenter"})
-            cell = workbook.add_format({"border": 1, "align": "left", "valign": "top"})
-            cell_wrap = workbook.add_format({
-                "border": 1,
-                "align": "left",
-                "valign": "top",
-                "text_wrap": True
-            })
-            cell_center = workbook.add_format({"border": 1, "align": "center", "valign": "vcenter"})
-
-            # ======== БЛОК 1 — ОБЩИЕ СВЕДЕНИЯ ========
-            worksheet.merge_range("A1:B1", "План проведения контроля ИБ", bold)
-
-            worksheet.write("A2", "Название ДЗО", cell)
-            worksheet.write("B2", dzo_name, cell)
-            worksheet.write("A3", "Дата начала контроля ИБ", cell)
-            worksheet.write("B3", info_date.strftime("%d.%m.%Y"), cell)
-
-            worksheet.write("A5", "Цели и задачи контроля ИБ", cell)
-            worksheet.write("B5", goals, cell_wrap)
-            worksheet.write("A6", "Объекты контроля ИБ", cell)
-            worksheet.write("B6", objects, cell_wrap)
-
-            # ======== БЛОК 2 — СОСТАВ ГРУППЫ ========
-            worksheet.merge_range("A8:B8", "Состав группы контроля ИБ", bold)
-
-            worksheet.write("A9", 'От ПАО "Ростелеком"', cell)
-            worksheet.write("B9", group_rt, cell_wrap)
-            worksheet.write("A10", "От ДЗО", cell)
-            worksheet.write("B10", group_dzo, cell_wrap)
-
-            # ======== БЛОК 3 — ТАБЛИЦА КОНТРОЛЕЙ ========
-            start_row = 12
-            worksheet.merge_range(start_row, 0, start_row, 3, "Заполнение в ДЗО опросных листов", bold)
-
-            headers = ["Наименование контроля", "Включено", "Дата начала", "Дата завершения"]
-            for col, h in enumerate(headers):
-                worksheet.write(start_row + 1, col, h, bold)
-
-            row = start_row + 2
-
-            # Опросные листы (в Excel — в базовом порядке)
-            for name, props in CONTROLS_DB.items():
-                if props["cat"] == "Опросные листы":
-                    kb = key_base_from_name(name)
-                    enabled = "ДА" if st.session_state.get(f"{kb}_check", False) else "НЕТ"
-                    if enabled == "ДА":
-                        start = st.session_state.get(f"{kb}_start")
-                        end = st.session_state.get(f"{kb}_end")
-                    else:
-                        start = end = ""
-
-                    worksheet.write(row, 0, name, cell)
-                    worksheet.write(row, 1, enabled, cell_center)
-                    worksheet.write(row, 2, start.strftime("%d.%m.%Y") if enabled == "ДА" else "", cell_center)
-                    worksheet.write(row, 3, end.strftime("%d.%m.%Y") if enabled == "ДА" else "", cell_center)
-                    row += 1
-
-            # Инструментальные проверки (ядро)
-            row += 1
-            worksheet.merge_range(row, 0, row, 3, "Инструментальные проверки", bold)
-            row += 1
-
-            for col, h in enumerate(headers):
-                worksheet.write(row, col, h, bold)
-
-            row += 1
-
-            for name in instrumental_core:
-                props = CONTROLS_DB[name]
-                kb = key_base_from_name(name)
-                enabled = "ДА" if st.session_state.get(f"{kb}_check", False) else "НЕТ"
-                if enabled == "ДА":
-                    start = st.session_state.get(f"{kb}_start")
-                    end = st.session_state.get(f"{kb}_end")
-                else:
-                    start = end = ""
-
-                worksheet.write(row, 0, name, cell)
-                worksheet.write(row, 1, enabled, cell_center)
-                worksheet.write(row, 2, start.strftime("%d.%m.%Y") if enabled == "ДА" else "", cell_center)
-                worksheet.write(row, 3, end.strftime("%d.%m.%Y") if enabled == "ДА" else "", cell_center)
-                row += 1
-
-            # Проверка информации и отчёт
-            row += 1
-            worksheet.merge_range(row, 0, row, 3, "Проверка информации в Блоке ИБ и подготовка отчета", bold)
-            row += 1
-
-            for col, h in enumerate(headers):
-                worksheet.write(row, col, h, bold)
-
-            row += 1
-
-            for name in ["Проверка информации в Блоке ИБ", "Подготовка и согласование Отчета"]:
-                props = CONTROLS_DB[name]
-                kb = key_base_from_name(name)
-                enabled = "ДА"  # эти блоки всегда присутствуют
-                start = st.session_state.get(f"{kb}_start")
-                end = st.session_state.get(f"{kb}_end")
-
-                worksheet.write(row, 0, name, cell)
-                worksheet.write(row, 1, enabled, cell_center)
-                worksheet.write(row, 2, start.strftime("%d.%m.%Y"), cell_center)
-                worksheet.write(row, 3, end.strftime("%d.%m.%Y"), cell_center)
-                row += 1
-
-            worksheet.set_column("A:A", 40)
-            worksheet.set_column("B:D", 18)
-
-        excel_data = output.getvalue()
+        # --- СОХРАНЕНИЕ ---
+        c1, c2, c3 = st.columns([2, 1, 1])
+        with c1:
+            save_status = st.selectbox("Статус", STATUSES, key="repo_status")
+        save_new = c3.button("Сохранить как новый", key="repo_save_new", disabled=not dzo_name)
+        save_rev = c2.button(
+            "Сохранить ревизию" if loaded else "Сохранить", key="repo_save", type="primary", disabled=not dzo_name
+        )
+        if save_rev or save_new:
+            plan, _ = current_plan(dzo_name, info_date)
+            meta = {k: st.session_state.get(k, "") for k in META_KEYS}
+            plan_id = None if save_new or not loaded else loaded[0]
+            plan_id, revision = repo.save(plan, meta, save_status, plan_id)
+            st.session_state["loaded_plan"] = (plan_id, revision)
+            st.success(f"Сохранён план №{plan_id}, ревизия {revision}.")
+
+        # --- ПОИСК ---
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            query = st.text_input("ДЗО (префикс — со «*» в конце)", key="repo_query")
+        with c2:
+            query_status = st.selectbox("Статус плана", ("Все", *STATUSES), key="repo_query_status")
+        found = repo.find(query.strip() or None, None if query_status == "Все" else query_status, limit=100)
+        if found:
+            st.dataframe(
+                [
+                    {"№": p.plan_id, "ДЗО": p.dzo_name, "Статус": p.status, "Ревизия": p.revision,
+                     "Начало": p.start.strftime("%d.%m.%Y"), "Окончание": p.end.strftime("%d.%m.%Y"),
+                     "Изменён": p.updated_at.replace("T", " ")}
+                    for p in found
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+            found_ids = tuple(p.plan_id for p in found)
+            c1, c2, _ = st.columns([1, 1, 2])
+            for col, fmt in zip((c1, c2), COLUMNAR_FORMATS):
+                col.download_button(
+                    label=f"📥 Графики планов в {fmt.capitalize()}",
+                    data=functools.partial(stored_columnar_file, found_ids, fmt),
+                    file_name=f"stored_plans.{fmt}", mime=COLUMNAR_MIME[fmt], on_click="ignore", key=f"repo_{fmt}",
+                )
+            picked = st.selectbox(
+                "План", found, key="repo_pick", format_func=lambda p: f"№{p.plan_id} — {p.dzo_name} ({p.status})"
+            )
+            history = repo.history(picked.plan_id)
+            revision = st.selectbox(
+                "Ревизия", history, key=f"repo_rev_{picked.plan_id}",
+                format_func=lambda h: f"{h[0]} от {h[1].replace('T', ' ')} — {h[2]}, окончание {h[3]:%d.%m.%Y}",
+            )
+            c1, c2, _ = st.columns([1, 1, 2])
+            c1.button("Открыть", key="repo_load", on_click=load_stored_plan, args=(picked.plan_id, revision[0]))
+            c2.button("Дублировать", key="repo_duplicate", on_click=duplicate_stored_plan, args=(picked.plan_id,))
+        else:
+            st.info("Планы не найдены.")
 
-        st.download_button(
-            label="📥 Скачать план в Excel",
-            data=excel_data,
-            file_name=f"plan_{dzo_name if dzo_name else 'DZO'}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        # --- ВЫБОРКИ ПО ПЕРИОДУ ---
+        st.markdown("**Планы и пересечения пентестов за период**")
+        today = date.today()
+        period = st.date_input(
+            "Период", value=(today.replace(day=1), today), key="repo_period", format="DD.MM.YYYY"
         )
+        if len(period) == 2:
+            start, end = period
+            active = repo.active_between(start, end, limit=200)
+            st.caption(f"Идут в периоде: {repo.count_active(start, end)} (показаны первые {len(active)}).")
+            if active:
+                st.dataframe(
+                    [{"№": p.plan_id, "ДЗО": p.dzo_name, "Статус": p.status,
+                      "Начало": p.start.strftime("%d.%m.%Y"), "Окончание": p.end.strftime("%d.%m.%Y")}
+                     for p in active],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            # --- КТО ПРОВОДИТ КОНТРОЛЬ В ПЕРИОДЕ (интервальный индекс в памяти) ---
+            names = list(catalog.input_controls)
+            control = st.selectbox(
+                "Контроль", names, key="repo_period_control",
+                index=next((i for i, n in enumerate(names) if catalog[n].team == TEAM_PENTEST), 0),
+            )
+            spans = get_task_index(repo).overlapping(start, end, task=control)
+            st.caption(f"«{control}» идёт в периоде в планах: {len(spans)}.")
+            if spans:
+                st.dataframe(
+                    [{"№": s.plan_id, "ДЗО": s.dzo_name, "Начало": s.start.strftime("%d.%m.%Y"),
+                      "Окончание": s.end.strftime("%d.%m.%Y")}
+                     for s in spans[:200]],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+            overlaps = repo.overlapping(start, end, plan_id=loaded[0] if loaded else None, limit=200)
+            st.caption(
+                f"Пересечения пентестов{' открытого плана' if loaded else ''}: "
+                f"{len(overlaps)}{' и более' if len(overlaps) == 200 else ''}."
+            )
+            if overlaps:
+                st.dataframe(
+                    [{"ДЗО": o.dzo_name, "Задача": o.task, "Пересекается с ДЗО": o.other_dzo_name,
+                      "Задача ДЗО": o.other_task, "С": o.start.strftime("%d.%m.%Y"), "По": o.end.strftime("%d.%m.%Y")}
+                     for o in overlaps],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+
+# --- 7. ИМПОРТ ИЗ EXCEL ---
+# Книги, выгруженные кнопкой «Скачать план в Excel» (и книги-портфели):
+# одна — в форму, несколько — в хранилище или в пакетное планирование.
+
+def import_to_form():
+    uploaded = st.session_state.get("import_file")
+    st.session_state.pop("import_messages", None)
+    if uploaded is None:
+        return
+    try:
+        imported = read_plan_workbook(io.BytesIO(uploaded.getvalue()), uploaded.name)[0]
+    except ValueError as e:
+        st.session_state["import_messages"] = ("error", [str(e)])
+        return
+    fill_form(imported.input, {k: getattr(imported.meta, k) for k in META_KEYS})
+    st.session_state["import_messages"] = ("warning", list(imported.warnings))
 
-    # --- ДИАГРАММА ГАНТА ---
-    st.subheader("Диаграмма Ганта")
-
-    df_gantt = df.copy()
-    # Plotly ожидает конец интервала как правую границу, поэтому +1 день
-    df_gantt["Окончание_Plotly"] = df_gantt["Окончание"] + timedelta(days=1)
-
-    fig = px.timeline(
-        df_gantt.sort_values(by="Начало"),
-        x_start="Начало",
-        x_end="Окончание_Plotly",
-        y="Задача",
-        color="Категория",
-        text="Длительность (раб. дн)",
-        color_discrete_map={
-            "Опросные листы": "#7700ff",
-            "Инструментальные проверки": "#fe4f13",
-            "Информация и отчет": "#0f1828",
-        },
-    )
 
-    fig.update_yaxes(autorange="reversed")
-    fig.update_layout(
-        xaxis_title="Дата",
-        yaxis_title=None,
-        height=600,
-        bargap=0.2,
-    )
-    fig.update_traces(textposition="inside", insidetextanchor="middle")
+st.markdown("<br>", unsafe_allow_html=True)
 
-    st.plotly_chart(fig, use_container_width=True)
+with st.expander("Импорт плана из Excel"):
+    st.file_uploader("Книга плана (.xlsx)", type=["xlsx", "xlsm"], key="import_file")
+    st.button("Заполнить форму", key="import_fill", on_click=import_to_form,
+              disabled=st.session_state.get("import_file") is None)
+    kind, messages = st.session_state.get("import_messages", ("warning", []))
+    for message in messages:
+        getattr(st, kind)(message)
+
+    st.markdown("**Импорт папки книг**")
+    import_files = st.file_uploader(
+        "Папка с книгами планов", type=["xlsx", "xlsm"], accept_multiple_files="directory", key="import_files"
+    )
+    c1, c2, _ = st.columns([1, 1, 2])
+    to_repo = c1.button("В хранилище", key="import_to_repo", disabled=not import_files or repo is None)
+    to_batch = c2.button("В пакетное планирование", key="import_to_batch", disabled=not import_files)
+    if to_repo or to_batch:
+        import_bar = st.progress(0.0, text="Чтение книг...")
+        with profiler.section("import.workbooks"):
+            imported = import_workbooks(
+                [(f.name, f.getvalue()) for f in import_files],
+                progress=lambda done, total: import_bar.progress(done / total, text=f"Прочитано книг: {done}/{total}"),
+            )
+        messages = [("error", e.message) for e in imported.errors]
+        messages += [("warning", f"{p.source}: {w}") for p in imported.plans for w in p.warnings]
+        if imported.plans and to_repo:
+            saved = save_imported(imported.plans, repo)
+            messages.append(("success", f"Сохранено в хранилище планов: {len(saved)} "
+                                        f"(чтение книг {imported.elapsed:.2f} с)."))
+        elif imported.plans:
+            batch_table = batch_frame(imported.plans)
+            try:
+                batch_result = run_batch(batch_table)
+            except ValueError as e:
+                messages.append(("error", str(e)))
+            else:
+                st.session_state["batch_table"] = batch_table
+                st.session_state.pop("batch_leveling", None)
+                st.session_state["batch_xlsx"] = write_result(batch_result)
+                st.session_state["batch_timeline"] = timeline_data(batch_result.rows)
+                st.session_state["batch_stats"] = (
+                    len(batch_result.summary), len(batch_result.rows), batch_result.errors, batch_result.elapsed
+                )
+                st.session_state.pop("batch_archive_message", None)
+                messages.append(("success", f"Планов: {len(imported.plans)} — результат в разделе пакетного "
+                                            "планирования (явные даты начала и порядок контролей ДЗО пакетный "
+                                            "формат не передаёт)."))
+        st.session_state["import_many_messages"] = messages
+        if to_batch and imported.plans:
+            st.rerun()  # раздел пакетного планирования выше — показать его результат
+    for kind, message in st.session_state.get("import_many_messages", []):
+        getattr(st, kind)(message)
+
+
+# --- ЗАВЕРШЕНИЕ ПРОГОНА И ПАНЕЛЬ ПРОФИЛИРОВАНИЯ ---
+if profiler.enabled:
+    from planner.memory import session_memory
+
+    profiler.record_size("session.bytes", sum(size for _, size in session_memory(st.session_state.items())))
+profiler.end_run()
+
+if profiler.enabled:
+    with st.sidebar.expander("⏱ Профилирование", expanded=True):
+        st.caption(
+            f"Сессия {profiler.session_id}, прогонов: {profiler.runs}. "
+            "Время — мс, размеры — байт; перезапуски фрагментов обновят таблицу при следующем полном прогоне."
+        )
+        st.dataframe(profiler.summary(), use_container_width=True, hide_index=True)
+        st.markdown("**Кэши**")
+        st.dataframe(
+            [c.stats() for c in (schedule_cache, workbook_cache, figure_cache, risk_cache, jobs.store)],
+            use_container_width=True,
+            hide_index=True,
+        )
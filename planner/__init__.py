@@ -0,0 +1,3 @@
+"""
+Расчётное ядро плана проведения контроля ИБ (без зависимости от Streamlit).
+"""
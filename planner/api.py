@@ -0,0 +1,345 @@
+"""
+HTTP-сервис планирования (FastAPI): тот же расчёт, что на странице, для
+внешних систем (заявки, GRC).
+
+    GET  /health              — проверка живости
+    GET  /controls            — справочник контролей
+    POST /plans               — один план -> JSON
+    POST /plans/batch         — {"plans": [...]} -> {"plans": [...], "errors": [...]}
+    POST /plans/xlsx          — план в Excel (как кнопка на странице)
+    POST /plans/gantt.svg|png — диаграмма Ганта (planner.render)
+
+Вход плана: {"dzo_name": "...", "info_date": "2025-03-01", "controls":
+[{"name": "...", "enabled": true, "dur": 5, "start": null, "order": 1}]};
+dur/start/order можно не указывать — тогда по справочнику и правилам плана.
+
+Расчёт (CPU) выполняется вне цикла событий: небольшие запросы — в пуле
+потоков, крупные пакеты — частями в пуле процессов. Ответы кэшируются по
+телу запроса, рассчитанные планы — по входу плана, поэтому повторяющиеся
+запросы и одинаковые планы внутри пакета не пересчитываются.
+
+Запуск:
+    python -m planner.api --port 8000 --workers 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import lru_cache
+
+from pydantic import BaseModel, Field, ValidationError
+
+from planner.batch import MIN_PARALLEL_PLANS
+from planner.cache import LRUCache, fingerprint, workbook_cache
+from planner.catalog import get_catalog
+from planner.engine import ControlInput, PlanInput, schedule, validate_controls
+
+MAX_BATCH_PLANS = 10_000
+JSON_MIME = "application/json"
+
+# Кэши процесса: готовые ответы по телу запроса и рассчитанные планы по входу.
+# Ответы крупнее MAX_CACHED_RESPONSE не кэшируются — память кэша ограничена
+# maxsize × MAX_CACHED_RESPONSE (~128 МБ)
+MAX_CACHED_RESPONSE = 256 * 1024
+response_cache = LRUCache(maxsize=512, name="api_responses")
+plan_cache = LRUCache(maxsize=65536, name="api_plans")
+
+
+# --- МОДЕЛИ ЗАПРОСА ---
+
+class ControlModel(BaseModel):
+    name: str
+    enabled: bool = True
+    dur: int | None = Field(None, ge=1)
+    start: date | None = None
+    order: int | None = Field(None, ge=1)
+
+
+class PlanRequest(BaseModel):
+    dzo_name: str = ""
+    info_date: date
+    controls: list[ControlModel] = []
+
+
+class BatchRequest(BaseModel):
+    plans: list[PlanRequest] = Field(max_length=MAX_BATCH_PLANS)
+
+
+class ExportRequest(PlanRequest):
+    """
+    План для выгрузки в Excel: плюс текстовые поля формы (planner.export.PlanMeta).
+    """
+    goals: str = ""
+    objects: str = ""
+    group_rt: str = ""
+    group_dzo: str = ""
+
+
+@lru_cache(maxsize=65536)
+def _control_input(name: str, enabled: bool, dur, start, order) -> ControlInput:
+    # Настройки контролей в пакетах сильно повторяются — одинаковые объекты
+    # создаются один раз (заметная доля разбора крупного пакета)
+    return ControlInput(name, enabled, dur, start, order)
+
+
+def plan_input(req: PlanRequest) -> PlanInput:
+    """
+    PlanInput по запросу; ValueError со всеми ошибками входа.
+    """
+    controls = tuple(_control_input(c.name, c.enabled, c.dur, c.start, c.order) for c in req.controls)
+    errors = validate_controls(controls)
+    if errors:
+        raise ValueError("; ".join(errors))
+    return PlanInput(dzo_name=req.dzo_name, info_date=req.info_date, controls=controls)
+
+
+# --- РАСЧЁТ ---
+
+def plan_payload(plan) -> dict:
+    """
+    План в JSON-совместимом виде (даты сериализует orjson).
+    """
+    return {
+        "dzo_name": plan.input.dzo_name,
+        "info_date": plan.input.info_date,
+        "overall_end": plan.overall_end,
+        "critical_path": plan.critical_path,
+        "tasks": [
+            {"name": t.name, "category": t.category, "start": t.start, "end": t.end,
+             "duration": t.duration, "slack": t.slack, "critical": t.critical}
+            for t in plan.tasks
+        ],
+    }
+
+
+def _payload_or_error(pi: PlanInput) -> dict:
+    try:
+        return plan_payload(schedule(pi))
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+def _schedule_payloads(inputs: list) -> list[dict]:
+    """
+    Выполняется в пуле (потоков или процессов): планы -> payload или {"error"}.
+    """
+    return [_payload_or_error(pi) for pi in inputs]
+
+
+async def schedule_inputs(inputs: list, pool=None) -> list[dict]:
+    """
+    Payload для каждого входа; рассчитываются только отсутствующие в plan_cache
+    и только один раз для одинаковых входов.
+    """
+    catalog_fp = get_catalog().fingerprint
+    results = [plan_cache.get((catalog_fp, pi)) for pi in inputs]
+    todo = list(dict.fromkeys(pi for pi, r in zip(inputs, results) if r is None))
+    if todo:
+        if pool is not None and len(todo) >= MIN_PARALLEL_PLANS:
+            loop = asyncio.get_running_loop()
+            n = max(getattr(pool, "_max_workers", 1), 1)
+            size = -(-len(todo) // n)
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(pool, _schedule_payloads, todo[i:i + size]) for i in range(0, len(todo), size)
+            ))
+            computed = [p for part in parts for p in part]
+        else:
+            from starlette.concurrency import run_in_threadpool
+
+            computed = await run_in_threadpool(_schedule_payloads, todo)
+        fresh = dict(zip(todo, computed))
+        for pi, payload in fresh.items():
+            if "error" not in payload:
+                plan_cache.put((catalog_fp, pi), payload)
+        results = [r if r is not None else fresh[pi] for pi, r in zip(inputs, results)]
+    return results
+
+
+# --- ПРИЛОЖЕНИЕ ---
+
+def _request_key(path: str, body: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(get_catalog().fingerprint.encode())
+    h.update(path.encode())
+    h.update(body)
+    return h.hexdigest()
+
+
+def create_app(pool_workers: int | None = None):
+    """
+    Приложение FastAPI. pool_workers — процессы для крупных пакетов
+    (по умолчанию — все ядра; 0 — считать только в пуле потоков).
+    """
+    import orjson
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import Response
+
+    @asynccontextmanager
+    async def lifespan(app):
+        workers = (os.cpu_count() or 1) if pool_workers is None else pool_workers
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            app.state.pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            app.state.pool = None
+        yield
+        if app.state.pool is not None:
+            app.state.pool.shutdown(cancel_futures=True)
+
+    app = FastAPI(title="Планирование контроля ИБ", lifespan=lifespan)
+
+    def json_response(data) -> Response:
+        return Response(orjson.dumps(data), media_type=JSON_MIME)
+
+    def parse(model, body: bytes):
+        try:
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            raise HTTPException(422, detail=orjson.loads(e.json(include_url=False)))
+
+    def single_input(req: PlanRequest) -> PlanInput:
+        try:
+            return plan_input(req)
+        except ValueError as e:
+            raise HTTPException(422, detail=str(e))
+
+    async def cached(request: Request, build) -> Response:
+        """
+        Ответ из кэша по телу запроса или build(body) -> (bytes, media_type).
+        """
+        body = await request.body()
+        key = _request_key(request.url.path, body)
+        hit = response_cache.get(key)
+        if hit is None:
+            hit = await build(body)
+            if len(hit[0]) <= MAX_CACHED_RESPONSE:
+                response_cache.put(key, hit)
+        return Response(hit[0], media_type=hit[1])
+
+    @app.get("/health")
+    async def health():
+        return json_response({"status": "ok", "catalog": get_catalog().fingerprint})
+
+    @app.get("/controls")
+    async def controls():
+        catalog = get_catalog()
+        return json_response([
+            {"name": c.name, "category": c.category, "dur": c.dur, "dur_min": c.dur_min, "dur_max": c.dur_max,
+             "team": c.team, "default_order": c.default_order if c.name in catalog.dzo else None}
+            for c in (catalog[name] for name in catalog.input_controls)
+        ])
+
+    @app.post("/plans")
+    async def plan(request: Request):
+        async def build(body):
+            pi = single_input(parse(PlanRequest, body))
+            payload = (await schedule_inputs([pi]))[0]
+            if "error" in payload:
+                raise HTTPException(422, detail=payload["error"])
+            return orjson.dumps(payload), JSON_MIME
+
+        return await cached(request, build)
+
+    @app.post("/plans/batch")
+    async def plans_batch(request: Request):
+        async def build(body):
+            t0 = time.perf_counter()
+            req = parse(BatchRequest, body)
+            inputs, index, errors = [], [], []
+            for i, p in enumerate(req.plans):
+                try:
+                    inputs.append(plan_input(p))
+                    index.append(i)
+                except ValueError as e:
+                    errors.append({"index": i, "dzo_name": p.dzo_name, "error": str(e)})
+            plans = [None] * len(req.plans)
+            for i, payload in zip(index, await schedule_inputs(inputs, request.app.state.pool)):
+                if "error" in payload:
+                    errors.append({"index": i, "dzo_name": req.plans[i].dzo_name, "error": payload["error"]})
+                else:
+                    plans[i] = payload
+            errors.sort(key=lambda e: e["index"])
+            data = {"plans": plans, "errors": errors, "elapsed": time.perf_counter() - t0}
+            return orjson.dumps(data), JSON_MIME
+
+        return await cached(request, build)
+
+    async def export(request: Request, render, media_type: str) -> Response:
+        from starlette.concurrency import run_in_threadpool
+
+        req = parse(ExportRequest, await request.body())
+        pi = single_input(req)
+
+        def build():
+            try:
+                return render(schedule(pi), req)
+            except ValueError as e:
+                raise HTTPException(422, detail=str(e))
+
+        key = fingerprint(get_catalog().fingerprint, request.url.path, pi, req.model_dump())
+        data = workbook_cache.get(key)
+        if data is None:
+            data = await run_in_threadpool(build)
+            workbook_cache.put(key, data)
+        return Response(data, media_type=media_type)
+
+    @app.post("/plans/xlsx")
+    async def plan_xlsx(request: Request):
+        from planner.export import EXCEL_MIME, PlanMeta, build_plan_workbook
+
+        def render(plan, req):
+            meta = PlanMeta(req.dzo_name, req.info_date, req.goals, req.objects, req.group_rt, req.group_dzo)
+            return build_plan_workbook(plan, meta)
+
+        return await export(request, render, EXCEL_MIME)
+
+    @app.post("/plans/gantt.svg")
+    async def plan_svg(request: Request):
+        from planner.render import gantt_svg
+
+        return await export(request, lambda plan, req: gantt_svg(plan).encode("utf-8"), "image/svg+xml")
+
+    @app.post("/plans/gantt.png")
+    async def plan_png(request: Request):
+        from planner.render import gantt_png
+
+        return await export(request, lambda plan, req: gantt_png(plan), "image/png")
+
+    return app
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP-сервис планирования контроля ИБ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="процессы uvicorn")
+    parser.add_argument("--pool-workers", type=int, default=None,
+                        help="процессы для крупных пакетов в каждом процессе uvicorn (0 — без пула)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    if args.pool_workers is not None:
+        os.environ["PLANNER_API_POOL_WORKERS"] = str(args.pool_workers)
+    uvicorn.run("planner.api:app_factory", factory=True, host=args.host, port=args.port,
+                workers=args.workers, log_level="warning")
+
+
+def app_factory():
+    """
+    Фабрика для uvicorn (--factory): настройки — из окружения, чтобы их
+    получили все процессы uvicorn.
+    """
+    workers = os.environ.get("PLANNER_API_POOL_WORKERS")
+    return create_app(None if workers is None else int(workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""
+Пакетное планирование: расчёт планов для множества ДЗО из одной таблицы CSV/Excel.
+
+Формат входной таблицы:
+    ДЗО | Дата начала | <наименование контроля> | <наименование контроля> | ...
+Ячейка контроля: пусто / «НЕТ» / 0 — контроль выключен, «ДА» — включён
+с длительностью из справочника, целое число — включён с этой длительностью
+(раб. дн). Правила расчёта — те же, что на странице (planner.engine.schedule).
+
+Запуск из командной строки:
+    python -m planner.batch input.xlsx -o result.xlsx --workers 4
+    python -m planner.batch input.xlsx --charts charts/ --chart-format png
+    python -m planner.batch input.xlsx -o result.parquet --archive portfolio_archive/
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date
+
+from planner.catalog import get_catalog
+from planner.engine import ControlInput, PlanInput, schedule
+from planner.workdays import get_calendar
+
+COL_DZO = "ДЗО"
+COL_START = "Дата начала"
+
+# Ниже этого числа планов пул процессов не окупает накладные расходы
+MIN_PARALLEL_PLANS = 2000
+MIN_PARALLEL_CHARTS = 200   # рисование дороже расчёта — пул окупается раньше
+
+CHART_FORMATS = ("svg", "png")
+
+RESULT_COLUMNS = ["ДЗО", "Задача", "Категория", "Начало", "Окончание", "Длительность (раб. дн)"]
+SUMMARY_COLUMNS = ["ДЗО", "Дата начала контроля ИБ", "Планируемая дата завершения", "Число задач"]
+ERROR_COLUMNS = ["Строка", "ДЗО", "Ошибка"]
+
+
+@dataclass(frozen=True)
+class BatchError:
+    row: int  # номер строки входной таблицы (с 1, без заголовка)
+    dzo_name: str
+    message: str
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    rows: list          # строки RESULT_COLUMNS по всем ДЗО
+    summary: list       # (ДЗО, дата начала, дата завершения, число задач)
+    errors: list        # BatchError
+    elapsed: float      # секунды
+
+
+# --- РАЗБОР ВХОДНОЙ ТАБЛИЦЫ ---
+
+def input_columns() -> list[str]:
+    """
+    Столбцы входной таблицы: ДЗО, дата начала и включаемые контроли справочника.
+    """
+    return [COL_DZO, COL_START, *get_catalog().input_controls]
+
+
+def _template_row() -> dict:
+    catalog = get_catalog()
+    example = catalog.instrumental[:1] + catalog.dzo[:2]
+    row = {COL_DZO: "ДЗО-пример", COL_START: date.today().strftime("%d.%m.%Y")}
+    row.update({name: "ДА" if name in example else "" for name in catalog.input_controls})
+    return row
+
+
+def template_frame():
+    """
+    Пустой шаблон входной таблицы (одна строка-пример).
+    """
+    import pandas as pd
+
+    return pd.DataFrame([_template_row()], columns=input_columns())
+
+
+def template_csv() -> bytes:
+    """
+    Тот же шаблон в CSV («;», utf-8 с BOM для Excel) — без pandas, для страницы.
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=input_columns(), delimiter=";", lineterminator="\n")
+    writer.writeheader()
+    writer.writerow(_template_row())
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def read_table(source, filename: str = ""):
+    """
+    Читает входную таблицу из CSV или Excel (путь или файловый объект).
+    """
+    import pandas as pd
+
+    name = (filename or str(source)).lower()
+    if name.endswith((".xlsx", ".xlsm", ".xls")):
+        return pd.read_excel(source, dtype=str)
+    return pd.read_csv(source, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+
+
+def table_fingerprint(df) -> str:
+    """
+    Отпечаток содержимого входной таблицы (ключ кэша выгрузок по ней).
+    """
+    import pandas as pd
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _parse_cell(value, name: str):
+    """
+    (enabled, dur) по значению ячейки контроля.
+    """
+    if value is None:
+        return False, None
+    text = str(value).strip().upper()
+    if text in ("", "NAN", "НЕТ", "NO", "0", "-"):
+        return False, None
+    if text in ("ДА", "YES", "+", "X", "Х"):
+        return True, None
+    try:
+        number = float(text.replace(",", "."))
+    except ValueError:
+        raise ValueError(f"«{name}»: ожидается ДА/НЕТ или длительность, получено «{value}»")
+    if not number.is_integer():
+        raise ValueError(f"«{name}»: длительность должна быть целым числом раб. дн, получено «{value}»")
+    dur = int(number)
+    if dur < 0:
+        raise ValueError(f"«{name}»: отрицательная длительность {dur}")
+    return dur > 0, dur or None
+
+
+def _parse_dates(column):
+    """
+    Даты начала разбираются сразу всем столбцом (поэлементный разбор на 10k строк заметно дольше).
+    """
+    import pandas as pd
+
+    parsed = pd.to_datetime(column.astype(str).str.strip(), format="%d.%m.%Y", errors="coerce")
+    fallback = parsed.isna()
+    if fallback.any():
+        parsed[fallback] = pd.to_datetime(
+            column[fallback].astype(str).str.strip(), dayfirst=True, errors="coerce", format="mixed"
+        )
+    return [None if pd.isna(ts) else ts.date() for ts in parsed]
+
+
+def plan_inputs_from_frame(df):
+    """
+    Преобразует таблицу в список PlanInput. Строки с ошибками пропускаются
+    и возвращаются отдельным списком BatchError.
+    """
+    inputs, _, errors = _read_plan_inputs(df)
+    return inputs, errors
+
+
+def _read_plan_inputs(df):
+    """
+    -> (PlanInput, номера их строк во входной таблице, BatchError).
+    """
+    missing = [c for c in (COL_DZO, COL_START) if c not in df.columns]
+    if missing:
+        raise ValueError(f"Во входной таблице нет обязательных столбцов: {', '.join(missing)}")
+    catalog = get_catalog()
+    unknown = [c for c in df.columns if c not in (COL_DZO, COL_START) and c not in catalog]
+    if unknown:
+        raise ValueError(f"Неизвестные контроли в заголовке: {', '.join(map(str, unknown))}")
+
+    present = [name for name in catalog.input_controls if name in df.columns]
+    dates = _parse_dates(df[COL_START])
+    cal = get_calendar()
+    cells = {}  # значения ячеек сильно повторяются — разбираем каждое один раз
+    inputs, rows, errors = [], [], []
+    for i, (rec, info_date) in enumerate(zip(df.to_dict("records"), dates), start=1):
+        dzo_name = str(rec.get(COL_DZO) or "").strip()
+        try:
+            if not dzo_name or dzo_name.upper() == "NAN":
+                raise ValueError("не указано название ДЗО")
+            if info_date is None:
+                raise ValueError(f"некорректная дата начала «{rec.get(COL_START)}»")
+            if not cal.first_day <= info_date <= cal.last_day:
+                raise ValueError(
+                    f"дата начала {info_date.strftime('%d.%m.%Y')} вне диапазона производственного календаря "
+                    f"({cal.first_day.year}–{cal.last_day.year})"
+                )
+            controls = []
+            for name in present:
+                key = (name, rec.get(name))
+                if key not in cells:
+                    cells[key] = ControlInput(name, *_parse_cell(rec.get(name), name))
+                controls.append(cells[key])
+        except ValueError as e:
+            errors.append(BatchError(i, dzo_name, str(e)))
+            continue
+        inputs.append(PlanInput(dzo_name=dzo_name, info_date=info_date, controls=tuple(controls)))
+        rows.append(i)
+    return inputs, rows, errors
+
+
+# --- РАСЧЁТ ---
+
+def _schedule_or_error(plan_input: PlanInput):
+    """
+    -> (Plan, None) или (None, текст ошибки): ошибка одного плана (например,
+    выход за пределы календаря) не прерывает весь пакет.
+    """
+    try:
+        return schedule(plan_input), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def _schedule_chunk(inputs):
+    """
+    Выполняется в процессе-исполнителе: считает часть планов и возвращает
+    компактные кортежи (без объектов Plan — их дороже передавать между процессами).
+    Ошибки — (номер плана в части, текст).
+    """
+    rows, summary, failed = [], [], []
+    for j, plan_input in enumerate(inputs):
+        plan, error = _schedule_or_error(plan_input)
+        if error is not None:
+            failed.append((j, error))
+            continue
+        for t in plan.tasks:
+            rows.append((plan_input.dzo_name, t.name, t.category, t.start, t.end, t.duration))
+        summary.append((plan_input.dzo_name, plan_input.info_date, plan.overall_end, len(plan.tasks)))
+    return rows, summary, failed
+
+
+def schedule_many(inputs, workers: int | None = None, chunk_size: int = 500, progress=None):
+    """
+    Считает планы для списка PlanInput. При большом объёме — в пуле процессов
+    по частям chunk_size. progress(done, total) вызывается после каждой части.
+    Результат — в порядке входного списка; планы, которые не удалось
+    рассчитать, — в errors с номером плана во входном списке (с 1).
+    """
+    t0 = time.perf_counter()
+    total = len(inputs)
+    chunks = [inputs[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    results = [None] * len(chunks)
+    done = 0
+    if workers > 1 and total >= MIN_PARALLEL_PLANS:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_schedule_chunk, chunk): i for i, chunk in enumerate(chunks)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                results[i] = fut.result()
+                done += len(chunks[i])
+                if progress:
+                    progress(done, total)
+    else:
+        for i, chunk in enumerate(chunks):
+            results[i] = _schedule_chunk(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+
+    rows, summary, errors = [], [], []
+    for first, (chunk_rows, chunk_summary, failed) in zip(range(0, total, chunk_size), results):
+        rows.extend(chunk_rows)
+        summary.extend(chunk_summary)
+        errors.extend(BatchError(first + j + 1, inputs[first + j].dzo_name, msg) for j, msg in failed)
+    return BatchResult(rows=rows, summary=summary, errors=errors, elapsed=time.perf_counter() - t0)
+
+
+def run_batch(df, workers: int | None = None, progress=None) -> BatchResult:
+    inputs, input_rows, errors = _read_plan_inputs(df)
+    result = schedule_many(inputs, workers=workers, progress=progress)
+    # Номер плана во входном списке -> номер строки таблицы
+    errors += [BatchError(input_rows[e.row - 1], e.dzo_name, e.message) for e in result.errors]
+    errors.sort(key=lambda e: e.row)
+    return BatchResult(rows=result.rows, summary=result.summary, errors=errors, elapsed=result.elapsed)
+
+
+# --- ВЫГРУЗКА РЕЗУЛЬТАТА ---
+
+def result_frames(result: BatchResult):
+    import pandas as pd
+
+    summary_df = pd.DataFrame(result.summary, columns=SUMMARY_COLUMNS)
+    schedule_df = pd.DataFrame(result.rows, columns=RESULT_COLUMNS)
+    errors_df = pd.DataFrame([(e.row, e.dzo_name, e.message) for e in result.errors], columns=ERROR_COLUMNS)
+    return summary_df, schedule_df, errors_df
+
+
+def write_result(result: BatchResult, target=None) -> bytes | None:
+    """
+    Сводный результат: листы «Сводка», «График» и «Ошибки» (если есть).
+    target — путь к .xlsx/.csv/.parquet/.arrow; без него возвращаются байты xlsx.
+    Parquet и Arrow — только график, колоночной таблицей (planner.columnar).
+    """
+    from planner.export import new_workbook, write_table
+
+    ext = os.path.splitext(target)[1].lower().lstrip(".") if isinstance(target, str) else ""
+    if ext in ("parquet", "arrow"):
+        from planner.columnar import schedule_table, table_bytes, write_arrow
+        from planner.gantt import timeline_data
+
+        table = schedule_table(timeline_data(result.rows))
+        if ext == "arrow":
+            write_arrow(table, target)
+        else:
+            with open(target, "wb") as f:
+                f.write(table_bytes(table, ext))
+        return None
+
+    if ext == "csv":
+        _, schedule_df, _ = result_frames(result)
+        schedule_df.to_csv(target, index=False, encoding="utf-8-sig", date_format="%d.%m.%Y")
+        return None
+
+    workbook, fmt = new_workbook(target)
+    write_table(workbook, fmt, "Сводка", SUMMARY_COLUMNS, result.summary, [40, 22, 22, 14], date_cols=(1, 2))
+    write_table(workbook, fmt, "График", RESULT_COLUMNS, result.rows, [40, 40, 26, 14, 14, 14], date_cols=(3, 4))
+    if result.errors:
+        write_table(workbook, fmt, "Ошибки", ERROR_COLUMNS, [(e.row, e.dzo_name, e.message) for e in result.errors],
+                    [10, 40, 80])
+    workbook.close()
+    return workbook.filename.getvalue() if target is None else None
+
+
+def write_portfolio_book(df, target, progress=None) -> int:
+    """
+    Книга-портфель по входной таблице (planner.export.write_portfolio):
+    сводка, общий график и лист плана на каждое ДЗО. Возвращает число листов ДЗО.
+    """
+    from planner.export import write_portfolio
+
+    inputs, _ = plan_inputs_from_frame(df)
+    plans = [plan for plan, _ in map(_schedule_or_error, inputs) if plan is not None]
+    return write_portfolio(plans, target, progress=progress)
+
+
+def _chart_file_name(i: int, dzo_name: str, fmt: str) -> str:
+    safe = re.sub(r'[\\/:*?"<>|\s]+', "_", dzo_name).strip("._") or "ДЗО"
+    return f"{i:05d}_{safe[:80]}.{fmt}"
+
+
+def _render_chunk(args):
+    """
+    Выполняется в процессе-исполнителе: считает и рисует часть планов,
+    файлы пишет сам — через процессы передаются только счётчики.
+    """
+    from planner.render import gantt_png, gantt_svg
+
+    first, inputs, out_dir, fmt = args
+    written = 0
+    for i, plan_input in enumerate(inputs, start=first + 1):
+        plan, _ = _schedule_or_error(plan_input)
+        if plan is None or not plan.tasks:
+            continue
+        path = os.path.join(out_dir, _chart_file_name(i, plan_input.dzo_name, fmt))
+        if fmt == "svg":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(gantt_svg(plan))
+        else:
+            with open(path, "wb") as f:
+                f.write(gantt_png(plan))
+        written += 1
+    return written
+
+
+def write_charts(df, out_dir: str, fmt: str = "svg", workers: int | None = None,
+                 chunk_size: int = 200, progress=None) -> int:
+    """
+    Диаграммы Ганта всех планов таблицы в каталог out_dir (planner.render):
+    файл «<номер плана>_<ДЗО>.svg|png» на план. Возвращает число файлов.
+    """
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Формат диаграмм: {', '.join(CHART_FORMATS)}, получено {fmt!r}")
+    os.makedirs(out_dir, exist_ok=True)
+    inputs, _ = plan_inputs_from_frame(df)
+    total = len(inputs)
+    chunks = [(i, inputs[i:i + chunk_size], out_dir, fmt) for i in range(0, total, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    written = done = 0
+    if workers > 1 and total >= MIN_PARALLEL_CHARTS:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_render_chunk, chunk): len(chunk[1]) for chunk in chunks}
+            for fut in as_completed(futures):
+                written += fut.result()
+                done += futures[fut]
+                if progress:
+                    progress(done, total)
+    else:
+        for chunk in chunks:
+            written += _render_chunk(chunk)
+            done += len(chunk[1])
+            if progress:
+                progress(done, total)
+    return written
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное планирование контроля ИБ по таблице ДЗО")
+    parser.add_argument("input", help="входная таблица (.csv или .xlsx)")
+    parser.add_argument("-o", "--output", default="batch_plan.xlsx", help="результат (.xlsx, .csv, .parquet, .arrow)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию — все ядра)")
+    parser.add_argument("--portfolio", default=None, help="книга-портфель .xlsx: лист на каждое ДЗО")
+    parser.add_argument("--charts", default=None, help="каталог для диаграмм Ганта: файл на каждое ДЗО")
+    parser.add_argument("--chart-format", choices=CHART_FORMATS, default="svg", help="формат диаграмм")
+    parser.add_argument("--archive", default=None, help="каталог архива прогонов Parquet: дописать график прогона")
+    args = parser.parse_args(argv)
+
+    df = read_table(args.input)
+
+    def progress(done, total):
+        print(f"\rРассчитано планов: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    result = run_batch(df, workers=args.workers, progress=progress)
+    print(file=sys.stderr)
+    write_result(result, args.output)
+
+    print(
+        f"Планов: {len(result.summary)}, задач: {len(result.rows)}, ошибок: {len(result.errors)}, "
+        f"время расчёта: {result.elapsed:.2f} с -> {args.output}",
+        file=sys.stderr,
+    )
+    if args.portfolio:
+        t0 = time.perf_counter()
+        sheets = write_portfolio_book(df, args.portfolio)
+        print(f"Книга-портфель: листов ДЗО {sheets} за {time.perf_counter() - t0:.2f} с -> {args.portfolio}",
+              file=sys.stderr)
+    if args.archive:
+        from planner.columnar import append_run, schedule_table
+        from planner.gantt import timeline_data
+
+        run = append_run(schedule_table(timeline_data(result.rows)), args.archive)
+        print(f"Прогон {run} -> {args.archive}", file=sys.stderr)
+    if args.charts:
+        t0 = time.perf_counter()
+        n_charts = write_charts(df, args.charts, args.chart_format, workers=args.workers)
+        print(f"Диаграммы: {n_charts} за {time.perf_counter() - t0:.2f} с -> {args.charts}", file=sys.stderr)
+    for e in result.errors:
+        print(f"  строка {e.row} ({e.dzo_name or '—'}): {e.message}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Кэширование по отпечатку входных данных плана.
+
+fingerprint() даёт стабильный (одинаковый между процессами и перезапусками)
+ключ для неизменяемых входов; LRUCache — ограниченный кэш со счётчиками
+попаданий, промахов и вытеснений. Кэши модуля общие для всех сессий процесса.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime
+
+
+def _canonical(obj):
+    """
+    Приводит вход к детерминированному представлению (порядок ключей, даты в ISO).
+    """
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return (type(obj).__name__,) + tuple((f.name, _canonical(getattr(obj, f.name))) for f in fields(obj))
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return tuple(sorted((str(k), _canonical(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(_canonical(v) for v in obj)
+    if isinstance(obj, (set, frozenset)):
+        return tuple(sorted(_canonical(v) for v in obj))
+    return obj
+
+
+def fingerprint(*parts) -> str:
+    """
+    Стабильный отпечаток (blake2b, 128 бит) набора входов.
+    """
+    return hashlib.blake2b(repr(_canonical(parts)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш фиксированного размера.
+    """
+
+    def __init__(self, maxsize: int = 128, name: str = ""):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """
+        Значение из кэша или factory() с сохранением результата.
+        factory вызывается вне блокировки, чтобы долгие построения не блокировали другие сессии.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def values(self) -> list:
+        with self._lock:
+            return list(self._data.values())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Общие кэши процесса: расчёт плана, книга Excel, диаграмма Ганта и риск сроков
+schedule_cache = LRUCache(maxsize=1024, name="schedule")
+workbook_cache = LRUCache(maxsize=128, name="workbook")
+figure_cache = LRUCache(maxsize=128, name="figure")
+risk_cache = LRUCache(maxsize=128, name="risk")
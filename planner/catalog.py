@@ -0,0 +1,344 @@
+"""
+Справочник контролей ИБ: категории, длительности по умолчанию и порядок.
+
+Сами контроли хранятся в файле planner/data/controls.json (или YAML) и
+компилируются в неизменяемый Catalog с готовыми индексами: ключи виджетов,
+контроли по категориям, порядок по умолчанию, длительности и связи задач.
+get_catalog() возвращает общий для всех сессий каталог и перечитывает файл,
+когда меняется его mtime, — без перезапуска сервера.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+
+DEFAULT_CATALOG_PATH = Path(__file__).with_name("data") / "controls.json"
+CATALOG_VERSION = 1
+
+# Как часто (с) проверять mtime файла справочника
+RELOAD_CHECK_INTERVAL = 1.0
+
+CAT_DZO = "Опросные листы"
+CAT_INSTRUMENTAL = "Инструментальные проверки"
+CAT_INFO = "Информация и отчет"
+
+# Команды Ростелеком, которые ведут проверки сразу у нескольких ДЗО
+TEAM_PENTEST = "Пентест"
+TEAM_ANALYST = "Аналитики ИБ"
+
+PIB_NAME = "Проверка информации в Блоке ИБ"
+REPORT_NAME = "Подготовка и согласование Отчета"
+
+# --- ЗАВИСИМОСТИ ЗАДАЧ ---
+# Веха «дата начала контроля ИБ», ссылка на первый включённый контроль
+# категории и ссылка на все контроли категории (раскрывается при компиляции)
+PLAN_START = "Начало контроля ИБ"
+FIRST_OF = "first:"
+ALL_OF = "all:"
+
+# Включённые контроли этих категорий выполняются друг за другом (FS) в порядке _order
+SEQUENTIAL_CATEGORIES = (CAT_DZO,)
+
+# Связи задаются в разделе dependencies файла справочника записями
+# {"from", "to", "type": FS/SS, "lag": раб. дн} и компилируются в
+# (предшественник, последователь, тип связи, лаг).
+# Связи с выключенными контролями пропускаются; если ссылка FIRST_OF в роли
+# предшественника не нашла включённых контролей, вместо неё берётся PLAN_START.
+DEPENDENCY_TYPES = ("FS", "SS")
+
+# Запас к длительности проверки в БИБ: max(∑ ДЗО, ∑ БИБ) + 5
+PIB_EXTRA_DAYS = 5
+REPORT_DUR = 1
+
+# Команда участника группы — по ключевым словам в должности (без учёта регистра)
+TEAM_KEYWORDS = {
+    TEAM_PENTEST: ("пентест", "pentest", "проникновен", "сканирован", "уязвимост"),
+    TEAM_ANALYST: ("аналитик", "аудитор"),
+}
+
+CATEGORY_COLORS = {
+    CAT_DZO: "#7700ff",
+    CAT_INSTRUMENTAL: "#fe4f13",
+    CAT_INFO: "#0f1828",
+}
+
+
+def key_base_from_name(name: str) -> str:
+    return name.replace(" ", "_").replace('"', "")
+
+
+# --- СКОМПИЛИРОВАННЫЙ СПРАВОЧНИК ---
+
+@dataclass(frozen=True)
+class Control:
+    name: str
+    category: str
+    dur: int                 # длительность по умолчанию, раб. дн.
+    team: str | None         # команда Ростелеком (для выравнивания по ресурсам)
+    key_base: str            # основа ключей виджетов ({key_base}_check и т.д.)
+    position: int            # позиция в справочнике (с 0)
+    default_order: int       # порядок внутри категории по умолчанию (с 1)
+    dur_min: int | None = None   # диапазон длительности для оценки рисков сроков
+    dur_max: int | None = None   # (None — длительность считается точной)
+
+    @property
+    def dur_range(self) -> tuple[int, int, int] | None:
+        """
+        (минимум, наиболее вероятная, максимум) или None, если диапазон не задан.
+        """
+        if self.dur_min is None and self.dur_max is None:
+            return None
+        return (self.dur_min or self.dur, self.dur, self.dur_max or self.dur)
+
+
+@dataclass(frozen=True, eq=False)
+class Catalog:
+    """
+    Неизменяемый справочник. Сравнение и хэш — по объекту: после перечитывания
+    файла это новый каталог, и кэши, построенные по старому, не подходят.
+    """
+    version: int
+    fingerprint: str                  # отпечаток содержимого (для ключей кэшей)
+    controls: MappingProxyType        # имя -> Control, в порядке справочника
+    names: tuple[str, ...]            # порядок для формы, экспорта и графика
+    by_category: MappingProxyType     # категория -> имена в порядке справочника
+    dependencies: tuple               # связи задач (см. ЗАВИСИМОСТИ ЗАДАЧ)
+
+    def __contains__(self, name) -> bool:
+        return name in self.controls
+
+    def __getitem__(self, name: str) -> Control:
+        return self.controls[name]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def category(self, category: str) -> tuple[str, ...]:
+        return self.by_category.get(category, ())
+
+    @property
+    def dzo(self) -> tuple[str, ...]:
+        return self.category(CAT_DZO)
+
+    @property
+    def instrumental(self) -> tuple[str, ...]:
+        return self.category(CAT_INSTRUMENTAL)
+
+    @property
+    def info(self) -> tuple[str, ...]:
+        return self.category(CAT_INFO)
+
+    @property
+    def input_controls(self) -> tuple[str, ...]:
+        """
+        Контроли, которые пользователь включает сам (ДЗО и инструментальные).
+        """
+        return self.dzo + self.instrumental
+
+
+def compile_catalog(data: dict) -> Catalog:
+    """
+    Проверяет содержимое файла справочника и строит индексы.
+    Ошибки — ValueError с перечнем всех найденных проблем.
+    """
+    version = data.get("version")
+    if version != CATALOG_VERSION:
+        raise ValueError(f"Справочник контролей: неподдерживаемая версия {version!r} (ожидается {CATALOG_VERSION})")
+
+    errors = []
+    controls, key_bases = {}, {}
+    counts = {}
+    for i, rec in enumerate(data.get("controls") or [], start=1):
+        name = str(rec.get("name") or "").strip()
+        cat, dur, team = rec.get("cat"), rec.get("dur"), rec.get("team")
+        if not name:
+            errors.append(f"запись {i}: нет наименования")
+            continue
+        if name in controls:
+            errors.append(f"«{name}»: повторяется")
+            continue
+        if cat not in CATEGORY_COLORS:
+            errors.append(f"«{name}»: неизвестная категория {cat!r}")
+            continue
+        if not isinstance(dur, int) or isinstance(dur, bool) or dur < 1:
+            errors.append(f"«{name}»: длительность должна быть целым числом ≥ 1 (получено {dur!r})")
+            continue
+        if team is not None and team not in TEAM_KEYWORDS:
+            errors.append(f"«{name}»: неизвестная команда {team!r}")
+            continue
+        dur_min, dur_max = rec.get("dur_min"), rec.get("dur_max")
+        if any(v is not None and (not isinstance(v, int) or isinstance(v, bool) or v < 1) for v in (dur_min, dur_max)):
+            errors.append(f"«{name}»: границы длительности должны быть целыми числами ≥ 1")
+            continue
+        if not (dur_min or dur) <= dur <= (dur_max or dur):
+            errors.append(f"«{name}»: длительность {dur} вне диапазона {dur_min}–{dur_max}")
+            continue
+        kb = key_base_from_name(name)
+        if kb in key_bases:
+            errors.append(f"«{name}»: ключ виджетов совпадает с «{key_bases[kb]}»")
+            continue
+        key_bases[kb] = name
+        counts[cat] = counts.get(cat, 0) + 1
+        controls[name] = Control(name, cat, dur, team, kb, len(controls), counts[cat], dur_min, dur_max)
+
+    for name in (PIB_NAME, REPORT_NAME):
+        if name not in controls or controls[name].category != CAT_INFO:
+            errors.append(f"нет обязательной записи «{name}» в категории «{CAT_INFO}»")
+    if errors:
+        raise ValueError("Ошибки в справочнике контролей: " + "; ".join(errors))
+
+    by_category = {cat: tuple(n for n, c in controls.items() if c.category == cat) for cat in CATEGORY_COLORS}
+    dependencies = compile_dependencies(data.get("dependencies"), controls, by_category)
+    content = json.dumps(
+        [version, [(c.name, c.category, c.dur, c.team, c.dur_min, c.dur_max) for c in controls.values()],
+         dependencies],
+        ensure_ascii=False,
+    )
+    return Catalog(
+        version=version,
+        fingerprint=hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest(),
+        controls=MappingProxyType(controls),
+        names=tuple(controls),
+        by_category=MappingProxyType(by_category),
+        dependencies=dependencies,
+    )
+
+
+def _dependency_refs(ref, role: str, controls: dict, by_category: dict) -> tuple:
+    """
+    Ссылка записи связи -> имена вершин (ALL_OF раскрывается по категории).
+    """
+    if not isinstance(ref, str) or not ref:
+        raise ValueError(f"{role}: ожидается наименование задачи, получено {ref!r}")
+    if ref.startswith(FIRST_OF):
+        if ref[len(FIRST_OF):] not in SEQUENTIAL_CATEGORIES:
+            raise ValueError(f"{role}: «{ref}» — первый контроль есть только у категорий {SEQUENTIAL_CATEGORIES}")
+        return (ref,)
+    if ref.startswith(ALL_OF):
+        if ref[len(ALL_OF):] not in by_category:
+            raise ValueError(f"{role}: неизвестная категория в «{ref}»")
+        return by_category[ref[len(ALL_OF):]]
+    if ref != PLAN_START and ref not in controls:
+        raise ValueError(f"{role}: неизвестная задача «{ref}»")
+    return (ref,)
+
+
+def compile_dependencies(records, controls: dict, by_category: dict) -> tuple:
+    """
+    Раздел dependencies файла справочника -> ((предшественник, последователь,
+    тип, лаг), ...). Проверяются ссылки, типы и отсутствие циклов: контроли
+    последовательной категории считаются одной вершиной, так как их порядок
+    задаётся в плане.
+    """
+    if not records:
+        raise ValueError("Ошибки в справочнике контролей: нет раздела dependencies (связи задач)")
+    errors, edges = [], []
+    for i, rec in enumerate(records, start=1):
+        try:
+            if not isinstance(rec, dict):
+                raise ValueError(f"ожидается запись {{from, to, type, lag}}, получено {rec!r}")
+            kind, lag = rec.get("type", "FS"), rec.get("lag", 0)
+            if kind not in DEPENDENCY_TYPES:
+                raise ValueError(f"неизвестный тип связи {kind!r}")
+            if not isinstance(lag, int) or isinstance(lag, bool) or lag < 0:
+                raise ValueError(f"лаг должен быть целым числом ≥ 0 (получено {lag!r})")
+            preds = _dependency_refs(rec.get("from"), "from", controls, by_category)
+            succs = _dependency_refs(rec.get("to"), "to", controls, by_category)
+            if PLAN_START in succs:
+                raise ValueError(f"«{PLAN_START}» не может быть последователем")
+        except ValueError as e:
+            errors.append(f"связь {i}: {e}")
+            continue
+        edges.extend((p, s, kind, lag) for p in preds for s in succs)
+    if errors:
+        raise ValueError("Ошибки в справочнике контролей: " + "; ".join(errors))
+
+    from planner.graph import TaskGraph
+
+    def node(ref):
+        if ref.startswith(FIRST_OF):
+            return ref[len(FIRST_OF):]
+        category = controls[ref].category if ref in controls else None
+        return category if category in SEQUENTIAL_CATEGORIES else ref
+
+    nodes = (PLAN_START, *SEQUENTIAL_CATEGORIES, *(n for n in controls if node(n) == n))
+    contracted = [(node(p), node(s), kind, lag) for p, s, kind, lag in edges]
+    cyclic = [f"{p} -> {s}" for p, s, _, _ in contracted if p == s]
+    if cyclic:
+        raise ValueError("Ошибки в справочнике контролей: связь внутри последовательной категории: "
+                         + ", ".join(cyclic))
+    try:
+        TaskGraph(nodes, contracted)
+    except ValueError as e:
+        raise ValueError(f"Ошибки в справочнике контролей: {e}")
+    return tuple(edges)
+
+
+def load_catalog(path: str | Path = DEFAULT_CATALOG_PATH) -> Catalog:
+    """
+    Справочник из JSON или YAML (по расширению файла).
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        if path.suffix in (".yaml", ".yml"):
+            import yaml
+
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return compile_catalog(data or {})
+
+
+# --- ОБЩИЙ КАТАЛОГ С ПЕРЕЧИТЫВАНИЕМ ---
+# Для каждого файла хранится (каталог, время последней проверки, mtime прочитанной
+# версии файла, ошибка). Если изменённый файл не проходит проверку, продолжает
+# работать прежний каталог, а ошибка доступна через catalog_error(); следующая
+# попытка — после нового сохранения файла.
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path: str | Path = DEFAULT_CATALOG_PATH) -> Catalog:
+    key = str(path)
+    entry = _catalogs.get(key)
+    now = time.monotonic()
+    if entry is not None and now - entry[1] < RELOAD_CHECK_INTERVAL:
+        return entry[0]
+
+    with _catalogs_lock:
+        entry = _catalogs.get(key)
+        if entry is not None and now - entry[1] < RELOAD_CHECK_INTERVAL:
+            return entry[0]
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError as e:
+            if entry is None:
+                raise
+            _catalogs[key] = (entry[0], now, entry[2], f"Файл справочника недоступен: {e}")
+            return entry[0]
+        if entry is not None and entry[2] == mtime_ns:
+            _catalogs[key] = (entry[0], now, mtime_ns, entry[3])
+            return entry[0]
+        try:
+            catalog = load_catalog(key)
+        except (ValueError, OSError) as e:
+            if entry is None:
+                raise
+            _catalogs[key] = (entry[0], now, mtime_ns, str(e))
+            return entry[0]
+        _catalogs[key] = (catalog, now, mtime_ns, None)
+        return catalog
+
+
+def catalog_error(path: str | Path = DEFAULT_CATALOG_PATH) -> str | None:
+    """
+    Ошибка последнего перечитывания файла (None — файл прочитан успешно).
+    """
+    entry = _catalogs.get(str(path))
+    return entry[3] if entry else None
@@ -0,0 +1,247 @@
+"""
+Колоночная выгрузка графиков для BI: Apache Arrow (IPC) и Parquet.
+
+Таблица строится прямо из столбцов портфеля (planner.gantt.TimelineData):
+даты — date32 по тем же дням от 1970-01-01, ДЗО/задача/категория —
+словарные столбцы по кодам, без строк-объектов Python. Прогоны портфеля
+дописываются в каталог-архив Parquet с разбиением «run=<прогон>» (hive),
+который BI читает как один набор данных; файлы Arrow читаются отображением
+в память без копирования.
+
+    dzo, task, category — dictionary<int32, string>
+    start, end          — date32 (end включительно)
+    workdays            — int32, длительность в рабочих днях
+    revision            — int32, ревизия плана в хранилище (stored_schedule_table;
+                          null для пакетного расчёта — его планы не хранятся)
+    critical            — bool, задача на критическом пути
+"""
+
+import io
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from planner.catalog import CATEGORY_COLORS, get_catalog
+from planner.gantt import TimelineData, timeline_data
+
+DEFAULT_ARCHIVE_DIR = os.environ.get("PORTFOLIO_ARCHIVE_DIR", "portfolio_archive")
+PARQUET_COMPRESSION = "zstd"
+COLUMNAR_FORMATS = ("parquet", "arrow")
+COLUMNAR_MIME = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file"}
+
+RUN_PARTITION = "run"
+
+
+def schedule_schema():
+    import pyarrow as pa
+
+    names = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("dzo", names),
+        ("task", names),
+        ("category", names),
+        ("start", pa.date32()),
+        ("end", pa.date32()),
+        ("workdays", pa.int32()),
+        ("revision", pa.int32()),
+        ("critical", pa.bool_()),
+    ])
+
+
+def schedule_table(data: TimelineData, revision=None):
+    """
+    pyarrow.Table графика портфеля. revision — ревизия (число для всех
+    задач или массив по задачам), None — столбец из null. Столбцы дат и
+    кодов передаются в Arrow без копирования.
+    """
+    import pyarrow as pa
+
+    n = len(data)
+
+    def names(codes, values):
+        return pa.DictionaryArray.from_arrays(
+            pa.array(np.asarray(codes, dtype=np.int32)), pa.array(list(values), pa.string())
+        )
+
+    if revision is None:
+        revisions = pa.nulls(n, pa.int32())
+    else:
+        revisions = pa.array(np.broadcast_to(np.asarray(revision, dtype=np.int32), (n,)))
+    return pa.Table.from_arrays(
+        [
+            names(data.lane, data.lanes),
+            names(data.task, data.names),
+            names(data.category, CATEGORY_COLORS),
+            pa.array(data.start.astype(np.int32, copy=False)).view(pa.date32()),
+            pa.array(data.end.astype(np.int32, copy=False)).view(pa.date32()),
+            pa.array(data.duration.astype(np.int32, copy=False)),
+            revisions,
+            pa.array(data.critical.astype(np.bool_, copy=False)),
+        ],
+        schema=schedule_schema().with_metadata({
+            "catalog": get_catalog().fingerprint,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        }),
+    )
+
+
+def stored_schedule_table(repo, plan_ids=None):
+    """
+    pyarrow.Table задач текущих ревизий хранимых планов (всех или plan_ids)
+    с номером ревизии каждого плана — planner.repository.PlanRepository.
+    """
+    rows = repo.schedule_rows(plan_ids)
+    # Даты уже дни от 1970-01-01: timeline_data берёт их как datetime64[D]
+    data = timeline_data((r[1:7] for r in rows), critical=[r[7] for r in rows])
+    return schedule_table(data, revision=np.fromiter((r[0] for r in rows), dtype=np.int32, count=len(rows)))
+
+
+def _codes(column) -> tuple[tuple, np.ndarray]:
+    """
+    Словарь и коды столбца (словарного или строкового; из нескольких частей).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not pa.types.is_dictionary(column.type):
+        column = pc.dictionary_encode(column)
+    column = column.unify_dictionaries() if isinstance(column, pa.ChunkedArray) else pa.chunked_array([column])
+    if not column.num_chunks:
+        return (), np.zeros(0, dtype=np.int32)
+    values = tuple(column.chunk(0).dictionary.to_pylist())
+    codes = np.concatenate([c.indices.to_numpy(zero_copy_only=False) for c in column.chunks]).astype(np.int32)
+    return values, codes
+
+
+def _days(column) -> np.ndarray:
+    import pyarrow as pa
+
+    return column.cast(pa.date32()).cast(pa.int32()).to_numpy().astype(np.int32, copy=False)
+
+
+def timeline_from_table(table) -> TimelineData:
+    """
+    Столбцы портфеля по таблице schedule_table (из файла, архива или BI).
+    """
+    lanes, lane = _codes(table.column("dzo"))
+    names, task = _codes(table.column("task"))
+    categories, category = _codes(table.column("category"))
+    unknown = set(categories) - set(CATEGORY_COLORS)
+    if unknown:
+        raise ValueError(f"Неизвестные категории в таблице: {', '.join(sorted(unknown))}")
+    remap = np.array([list(CATEGORY_COLORS).index(c) for c in categories], dtype=np.int8)
+    return TimelineData(
+        lanes, names, lane, task, remap[category] if len(remap) else category.astype(np.int8),
+        _days(table.column("start")), _days(table.column("end")),
+        table.column("workdays").to_numpy().astype(np.int32, copy=False),
+        table.column("critical").to_numpy(zero_copy_only=False).astype(np.bool_),
+    )
+
+
+# --- ФАЙЛЫ ---
+
+def table_bytes(table, fmt: str) -> bytes:
+    """
+    Таблица в Parquet или Arrow IPC (для скачивания).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Неизвестный формат {fmt!r}, ожидается один из {COLUMNAR_FORMATS}")
+    sink = io.BytesIO()
+    if fmt == "parquet":
+        pq.write_table(table, sink, compression=PARQUET_COMPRESSION)
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def write_arrow(table, path: str) -> None:
+    """
+    Файл Arrow IPC без сжатия — читается read_arrow без копирования.
+    """
+    import pyarrow as pa
+
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def read_arrow(path: str):
+    """
+    Таблица из файла Arrow, отображённого в память: данные подгружаются
+    системой по мере обращения, чтение большого портфеля — доли секунды.
+    """
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+# --- АРХИВ ПРОГОНОВ (PARQUET С РАЗБИЕНИЕМ ПО ПРОГОНАМ) ---
+
+def _run_dir(root: str, run: str) -> str:
+    if not run or os.sep in run or "/" in run or run.startswith("."):
+        raise ValueError(f"Недопустимое имя прогона {run!r}")
+    return os.path.join(root, f"{RUN_PARTITION}={run}")
+
+
+def append_run(table, root: str = DEFAULT_ARCHIVE_DIR, run: str | None = None) -> str:
+    """
+    Дописывает таблицу в архив: новый файл в каталоге root/run=<run>/
+    (повторный вызов с тем же run добавляет ещё часть). -> имя прогона.
+    """
+    import pyarrow.parquet as pq
+
+    run = run or datetime.now().strftime("%Y%m%d-%H%M%S")
+    directory = _run_dir(root, run)
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{uuid.uuid4().hex}.parquet"
+    # Запись во временный файл с точкой в начале — читатели набора его пропускают
+    tmp = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, tmp, compression=PARQUET_COMPRESSION)
+    os.replace(tmp, os.path.join(directory, name))
+    return run
+
+
+def list_runs(root: str = DEFAULT_ARCHIVE_DIR) -> list[str]:
+    """
+    Прогоны архива, новые первыми.
+    """
+    prefix = f"{RUN_PARTITION}="
+    if not os.path.isdir(root):
+        return []
+    return sorted((e.name[len(prefix):] for e in os.scandir(root) if e.is_dir() and e.name.startswith(prefix)),
+                  reverse=True)
+
+
+def read_runs(root: str = DEFAULT_ARCHIVE_DIR, runs=None):
+    """
+    Таблица прогонов runs (по умолчанию — всех) со столбцом run — весь
+    архив как один набор данных.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(
+        root, format="parquet",
+        partitioning=ds.partitioning(pa.schema([(RUN_PARTITION, pa.string())]), flavor="hive"),
+    )
+    filter_ = None if runs is None else ds.field(RUN_PARTITION).isin(list(runs))
+    return dataset.to_table(filter=filter_)
+
+
+def read_run(run: str, root: str = DEFAULT_ARCHIVE_DIR):
+    """
+    Таблица одного прогона (все его части).
+    """
+    import pyarrow.parquet as pq
+
+    directory = _run_dir(root, run)
+    if not os.path.isdir(directory):
+        raise ValueError(f"Прогон {run} не найден в архиве {root}")
+    return pq.read_table(directory, memory_map=True)
@@ -0,0 +1,269 @@
+"""
+Расчёт плана проведения контроля ИБ без Streamlit.
+
+schedule(PlanInput) -> Plan — чистая функция: одинаковый вход всегда даёт
+одинаковый план, поэтому план можно кэшировать, считать параллельно и
+замерять вне страницы.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+
+from planner.catalog import (
+    CAT_DZO,
+    CAT_INSTRUMENTAL,
+    FIRST_OF,
+    PIB_EXTRA_DAYS,
+    PIB_NAME,
+    PLAN_START,
+    REPORT_DUR,
+    REPORT_NAME,
+    SEQUENTIAL_CATEGORIES,
+    Catalog,
+    get_catalog,
+)
+from planner.graph import FS, SS, CPMResult, TaskGraph, critical_path, critical_path_method
+from planner.workdays import WorkCalendar, get_calendar
+
+
+@dataclass(frozen=True)
+class ControlInput:
+    """
+    Настройки одного контроля.
+    dur=None — длительность из справочника; start=None — старт по правилам плана;
+    order=None — порядок по умолчанию (для контролей ДЗО).
+    """
+    name: str
+    enabled: bool = False
+    dur: int | None = None
+    start: date | None = None
+    order: int | None = None
+
+
+@dataclass(frozen=True)
+class PlanInput:
+    dzo_name: str
+    info_date: date
+    controls: tuple[ControlInput, ...] = ()
+
+    def control(self, name: str) -> ControlInput:
+        for c in self.controls:
+            if c.name == name:
+                return c
+        return ControlInput(name)
+
+
+@dataclass(frozen=True)
+class ScheduledTask:
+    name: str
+    category: str
+    start: date
+    end: date
+    duration: int
+    slack: int = 0          # резерв времени, раб. дн.
+    critical: bool = False  # на критическом пути
+
+
+@dataclass(frozen=True)
+class Plan:
+    input: PlanInput
+    tasks: tuple[ScheduledTask, ...]          # включённые задачи в порядке справочника
+    dzo_order: tuple[str, ...]                 # контроли ДЗО в текущем порядке
+    default_starts: dict = field(default_factory=dict, compare=False)  # старт по правилам (для новых строк)
+    total_dzo_dur: int = 0
+    total_instr_dur: int = 0
+    pib_dur: int = 0
+    critical_path: tuple[str, ...] = ()        # цепочка задач, определяющая окончание плана
+    cpm: CPMResult | None = field(default=None, compare=False, repr=False)
+    graph: TaskGraph | None = field(default=None, compare=False, repr=False)
+
+    def task(self, name: str) -> ScheduledTask | None:
+        for t in self.tasks:
+            if t.name == name:
+                return t
+        return None
+
+    @property
+    def overall_end(self) -> date | None:
+        return max((t.end for t in self.tasks), default=None)
+
+
+def default_order(name: str, catalog: Catalog | None = None) -> int:
+    """
+    Порядок контроля ДЗО по умолчанию (как в справочнике).
+    """
+    catalog = catalog or get_catalog()
+    return catalog[name].default_order if name in catalog and catalog[name].category == CAT_DZO else 999
+
+
+# Верхняя граница длительности (раб. дн, ~40 лет) и порядкового номера:
+# большее значение — заведомая опечатка
+MAX_CONTROL_VALUE = 9999
+
+
+def validate_controls(controls, catalog: Catalog | None = None) -> list[str]:
+    """
+    Пакетная проверка настроек контролей: длительность — целое ≥ 1,
+    порядок контроля ДЗО — целое ≥ 1 (оба не больше MAX_CONTROL_VALUE). Возвращает список ошибок (пустой — всё корректно).
+    """
+    catalog = catalog or get_catalog()
+    errors = []
+    for ci in controls:
+        if ci.name not in catalog:
+            errors.append(f"Неизвестный контроль «{ci.name}»")
+            continue
+        if ci.dur is not None and (int(ci.dur) != ci.dur or not 1 <= ci.dur <= MAX_CONTROL_VALUE):
+            errors.append(f"«{ci.name}»: длительность должна быть целым числом от 1 до {MAX_CONTROL_VALUE} "
+                          f"(получено {ci.dur})")
+        if ci.order is not None and (int(ci.order) != ci.order or not 1 <= ci.order <= MAX_CONTROL_VALUE):
+            errors.append(f"«{ci.name}»: порядковый номер должен быть целым числом от 1 до {MAX_CONTROL_VALUE} "
+                          f"(получено {ci.order})")
+    return errors
+
+
+def control_duration(ci: ControlInput, catalog: Catalog | None = None) -> int:
+    return int(ci.dur) if ci.dur is not None else (catalog or get_catalog())[ci.name].dur
+
+
+# --- СЕТЕВОЙ ГРАФ ПЛАНА ---
+# Правила плана заданы связями Catalog.dependencies; граф строится по набору
+# включённых контролей и порядку ДЗО и кэшируется по ним (и по каталогу).
+
+def _category_order(controls: dict, category: str, catalog: Catalog) -> tuple[str, ...]:
+    names = catalog.category(category)
+    orders = {
+        n: controls[n].order if n in controls and controls[n].order is not None else catalog[n].default_order
+        for n in names
+    }
+    return tuple(sorted(names, key=orders.__getitem__))
+
+
+@lru_cache(maxsize=4096)
+def _task_graph(enabled: tuple, sequences: tuple, catalog: Catalog) -> TaskGraph:
+    """
+    enabled — включённые задачи в порядке справочника;
+    sequences — ((категория, включённые контроли в порядке _order), ...).
+    """
+    first = {cat: names[0] for cat, names in sequences if names}
+    nodes = set(enabled)
+
+    def resolve(ref, as_pred):
+        if ref.startswith(FIRST_OF):
+            ref = first.get(ref[len(FIRST_OF):])
+            if ref is None:
+                return PLAN_START if as_pred else None
+        return ref if ref == PLAN_START or ref in nodes else None
+
+    edges = []
+    for _, names in sequences:
+        edges.extend((a, b, FS, 0) for a, b in zip(names, names[1:]))
+    for pred, succ, kind, lag in catalog.dependencies:
+        p, s = resolve(pred, True), resolve(succ, False)
+        if p is not None and s is not None:
+            edges.append((p, s, kind, lag))
+    return TaskGraph((PLAN_START,) + enabled, edges)
+
+
+def plan_graph(plan_input: PlanInput, catalog: Catalog | None = None) -> tuple[TaskGraph, dict]:
+    """
+    Граф задач плана (первая вершина — веха PLAN_START) и включённые контроли
+    {имя: ControlInput} без проверки в БИБ и отчета.
+    """
+    catalog = catalog or get_catalog()
+    info = catalog.info
+    controls = {ci.name: ci for ci in plan_input.controls if ci.enabled and ci.name not in info}
+    sequences = tuple(
+        (cat, tuple(n for n in _category_order(controls, cat, catalog) if n in controls))
+        for cat in SEQUENTIAL_CATEGORIES
+    )
+    enabled = tuple(name for name in catalog.names if name in info or name in controls)
+    return _task_graph(enabled, sequences, catalog), controls
+
+
+def schedule(plan_input: PlanInput, calendar: WorkCalendar | None = None, previous: "Plan | None" = None,
+             catalog: Catalog | None = None) -> Plan:
+    """
+    Прямой и обратный проход по графу задач (planner.graph) в индексах рабочих дней:
+    1. Контроли ДЗО идут последовательно в порядке _order: первый — от даты начала
+       контроля ИБ, каждый следующий — со следующего рабочего дня после предыдущего.
+    2. Инструментальные проверки стартуют в дату начала контроля ИБ.
+    3. Длительность проверки в Блоке ИБ = max(∑ ДЗО, ∑ БИБ) + 5 раб. дн.,
+       старт — следующий рабочий день после окончания первого выбранного контроля ДЗО
+       (если ДЗО не выбраны — после даты начала контроля ИБ).
+    4. Отчет стартует в следующий рабочий день после проверки и длится 1 раб. дн.
+    Явно заданная дата начала (ControlInput.start) имеет приоритет над связями.
+    previous — предыдущий план того же ДЗО: прямой проход пересчитает только
+    изменившиеся задачи и их последователей.
+    catalog — справочник контролей (по умолчанию общий, get_catalog()).
+    """
+    catalog = catalog or get_catalog()
+    cal = calendar or get_calendar(plan_input.dzo_name)
+    info_date = plan_input.info_date
+    graph, controls = plan_graph(plan_input, catalog)
+    enabled = graph.names[1:]
+
+    # Длительности и зафиксированные старты
+    durations = {name: control_duration(ci, catalog) for name, ci in controls.items()}
+    total_dzo_dur = sum(d for n, d in durations.items() if catalog[n].category == CAT_DZO)
+    total_instr_dur = sum(d for n, d in durations.items() if catalog[n].category == CAT_INSTRUMENTAL)
+    durations[PIB_NAME] = max(total_dzo_dur, total_instr_dur) + PIB_EXTRA_DAYS
+    durations[REPORT_NAME] = REPORT_DUR
+    # Веха: ef < es, если дата начала — нерабочий день (FS-последователь стартует в ближайший рабочий)
+    durations[PLAN_START] = 1 if cal.is_workday(info_date) else 0
+
+    literal_starts = {PLAN_START: info_date}
+    for name, ci in controls.items():
+        if ci.start:
+            literal_starts[name] = ci.start
+    fixed = {graph.index[name]: cal.index(d) for name, d in literal_starts.items()}
+
+    prev_cpm = previous.cpm if previous is not None else None
+    cpm = critical_path_method(graph, [durations[n] for n in graph.names], fixed, prev_cpm)
+
+    # Индексы -> даты. Старт по SS без лага наследует дату предшественника
+    # (дата начала контроля ИБ может быть выходным — как и раньше, она показывается как есть).
+    start_dates = {}
+    for v in graph.order:
+        name = graph.names[v]
+        bind = cpm.binding[v]
+        if name in literal_starts:
+            start_dates[v] = literal_starts[name]
+        elif bind is not None and bind[1] == SS and bind[2] == 0:
+            start_dates[v] = start_dates[bind[0]]
+        else:
+            start_dates[v] = cal.workday_at(cpm.es[v])
+
+    path = critical_path(graph, cpm)
+    tasks = []
+    for name in enabled:
+        v = graph.index[name]
+        end = cal.workday_at(cpm.ef[v]) if cpm.durations[v] > 0 else start_dates[v]
+        tasks.append(ScheduledTask(
+            name, catalog[name].category, start_dates[v], end, cpm.durations[v],
+            slack=cpm.slack(v), critical=cpm.is_critical(v),
+        ))
+
+    # Старт по правилам для всех контролей (и выключенных — на случай включения)
+    dzo_order = _category_order({ci.name: ci for ci in plan_input.controls}, CAT_DZO, catalog)
+    default_starts = {}
+    prev_ef = None
+    for name in dzo_order:
+        default_starts[name] = info_date if prev_ef is None else cal.workday_at(prev_ef + 1)
+        if name in graph.index:
+            prev_ef = cpm.ef[graph.index[name]]
+    for name in catalog.instrumental:
+        default_starts[name] = info_date
+
+    return Plan(
+        input=plan_input,
+        tasks=tuple(tasks),
+        dzo_order=dzo_order,
+        default_starts=default_starts,
+        total_dzo_dur=total_dzo_dur,
+        total_instr_dur=total_instr_dur,
+        pib_dur=durations[PIB_NAME],
+        critical_path=tuple(n for n in path if n != PLAN_START),
+        cpm=cpm,
+        graph=graph,
+    )
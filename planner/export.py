@@ -0,0 +1,330 @@
+"""
+Выгрузка планов в Excel (xlsxwriter).
+
+build_plan_workbook — книга одного плана (лист «Plan») для страницы.
+write_portfolio — книга-портфель по множеству ДЗО: «Сводка», «График»
+(все задачи) и по листу на ДЗО. Пишется потоково (constant_memory): строки
+сбрасываются во временные файлы по мере записи, в памяти — только текущая
+строка каждого листа. Диаграмма Ганта — средствами Excel: условное
+форматирование по столбцам недель (месяцев), ячейки сетки не записываются.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from io import BytesIO
+
+from planner.catalog import get_catalog
+from planner.engine import Plan
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Больше столбцов недель — сетка Ганта по месяцам
+MAX_GANTT_WEEKS = 104
+# Первый столбец сетки Ганта на листе плана (F, после пустого E)
+GANTT_COL = 5
+
+SUMMARY_COLUMNS = ["ДЗО", "Дата начала контроля ИБ", "Планируемая дата завершения", "Число задач",
+                   "Календарных дней"]
+SCHEDULE_COLUMNS = ["ДЗО", "Задача", "Категория", "Начало", "Окончание", "Длительность (раб. дн)", "Критическая"]
+PLAN_COLUMNS = ["Наименование контроля", "Включено", "Дата начала", "Дата завершения"]
+
+_SHEET_NAME_BAD = re.compile(r"[\[\]:*?/\\]")
+
+
+@dataclass(frozen=True)
+class PlanMeta:
+    """
+    Текстовые поля формы, которые попадают только в выгрузку.
+    """
+    dzo_name: str
+    info_date: date
+    goals: str = ""
+    objects: str = ""
+    group_rt: str = ""
+    group_dzo: str = ""
+
+
+@dataclass(frozen=True)
+class _Formats:
+    """
+    Форматы ячеек — создаются один раз на книгу и общие для всех листов.
+    """
+    bold: object
+    cell: object
+    cell_wrap: object
+    cell_center: object
+    cell_date: object
+    link: object
+    gantt_head: object
+    bar: object
+    bar_critical: object
+
+    @classmethod
+    def create(cls, workbook) -> "_Formats":
+        border = {"border": 1, "valign": "vcenter"}
+        return cls(
+            bold=workbook.add_format({"bold": True, "align": "center", **border}),
+            cell=workbook.add_format({"align": "left", **border, "valign": "top"}),
+            cell_wrap=workbook.add_format({"align": "left", "text_wrap": True, **border, "valign": "top"}),
+            cell_center=workbook.add_format({"align": "center", **border}),
+            cell_date=workbook.add_format({"align": "center", "num_format": "dd.mm.yyyy", **border}),
+            link=workbook.add_format({"font_color": "blue", "underline": 1}),
+            gantt_head=workbook.add_format(
+                {"num_format": "dd.mm.yy", "rotation": 90, "font_size": 8, "align": "center", **border}
+            ),
+            bar=workbook.add_format({"bg_color": "#5b8ff9"}),
+            bar_critical=workbook.add_format({"bg_color": "#f4664a"}),
+        )
+
+
+@lru_cache(maxsize=None)
+def _workbook_class():
+    """
+    Книга xlsxwriter с быстрой проверкой имён листов. Проверка переопределяет
+    внутренние методы xlsxwriter (версия закреплена в requirements.txt); если их
+    нет, используется обычный xlsxwriter.Workbook.
+    """
+    import xlsxwriter
+    from xlsxwriter.exceptions import DuplicateWorksheetName
+
+    if not hasattr(xlsxwriter.Workbook, "_check_sheetname"):
+        return xlsxwriter.Workbook
+
+    class Workbook(xlsxwriter.Workbook):
+        """
+        Уникальность имени листа проверяется по множеству имён: в xlsxwriter —
+        перебором всех листов, на книге с тысячами листов это O(N²).
+        """
+
+        def _check_sheetname(self, sheetname, is_chartsheet=False):
+            if not isinstance(getattr(self, "worksheets_objs", None), list):
+                return super()._check_sheetname(sheetname, is_chartsheet)
+            used = self.__dict__.setdefault("_used_sheetnames", set())
+            worksheets, self.worksheets_objs = self.worksheets_objs, []  # остальные проверки — как в xlsxwriter
+            try:
+                name = super()._check_sheetname(sheetname, is_chartsheet)
+            finally:
+                self.worksheets_objs = worksheets
+            if name.lower() in used:
+                raise DuplicateWorksheetName(f"Sheetname '{name}', with case ignored, is already in use.")
+            used.add(name.lower())
+            return name
+
+    return Workbook
+
+
+def new_workbook(target=None):
+    """
+    (книга, форматы). target — путь или поток: запись потоковая, через
+    временные файлы; без target — книга в памяти (для небольших выгрузок).
+    Даты без явного формата пишутся как dd.mm.yyyy.
+    """
+    workbook_class = _workbook_class()
+    options = {"default_date_format": "dd.mm.yyyy"}
+    if target is None:
+        workbook = workbook_class(BytesIO(), {**options, "in_memory": True})
+    else:
+        workbook = workbook_class(target, {**options, "constant_memory": True})
+    return workbook, _Formats.create(workbook)
+
+
+def write_table(workbook, fmt: _Formats, title: str, columns, records, widths, date_cols=()):
+    """
+    Лист-таблица: заголовок и строки записей целиком (write_row).
+    """
+    ws = workbook.add_worksheet(title)
+    for col, width in enumerate(widths):
+        ws.set_column(col, col, width, fmt.cell_date if col in date_cols else None)
+    ws.write_row(0, 0, columns, fmt.bold)
+    for r, rec in enumerate(records, start=1):
+        ws.write_row(r, 0, rec)
+    return ws
+
+
+# --- ДИАГРАММА ГАНТА В ЯЧЕЙКАХ ---
+
+def _gantt_periods(start: date, end: date) -> tuple[list[date], str]:
+    """
+    Начала периодов сетки и выражение конца периода по ячейке заголовка ({h}):
+    недели с понедельника, а для длинных планов — месяцы.
+    """
+    first = start - timedelta(days=start.weekday())
+    weeks = (end - first).days // 7 + 1
+    if weeks <= MAX_GANTT_WEEKS:
+        return [first + timedelta(weeks=i) for i in range(weeks)], "{h}+6"
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    return [
+        date(start.year + (start.month - 1 + i) // 12, (start.month - 1 + i) % 12 + 1, 1) for i in range(months)
+    ], "EOMONTH({h},0)"
+
+
+def _gantt_head(ws, fmt: _Formats, row: int, first_col: int, periods) -> None:
+    """
+    Заголовок сетки — даты начала периодов. При потоковой записи пишется
+    вместе с заголовком таблицы, до её строк.
+    """
+    ws.write_row(row, first_col, periods, fmt.gantt_head)
+    ws.set_column(first_col, first_col + len(periods) - 1, 2.5)
+
+
+def _gantt_bars(ws, fmt: _Formats, head_row: int, first_row: int, last_row: int, first_col: int,
+                periods, period_end: str, start_col: int, end_col: int, critical_col: int | None = None):
+    """
+    Полосы задач строк first_row..last_row: ячейка сетки закрашивается, если
+    задача идёт в периоде её столбца (заголовок — в строке head_row).
+    """
+    from xlsxwriter.utility import xl_col_to_name, xl_rowcol_to_cell
+
+    if last_row < first_row:
+        return
+    h = xl_rowcol_to_cell(head_row, first_col, row_abs=True)
+    row = first_row + 1
+    s, e = f"${xl_col_to_name(start_col)}{row}", f"${xl_col_to_name(end_col)}{row}"
+    bar = f"AND(ISNUMBER({s}),{s}<={period_end.format(h=h)},{e}>={h})"
+    cells = (first_row, first_col, last_row, first_col + len(periods) - 1)
+    if critical_col is not None:
+        critical = f'${xl_col_to_name(critical_col)}{row}="ДА"'
+        ws.conditional_format(*cells, {"type": "formula", "criteria": f"=AND({bar},{critical})",
+                                       "format": fmt.bar_critical, "stop_if_true": True})
+    ws.conditional_format(*cells, {"type": "formula", "criteria": f"={bar}", "format": fmt.bar})
+
+
+# --- ЛИСТ ПЛАНА ---
+
+def _write_plan_sheet(ws, fmt: _Formats, plan: Plan, meta: PlanMeta) -> None:
+    """
+    Общие сведения, состав группы и три таблицы контролей с полосами Ганта справа.
+    Строки пишутся сверху вниз — лист годится и для потоковой записи.
+    """
+    catalog = get_catalog()
+
+    # ======== БЛОК 1 — ОБЩИЕ СВЕДЕНИЯ ========
+    ws.merge_range("A1:B1", "План проведения контроля ИБ", fmt.bold)
+    ws.write_row(1, 0, ("Название ДЗО", meta.dzo_name), fmt.cell)
+    ws.write(2, 0, "Дата начала контроля ИБ", fmt.cell)
+    ws.write_datetime(2, 1, meta.info_date, fmt.cell_date)
+    ws.write(4, 0, "Цели и задачи контроля ИБ", fmt.cell)
+    ws.write(4, 1, meta.goals, fmt.cell_wrap)
+    ws.write(5, 0, "Объекты контроля ИБ", fmt.cell)
+    ws.write(5, 1, meta.objects, fmt.cell_wrap)
+
+    # ======== БЛОК 2 — СОСТАВ ГРУППЫ ========
+    ws.merge_range("A8:B8", "Состав группы контроля ИБ", fmt.bold)
+    ws.write(8, 0, 'От ПАО "Ростелеком"', fmt.cell)
+    ws.write(8, 1, meta.group_rt, fmt.cell_wrap)
+    ws.write(9, 0, "От ДЗО", fmt.cell)
+    ws.write(9, 1, meta.group_dzo, fmt.cell_wrap)
+
+    # ======== БЛОК 3 — ТАБЛИЦЫ КОНТРОЛЕЙ ========
+    # Опросные листы — в базовом порядке; проверка в Блоке ИБ и отчёт есть всегда
+    blocks = [
+        ("Заполнение в ДЗО опросных листов", catalog.dzo),
+        ("Инструментальные проверки", catalog.instrumental),
+        ("Проверка информации в Блоке ИБ и подготовка отчета", catalog.info),
+    ]
+    gantt = _gantt_periods(plan.input.info_date, plan.overall_end) if plan.tasks else None
+    # Заголовок сетки Ганта — один, в строке заголовка первой таблицы
+    row, head_row = 12, 13
+    for title, names in blocks:
+        ws.merge_range(row, 0, row, 3, title, fmt.bold)
+        ws.write_row(row + 1, 0, PLAN_COLUMNS, fmt.bold)
+        if row + 1 == head_row and gantt is not None:
+            _gantt_head(ws, fmt, head_row, GANTT_COL, gantt[0])
+        first_row = row = row + 2
+        for name in names:
+            task = plan.task(name)
+            ws.write(row, 0, name, fmt.cell)
+            ws.write(row, 1, "ДА" if task is not None else "НЕТ", fmt.cell_center)
+            if task is not None:
+                ws.write_row(row, 2, (task.start, task.end), fmt.cell_date)
+            else:
+                ws.write_row(row, 2, ("", ""), fmt.cell_center)
+            row += 1
+        if gantt is not None:
+            _gantt_bars(ws, fmt, head_row, first_row, row - 1, GANTT_COL, *gantt, start_col=2, end_col=3)
+        row += 1
+
+    ws.set_column("A:A", 40)
+    ws.set_column("B:D", 18)
+    ws.set_column("E:E", 2)
+
+
+def build_plan_workbook(plan: Plan, meta: PlanMeta) -> bytes:
+    """
+    Книга Excel с листом «Plan»: общие сведения, состав группы и три таблицы контролей.
+    """
+    workbook, fmt = new_workbook()
+    _write_plan_sheet(workbook.add_worksheet("Plan"), fmt, plan, meta)
+    workbook.close()
+    return workbook.filename.getvalue()
+
+
+# --- КНИГА-ПОРТФЕЛЬ ---
+
+def sheet_name(title: str, used: set) -> str:
+    """
+    Допустимое и уникальное в книге имя листа (до 31 символа, без []:*?/\\).
+    """
+    base = _SHEET_NAME_BAD.sub("_", title).strip("'") or "ДЗО"
+    name, n = base[:31], 1
+    while name.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        name = base[:31 - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+
+def write_portfolio(plans, target, metas=None, progress=None) -> int:
+    """
+    Книга-портфель по списку планов: «Сводка» (со ссылками на листы ДЗО),
+    «График» (все задачи с полосами Ганта) и лист плана на каждое ДЗО.
+    target — путь или поток для записи; metas — PlanMeta по планам (иначе —
+    только ДЗО и дата начала). progress(done, total) — после каждого листа ДЗО.
+    Возвращает число листов ДЗО.
+    """
+    plans = list(plans)
+    workbook, fmt = new_workbook(target)
+    used = {"сводка", "график"}
+    names = [sheet_name(p.input.dzo_name, used) for p in plans]
+
+    summary = write_table(workbook, fmt, "Сводка", SUMMARY_COLUMNS, (), [40, 22, 22, 14, 16])
+    schedule = write_table(workbook, fmt, "График", SCHEDULE_COLUMNS, (), [30, 40, 26, 12, 12, 12, 12])
+    summary.freeze_panes(1, 1)
+    schedule.freeze_panes(1, 2)
+
+    # Сетка Ганта сводного листа — по всему портфелю; заголовок — в первой строке
+    with_tasks = [p for p in plans if p.tasks]
+    n_tasks = sum(len(p.tasks) for p in with_tasks)
+    if with_tasks:
+        start = min(p.input.info_date for p in with_tasks)
+        end = max(p.overall_end for p in with_tasks)
+        periods, period_end = _gantt_periods(start, end)
+        first_col = len(SCHEDULE_COLUMNS) + 1
+        _gantt_head(schedule, fmt, 0, first_col, periods)
+        _gantt_bars(schedule, fmt, 0, 1, n_tasks, first_col, periods, period_end,
+                    start_col=3, end_col=4, critical_col=6)
+
+    row = 1
+    for i, (plan, name) in enumerate(zip(plans, names)):
+        dzo, info_date, end = plan.input.dzo_name, plan.input.info_date, plan.overall_end
+        summary.write_url(i + 1, 0, f"internal:'{name}'!A1", fmt.link, dzo)
+        summary.write_row(i + 1, 1, (info_date, end or "", len(plan.tasks), (end - info_date).days + 1 if end else ""))
+        for t in plan.tasks:
+            schedule.write_row(row, 0, (dzo, t.name, t.category, t.start, t.end, t.duration, "ДА" if t.critical else ""))
+            row += 1
+
+        meta = metas[i] if metas is not None else PlanMeta(dzo, info_date)
+        ws = workbook.add_worksheet(name)
+        _write_plan_sheet(ws, fmt, plan, meta)
+        if getattr(ws, "constant_memory", False) and hasattr(ws, "_opt_close"):
+            # Лист дописан: закрываем его временный файл (иначе по дескриптору на лист);
+            # при сборке книги xlsxwriter откроет его снова
+            ws._opt_close()
+        if progress:
+            progress(i + 1, len(plans))
+
+    workbook.close()
+    return len(plans)
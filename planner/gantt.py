@@ -0,0 +1,306 @@
+"""
+Диаграмма Ганта плана (plotly).
+"""
+
+import base64
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from planner.catalog import CATEGORY_COLORS
+from planner.engine import Plan
+
+SCHEDULE_COLUMNS = ["Задача", "Категория", "Начало", "Окончание", "Длительность (раб. дн)"]
+
+# Обводка задач критического пути
+CRITICAL_LINE_COLOR = "#e8002a"
+CRITICAL_LINE_WIDTH = 3
+
+
+def schedule_frame(plan: Plan):
+    """
+    Таблица этапов плана (DataFrame) в порядке справочника.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(
+        [(t.name, t.category, t.start, t.end, t.duration) for t in plan.tasks],
+        columns=SCHEDULE_COLUMNS,
+    )
+
+
+def build_gantt_figure(plan: Plan):
+    import plotly.express as px
+
+    df_gantt = schedule_frame(plan)
+    # Plotly ожидает конец интервала как правую границу, поэтому +1 день
+    df_gantt["Окончание_Plotly"] = df_gantt["Окончание"] + timedelta(days=1)
+    df_gantt["Резерв (раб. дн)"] = [t.slack for t in plan.tasks]
+
+    fig = px.timeline(
+        df_gantt.sort_values(by="Начало"),
+        x_start="Начало",
+        x_end="Окончание_Plotly",
+        y="Задача",
+        color="Категория",
+        text="Длительность (раб. дн)",
+        color_discrete_map=CATEGORY_COLORS,
+        hover_data={"Резерв (раб. дн)": True, "Окончание_Plotly": False},
+    )
+
+    fig.update_yaxes(autorange="reversed")
+    fig.update_layout(
+        xaxis_title="Дата",
+        yaxis_title=None,
+        height=600,
+        bargap=0.2,
+    )
+    fig.update_traces(textposition="inside", insidetextanchor="middle")
+
+    # Критический путь — красная обводка баров
+    critical = {t.name for t in plan.tasks if t.critical}
+    for trace in fig.data:
+        trace.marker.line.color = CRITICAL_LINE_COLOR
+        trace.marker.line.width = [CRITICAL_LINE_WIDTH if y in critical else 0 for y in trace.y]
+    return fig
+
+
+# --- ДИАГРАММА ПОРТФЕЛЯ (ТЫСЯЧИ ЗАДАЧ) ---
+# Бары строятся прямо из столбцов NumPy (начало + длительность), без DataFrame
+# и px.timeline. Дорожка ДЗО свёрнута в одну строку, пока её не развернули;
+# число баров и размер JSON ограничены: перекрывающиеся (с точностью до
+# пикселя) бары одной строки и категории сливаются, а при избытке баров
+# соседние строки объединяются в полосы.
+
+MAX_TIMELINE_BARS = 20_000
+TIMELINE_WIDTH_PX = 1200    # ширина области графика — масштаб слияния баров
+TIMELINE_ROW_PX = 22
+TIMELINE_MAX_HEIGHT = 900
+
+_DAY_MS = 86_400_000
+
+
+@dataclass(frozen=True)
+class TimelineData:
+    """
+    Задачи портфеля столбцами (по элементу на задачу): lane — номер ДЗО в lanes,
+    task — номер имени в names, category — номер в CATEGORY_COLORS,
+    start/end — дни от 1970-01-01 (end включительно), duration — длительность
+    (раб. дн), critical — на критическом пути.
+    """
+    lanes: tuple
+    names: tuple
+    lane: np.ndarray
+    task: np.ndarray
+    category: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    duration: np.ndarray
+    critical: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.lane)
+
+    @property
+    def period(self) -> tuple[date, date]:
+        """
+        Первый и последний день портфеля.
+        """
+        if not len(self):
+            today = date.today()
+            return today, today
+        return _to_date(self.start.min()), _to_date(self.end.max())
+
+
+def _to_date(day) -> date:
+    return np.datetime64(int(day), "D").astype(date)
+
+
+def _codes(values) -> tuple[tuple, np.ndarray]:
+    """
+    Словарь значений в порядке первого появления и коды элементов.
+    """
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int32, count=len(values))
+    return tuple(index), codes
+
+
+def timeline_data(rows, critical=None) -> TimelineData:
+    """
+    Столбцы портфеля из строк пакетного расчёта (ДЗО, задача, категория,
+    начало, окончание, длительность) — planner.batch.RESULT_COLUMNS.
+    """
+    rows = list(rows)
+    lanes, lane = _codes([r[0] for r in rows])
+    names, task = _codes([r[1] for r in rows])
+    cat_index = {c: i for i, c in enumerate(CATEGORY_COLORS)}
+    category = np.fromiter((cat_index[r[2]] for r in rows), dtype=np.int8, count=len(rows))
+    start = np.array([r[3] for r in rows], dtype="datetime64[D]").astype(np.int32)
+    end = np.array([r[4] for r in rows], dtype="datetime64[D]").astype(np.int32)
+    duration = np.fromiter((r[5] for r in rows), dtype=np.int32, count=len(rows))
+    critical = np.zeros(len(rows), dtype=np.bool_) if critical is None else np.asarray(critical, dtype=np.bool_)
+    return TimelineData(lanes, names, lane, task, category, start, end, duration, critical)
+
+
+def timeline_from_plans(plans) -> TimelineData:
+    """
+    Столбцы портфеля по рассчитанным планам (с признаком критического пути).
+    """
+    tasks = [(p.input.dzo_name, t) for p in plans for t in p.tasks]
+    return timeline_data(
+        ((dzo, t.name, t.category, t.start, t.end, t.duration) for dzo, t in tasks),
+        critical=[t.critical for _, t in tasks],
+    )
+
+
+def _typed_array(values: np.ndarray) -> dict:
+    """
+    Массив в виде typed array spec plotly.js. Нужен для base: валидатор plotly.py
+    превращает его в список объектов, и в JSON уходит текст вместо base64.
+    """
+    return {"dtype": values.dtype.str[1:], "bdata": base64.b64encode(values.tobytes()).decode()}
+
+
+def _day_month_year(days: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    День, месяц и год дат (дни от 1970-01-01). Окончание бара в подсказке
+    собирается из чисел: x бара — начало следующего дня, а дату-строку в
+    customdata plotly сериализует поэлементно.
+    """
+    d = days.astype("datetime64[D]")
+    month = d.astype("datetime64[M]")
+    year = d.astype("datetime64[Y]")
+    return (
+        (d - month).astype(np.int32) + 1,
+        (month - year).astype(np.int32) + 1,
+        year.astype(np.int32) + 1970,
+    )
+
+
+def merge_intervals(group, start, end, tol: int = 0):
+    """
+    Объединение интервалов внутри групп: интервалы одной группы, между которыми
+    не больше tol дней, сливаются. -> (индексы первого интервала каждого
+    объединения в порядке сортировки, группа, начало, конец, число интервалов,
+    порядок сортировки)
+    """
+    order = np.lexsort((start, group))
+    g, s, e = group[order], start[order], end[order]
+    if not len(g):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, g, s, e, empty, order
+    # Накопленный максимум конца внутри группы: ко всем концам добавляется
+    # смещение группы, чтобы максимум не «перетекал» из предыдущей группы
+    shift = (g.astype(np.int64) - g[0]) * (int(e.max()) - int(s.min()) + tol + 2)
+    reach = np.maximum.accumulate(e.astype(np.int64) + shift) - shift
+    new = np.ones(len(g), dtype=np.bool_)
+    new[1:] = (g[1:] != g[:-1]) | (s[1:] > reach[:-1] + 1 + tol)
+    first = np.flatnonzero(new)
+    count = np.diff(np.append(first, len(g)))
+    return first, g[first], s[first], np.maximum.reduceat(e, first), count, order
+
+
+def _timeline_rows(data: TimelineData, idx, expanded: set):
+    """
+    Строки диаграммы для выбранных задач: развёрнутое ДЗО — строка на задачу,
+    свёрнутое — одна строка. -> (номер строки задачи, подписи строк)
+    """
+    lane, task = data.lane[idx], data.task[idx]
+    is_exp = np.isin(lane, np.fromiter(expanded, dtype=np.int32, count=len(expanded)))
+    key = lane.astype(np.int64) * (len(data.names) + 1) + np.where(is_exp, task + 1, 0)
+    keys, row = np.unique(key, return_inverse=True)
+    labels = []
+    for k in keys.tolist():
+        ln, t = divmod(k, len(data.names) + 1)
+        labels.append(f"▸ {data.lanes[ln]}" if not t else f"{data.lanes[ln]} · {data.names[t - 1]}")
+    return row.astype(np.int32), labels
+
+
+def build_timeline_figure(
+    data: TimelineData,
+    expanded=(),
+    window: tuple | None = None,
+    max_bars: int = MAX_TIMELINE_BARS,
+    width_px: int = TIMELINE_WIDTH_PX,
+):
+    """
+    Диаграмма портфеля: по трассе go.Bar на категорию. expanded — развёрнутые
+    ДЗО (имена), window — (начало, конец) видимого периода; задачи вне периода
+    в диаграмму не попадают, а бары короче пикселя при таком масштабе сливаются.
+    """
+    import plotly.graph_objects as go
+
+    lo, hi = window or data.period
+    w0, w1 = (int(np.datetime64(d, "D").astype(np.int32)) for d in (lo, hi))
+    idx = np.flatnonzero((data.end >= w0) & (data.start <= w1))
+
+    lane_index = {name: i for i, name in enumerate(data.lanes)}
+    row, labels = _timeline_rows(data, idx, {lane_index[n] for n in expanded if n in lane_index})
+    start = np.maximum(data.start[idx], w0)
+    end = np.minimum(data.end[idx], w1)
+    category = data.category[idx].astype(np.int64)
+    critical = data.critical[idx]
+
+    # Слияние в пределах строки и категории: зазор меньше пикселя не виден.
+    # Если баров всё ещё больше max_bars, строки объединяются в полосы по 2, 4, ...
+    # и сливаются уже объединённые бары — объединение можно делать по частям
+    tol = (w1 - w0 + 1) // width_px
+    n_cat = len(CATEGORY_COLORS)
+    count = np.ones(len(idx), dtype=np.int32)
+    band = 1
+    while True:
+        group = (row // band).astype(np.int64) * n_cat + category
+        first, g, start, end, _, order = merge_intervals(group, start, end, tol)
+        count = np.add.reduceat(count[order], first) if len(first) else count
+        critical = np.logical_or.reduceat(critical[order], first) if len(first) else critical
+        row, category = g // n_cat * band, g % n_cat
+        if len(first) <= max_bars or band >= len(labels):
+            break
+        band *= 2
+    row = (row // band).astype(np.int32)
+    if band > 1:
+        n = len(labels)
+        labels = [
+            f"{labels[i]} … {labels[min(i + band, n) - 1]}" if min(i + band, n) - 1 > i else labels[i]
+            for i in range(0, n, band)
+        ]
+
+    base_ms = start.astype(np.float64) * _DAY_MS
+    fig = go.Figure()
+    for c, (cat, color) in enumerate(CATEGORY_COLORS.items()):
+        sel = category == c
+        days = (end[sel] - start[sel] + 1).astype(np.int32)
+        fig.add_trace(go.Bar(
+            name=cat,
+            orientation="h",
+            y=row[sel],
+            base=_typed_array(base_ms[sel]),
+            x=days.astype(np.float64) * _DAY_MS,
+            customdata=np.column_stack((days, count[sel], *_day_month_year(end[sel]))),
+            marker=dict(
+                color=color,
+                line=dict(color=CRITICAL_LINE_COLOR, width=np.where(critical[sel], CRITICAL_LINE_WIDTH, 0).astype(np.int8)),
+            ),
+            hovertemplate=(
+                "%{base|%d.%m.%Y} – %{customdata[2]:02d}.%{customdata[3]:02d}.%{customdata[4]}<br>Дней: %{customdata[0]}, "
+                "задач: %{customdata[1]}<extra>%{fullData.name}</extra>"
+            ),
+        ))
+
+    n_rows = len(labels)
+    height = min(max(n_rows * TIMELINE_ROW_PX + 120, 300), TIMELINE_MAX_HEIGHT)
+    visible = (height - 120) // TIMELINE_ROW_PX
+    fig.update_layout(
+        barmode="overlay",
+        bargap=0.25,
+        height=height,
+        xaxis=dict(type="date", range=[lo, hi + timedelta(days=1)], title="Дата"),
+        yaxis=dict(
+            tickmode="array", tickvals=np.arange(n_rows, dtype=np.int32), ticktext=labels,
+            range=[min(n_rows, visible) - 0.5, -0.5], title=None,
+        ),
+        legend_title_text=None,
+        meta=dict(bars=int(len(first)), tasks=int(len(idx)), band=band),
+    )
+    return fig
@@ -0,0 +1,241 @@
+"""
+Сетевой график задач: топологическая сортировка, прямой и обратный проход
+(метод критического пути) в индексах рабочих дней.
+
+Время задачи — номера рабочих дней производственного календаря:
+es/ef — ранние начало и окончание (включительно), ls/lf — поздние.
+Связи:
+    FS, lag — последователь начинается не раньше, чем через lag рабочих дней
+              после рабочего дня, следующего за окончанием предшественника;
+    SS, lag — последователь начинается не раньше, чем через lag рабочих дней
+              после начала предшественника.
+Оба прохода линейны по числу задач и связей.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+FS = "FS"
+SS = "SS"
+
+
+class TaskGraph:
+    """
+    Неизменяемый граф задач. edges — итерируемое (предшественник, последователь, тип, лаг).
+    """
+
+    __slots__ = ("names", "index", "preds", "succs", "order", "signature")
+
+    def __init__(self, names, edges=()):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Имена задач в графе должны быть уникальны")
+
+        preds = [[] for _ in self.names]
+        succs = [[] for _ in self.names]
+        edge_list = []
+        for pred, succ, kind, lag in edges:
+            if kind not in (FS, SS):
+                raise ValueError(f"Неизвестный тип связи {kind!r} ({pred} -> {succ})")
+            p, s = self.index[pred], self.index[succ]
+            preds[s].append((p, kind, int(lag)))
+            succs[p].append((s, kind, int(lag)))
+            edge_list.append((p, s, kind, int(lag)))
+
+        self.preds = tuple(tuple(x) for x in preds)
+        self.succs = tuple(tuple(x) for x in succs)
+        self.order = self._topological_order()
+        # одинаковая сигнатура — одинаковая структура (для инкрементального пересчёта)
+        self.signature = (self.names, tuple(edge_list))
+
+    def _topological_order(self) -> tuple:
+        """
+        Алгоритм Кана, O(V + E). Порядок среди независимых задач — порядок добавления.
+        """
+        indegree = [len(p) for p in self.preds]
+        queue = [i for i, d in enumerate(indegree) if d == 0]
+        order = []
+        head = 0
+        while head < len(queue):
+            v = queue[head]
+            head += 1
+            order.append(v)
+            for s, _, _ in self.succs[v]:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    queue.append(s)
+        if len(order) != len(self.names):
+            cyclic = [self.names[i] for i, d in enumerate(indegree) if d > 0]
+            raise ValueError(f"Цикл в зависимостях задач: {', '.join(cyclic)}")
+        return tuple(order)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+@dataclass(frozen=True)
+class CPMResult:
+    es: tuple
+    ef: tuple
+    ls: tuple
+    lf: tuple
+    binding: tuple      # предшественник, определивший ранний старт: (индекс, тип, лаг) или None
+    durations: tuple
+    fixed: tuple        # ((индекс, es), ...) — задачи с зафиксированным стартом
+    signature: tuple
+    recomputed: int     # сколько задач пересчитано в прямом проходе
+
+    @property
+    def finish(self) -> int:
+        return max(self.ef, default=-1)
+
+    def slack(self, i: int) -> int:
+        return self.ls[i] - self.es[i]
+
+    def is_critical(self, i: int) -> bool:
+        return self.ls[i] - self.es[i] <= 0
+
+
+def _constraint(es, ef, p, kind, lag) -> int:
+    return ef[p] + 1 + lag if kind == FS else es[p] + lag
+
+
+def forward_pass(graph: TaskGraph, durations, fixed=None, previous: CPMResult | None = None):
+    """
+    Ранние сроки. fixed — {индекс: es} для задач с зафиксированным стартом (связи
+    на входе игнорируются); задачи без предшественников и фиксации стартуют в 0.
+    Если передан previous с той же структурой графа, пересчитываются только
+    задачи, чьи входы изменились, и их последователи.
+    -> (es, ef, binding, число пересчитанных задач)
+    """
+    fixed = fixed or {}
+    n = len(graph)
+
+    if previous is not None and previous.signature == graph.signature:
+        es, ef, binding = list(previous.es), list(previous.ef), list(previous.binding)
+        prev_fixed = dict(previous.fixed)
+        dirty = [
+            durations[i] != previous.durations[i] or fixed.get(i) != prev_fixed.get(i)
+            for i in range(n)
+        ]
+    else:
+        es, ef, binding = [None] * n, [None] * n, [None] * n
+        dirty = [True] * n
+
+    recomputed = 0
+    for v in graph.order:
+        if not dirty[v]:
+            continue
+        recomputed += 1
+        if v in fixed:
+            start, bind = fixed[v], None
+        else:
+            start, bind = 0, None
+            for p, kind, lag in graph.preds[v]:
+                c = _constraint(es, ef, p, kind, lag)
+                if bind is None or c > start:
+                    start, bind = c, (p, kind, lag)
+        finish = start + durations[v] - 1
+        if (start, finish, bind) != (es[v], ef[v], binding[v]):
+            es[v], ef[v], binding[v] = start, finish, bind
+            for s, _, _ in graph.succs[v]:
+                dirty[s] = True
+
+    return es, ef, binding, recomputed
+
+
+def forward_pass_batch(graph: TaskGraph, durations, fixed=None):
+    """
+    Прямой проход сразу для K вариантов: durations — массив (V, K) длительностей,
+    fixed — {индекс: es} со скаляром или массивом (K,). -> (es, ef) массивы (V, K).
+    Цикл — только по задачам, варианты считаются векторно.
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    fixed = fixed or {}
+    n, k = durations.shape
+    es = np.zeros((n, k), dtype=np.int64)
+    ef = np.zeros((n, k), dtype=np.int64)
+    for v in graph.order:
+        if v in fixed:
+            es[v] = fixed[v]
+        else:
+            for p, kind, lag in graph.preds[v]:
+                np.maximum(es[v], (ef[p] + 1 if kind == FS else es[p]) + lag, out=es[v])
+        ef[v] = es[v] + durations[v] - 1
+    return es, ef
+
+
+def backward_pass(graph: TaskGraph, durations, es, ef, finish: int | None = None):
+    """
+    Поздние сроки при окончании проекта в finish (по умолчанию — самое позднее ef).
+    """
+    n = len(graph)
+    if finish is None:
+        finish = max(ef, default=-1)
+    lf = [finish] * n
+    ls = [0] * n
+    for v in reversed(graph.order):
+        late_finish = finish
+        for s, kind, lag in graph.succs[v]:
+            if kind == FS:
+                bound = ls[s] - 1 - lag
+            else:
+                bound = ls[s] - lag + durations[v] - 1
+            if bound < late_finish:
+                late_finish = bound
+        lf[v] = late_finish
+        ls[v] = late_finish - durations[v] + 1
+    return ls, lf
+
+
+def backward_pass_batch(graph: TaskGraph, durations, es, ef):
+    """
+    Поздние сроки для K вариантов (к forward_pass_batch): окончание проекта —
+    самое позднее ef своего варианта. -> (ls, lf) массивы (V, K).
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    finish = ef.max(axis=0)
+    ls = np.zeros_like(es)
+    lf = np.zeros_like(ef)
+    for v in reversed(graph.order):
+        lf[v] = finish
+        for s, kind, lag in graph.succs[v]:
+            bound = ls[s] - 1 - lag if kind == FS else ls[s] - lag + durations[v] - 1
+            np.minimum(lf[v], bound, out=lf[v])
+        ls[v] = lf[v] - durations[v] + 1
+    return ls, lf
+
+
+def critical_path_method(graph: TaskGraph, durations, fixed=None, previous: CPMResult | None = None) -> CPMResult:
+    durations = tuple(int(d) for d in durations)
+    fixed = fixed or {}
+    es, ef, binding, recomputed = forward_pass(graph, durations, fixed, previous)
+    ls, lf = backward_pass(graph, durations, es, ef)
+    return CPMResult(
+        es=tuple(es),
+        ef=tuple(ef),
+        ls=tuple(ls),
+        lf=tuple(lf),
+        binding=tuple(binding),
+        durations=durations,
+        fixed=tuple(sorted(fixed.items())),
+        signature=graph.signature,
+        recomputed=recomputed,
+    )
+
+
+def critical_path(graph: TaskGraph, result: CPMResult) -> list:
+    """
+    Цепочка, определяющая окончание проекта: от задачи с наибольшим ef назад по
+    определяющим предшественникам.
+    """
+    if not len(graph):
+        return []
+    v = max(graph.order, key=lambda i: result.ef[i])
+    path = [v]
+    while result.binding[v] is not None:
+        v = result.binding[v][0]
+        path.append(v)
+    return [graph.names[i] for i in reversed(path)]
@@ -0,0 +1,424 @@
+"""
+Импорт плана из выгруженной книги Excel (обратная операция к planner.export).
+
+Лист плана читается потоково (openpyxl, read_only) и разбирается по
+подписям в столбце A, а не по номерам строк — вставленные при правке строки
+не мешают: общие сведения, состав группы и три таблицы контролей.
+Вход плана восстанавливается так, чтобы расчёт дал даты из книги:
+длительность — число рабочих дней между началом и окончанием, порядок
+контролей ДЗО — по датам начала, явная дата начала — только там, где она
+отличается от даты по правилам. Проверка в Блоке ИБ и отчёт рассчитываются.
+
+Из книги-портфеля читаются все листы планов. Папка книг импортируется
+параллельно (пул процессов).
+
+Запуск из командной строки:
+    python -m planner.importer plans/ --db plans.sqlite3 --batch batch.csv --workers 4
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+
+from planner.catalog import CAT_DZO, PIB_NAME, get_catalog
+from planner.engine import ControlInput, PlanInput, schedule, validate_controls
+from planner.export import PLAN_COLUMNS, PlanMeta
+from planner.workdays import get_calendar
+
+PLAN_TITLE = "План проведения контроля ИБ"
+
+# Подписи столбца A -> поле PlanMeta
+_META_LABELS = {
+    "название дзо": "dzo_name",
+    "дата начала контроля иб": "info_date",
+    "цели и задачи контроля иб": "goals",
+    "объекты контроля иб": "objects",
+    'от пао "ростелеком"': "group_rt",
+    "от дзо": "group_dzo",
+}
+
+# Ниже этого числа книг пул процессов не окупает запуск
+MIN_PARALLEL_FILES = 16
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+
+
+@dataclass(frozen=True)
+class ImportedPlan:
+    source: str              # файл (и лист для книги-портфеля)
+    input: PlanInput
+    meta: PlanMeta
+    warnings: tuple = ()     # расхождения, не мешающие импорту
+
+
+@dataclass(frozen=True)
+class ImportFileError:
+    source: str
+    message: str
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    plans: list              # ImportedPlan в порядке файлов
+    errors: list             # ImportFileError
+    elapsed: float           # секунды
+
+
+# --- РАЗБОР ЛИСТА ---
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _date(value, what: str) -> date | None:
+    """
+    Дата ячейки: дата Excel или текст ДД.ММ.ГГГГ (так писали прежние выгрузки).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), "%d.%m.%Y").date()
+    except ValueError:
+        raise ValueError(f"{what}: ожидается дата ДД.ММ.ГГГГ, получено «{value}»") from None
+
+
+def _flag(value, name: str) -> bool:
+    text = _text(value).upper()
+    if text in ("ДА", "YES", "+", "X", "Х"):
+        return True
+    if text in ("", "НЕТ", "NO", "-", "0"):
+        return False
+    raise ValueError(f"«{name}»: в столбце «Включено» ожидается ДА/НЕТ, получено «{value}»")
+
+
+def parse_plan_sheet(rows) -> tuple[PlanMeta, dict]:
+    """
+    Общие сведения и строки таблиц контролей из значений листа (по строкам).
+    Возвращает (PlanMeta, {контроль: (включён, начало, окончание)}).
+    Все найденные ошибки — одним ValueError.
+    """
+    meta, controls, problems = {}, {}, []
+    in_table = False
+    for row in rows:
+        label = _text(row[0] if row else None)
+        if not label:
+            in_table = False
+            continue
+        if label == PLAN_COLUMNS[0]:
+            in_table = True
+            continue
+        cells = (tuple(row) + (None,) * 4)[:4]
+        if in_table and cells[1] is None and cells[2] is None:
+            in_table = False  # заголовок следующей таблицы без пустой строки перед ним
+            continue
+        try:
+            if in_table:
+                if label in controls:
+                    raise ValueError(f"«{label}»: контроль указан дважды")
+                controls[label] = (
+                    _flag(cells[1], label), _date(cells[2], f"«{label}», начало"), _date(cells[3], f"«{label}», окончание")
+                )
+            elif label.lower() in _META_LABELS:
+                field = _META_LABELS[label.lower()]
+                meta[field] = _date(cells[1], label) if field == "info_date" else _text(cells[1])
+        except ValueError as e:
+            problems.append(str(e))
+
+    if not meta.get("dzo_name"):
+        problems.append("не указано название ДЗО")
+    if not meta.get("info_date"):
+        problems.append("не указана дата начала контроля ИБ")
+    if not controls:
+        problems.append(f"не найдены таблицы контролей (строка заголовка «{PLAN_COLUMNS[0]}»)")
+    if problems:
+        raise ValueError("; ".join(problems))
+    return PlanMeta(**meta), controls
+
+
+def restore_input(meta: PlanMeta, controls: dict) -> tuple[PlanInput, tuple]:
+    """
+    Вход плана по датам из книги и предупреждения о датах, которые расчёт
+    воспроизвести не может (рассчитываемые задачи, даты вне правил).
+    """
+    catalog = get_catalog()
+    cal = get_calendar(meta.dzo_name)
+    problems = [f"неизвестный контроль «{name}»" for name in controls if name not in catalog]
+    if problems:
+        raise ValueError("; ".join(problems))
+
+    info = catalog.info
+    rows = {}
+    for name in catalog.input_controls:
+        enabled, start, end = controls.get(name, (False, None, None))
+        dur = None
+        if enabled and start and end:
+            if end < start:
+                problems.append(f"«{name}»: окончание {end:%d.%m.%Y} раньше начала {start:%d.%m.%Y}")
+                continue
+            try:
+                dur = cal.workdays_between(start, end)
+            except ValueError:
+                problems.append(f"«{name}»: даты вне производственного календаря")
+                continue
+            dur = None if dur == catalog[name].dur else max(dur, 1)
+        rows[name] = (enabled, start, dur)
+    if problems:
+        raise ValueError("; ".join(problems))
+
+    starts = {name: start for name, (enabled, start, _) in rows.items() if enabled and start}
+    base = tuple(ControlInput(name, enabled=enabled, dur=dur) for name, (enabled, _, dur) in rows.items())
+    errors = validate_controls(base, catalog)
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    # Порядок контролей ДЗО по книге однозначно не восстанавливается (явная дата
+    # начала выводит контроль из цепочки): пробуем несколько и берём тот, при
+    # котором расчёт даёт даты книги, в т.ч. рассчитываемых задач
+    best = None
+    for orders in _order_candidates(rows, controls, cal, catalog):
+        plan_input = PlanInput(dzo_name=meta.dzo_name, info_date=meta.info_date, controls=tuple(
+            replace(ci, order=orders.get(ci.name)) for ci in base
+        ))
+        plan_input, plan = _fix_starts(plan_input, starts, cal, catalog)
+        warnings = _mismatches(plan, controls, info)
+        n_fixed = sum(ci.start is not None for ci in plan_input.controls)
+        if best is None or (len(warnings), n_fixed) < (len(best[1]), best[2]):
+            best = (plan_input, warnings, n_fixed)
+        if not warnings:
+            break
+    return best[0], best[1]
+
+
+def _order_candidates(rows, controls, cal, catalog):
+    """
+    Варианты порядка контролей ДЗО ({имя: №}, пустой — базовый): по датам
+    начала; базовый; по датам начала, но первым — контроль, после которого,
+    судя по книге, начинается проверка в Блоке ИБ (она идёт от первого контроля ДЗО).
+    """
+    dzo = [n for n in catalog.category(CAT_DZO) if rows[n][0]]
+    by_start = sorted(dzo, key=lambda n: (rows[n][1] or date.max, catalog[n].default_order))
+
+    def numbered(names):
+        return {n: k for k, n in enumerate(names, start=1)}
+
+    yield numbered(by_start) if by_start != dzo else {}
+    if by_start != dzo:
+        yield {}
+    pib_start = controls.get(PIB_NAME, (None, None, None))[1]
+    if pib_start:
+        for n in by_start[1:]:
+            end = controls[n][2]
+            if end and cal.next_workday(end) == pib_start:
+                yield numbered([n] + [m for m in by_start if m != n])
+                break
+
+
+def _fix_starts(plan_input: PlanInput, starts: dict, cal, catalog):
+    """
+    Явные даты начала — только там, где правила дают другую дату: по одной,
+    начиная с самой ранней расходящейся задачи (следующие за ней могут сойтись сами).
+    """
+    fixed = {}
+    for _ in range(len(starts) + 1):
+        plan = schedule(plan_input, calendar=cal, catalog=catalog)
+        diff = [t for t in plan.tasks if starts.get(t.name) and starts[t.name] != t.start and t.name not in fixed]
+        if not diff:
+            break
+        first = min(diff, key=lambda t: starts[t.name])
+        fixed[first.name] = starts[first.name]
+        plan_input = replace(plan_input, controls=tuple(
+            replace(ci, start=fixed.get(ci.name)) for ci in plan_input.controls
+        ))
+    return plan_input, plan
+
+
+def _mismatches(plan, controls: dict, info) -> tuple:
+    """
+    Задачи, даты которых в книге не совпадают с расчётом.
+    """
+    warnings = []
+    for t in plan.tasks:
+        _, start, end = controls.get(t.name, (True, None, None))
+        if start and end and (start, end) != (t.start, t.end):
+            kind = "рассчитывается по правилам" if t.name in info else "после пересчёта"
+            warnings.append(
+                f"«{t.name}»: в книге {start:%d.%m.%Y}–{end:%d.%m.%Y}, {kind} {t.start:%d.%m.%Y}–{t.end:%d.%m.%Y}"
+            )
+    return tuple(warnings)
+
+
+def read_plan_workbook(source, name: str = "") -> list[ImportedPlan]:
+    """
+    Планы из книги (путь или файловый объект): лист «Plan» или все листы
+    планов книги-портфеля. Ошибка любого листа — ValueError с именем листа.
+    """
+    import openpyxl
+
+    label = name or str(source)
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        plans = []
+        for ws in workbook.worksheets:
+            rows = ws.iter_rows(max_col=4, values_only=True)
+            first = next(rows, None)
+            if not first or _text(first[0]) != PLAN_TITLE:
+                continue  # «Сводка», «График» и прочие листы
+            source_name = label if ws.title == "Plan" else f"{label}:{ws.title}"
+            try:
+                meta, controls = parse_plan_sheet(rows)
+                plan_input, warnings = restore_input(meta, controls)
+            except ValueError as e:
+                raise ValueError(f"{source_name}: {e}") from None
+            plans.append(ImportedPlan(source_name, plan_input, meta, warnings))
+    finally:
+        workbook.close()
+    if not plans:
+        raise ValueError(f"{label}: нет листа плана (ячейка A1 «{PLAN_TITLE}»)")
+    return plans
+
+
+# --- ПАКЕТНЫЙ ИМПОРТ ---
+
+def excel_files(path: str) -> list[str]:
+    """
+    Книги Excel папки (без вложенных папок и временных файлов Excel «~$»), по имени.
+    """
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, f) for f in os.listdir(path)
+        if f.lower().endswith(EXCEL_SUFFIXES) and not f.startswith("~$")
+    )
+
+
+def _import_one(item):
+    """
+    Выполняется в процессе-исполнителе. item — путь или (имя, байты).
+    Возвращает (планы, None) или (None, текст ошибки).
+    """
+    name, data = item if isinstance(item, tuple) else (item, None)
+    try:
+        return read_plan_workbook(io.BytesIO(data) if data is not None else name, name), None
+    except Exception as e:  # повреждённая книга — ошибка файла, а не всего импорта
+        return None, str(e) if str(e).startswith(name) else f"{name}: {e}"
+
+
+def import_workbooks(items, workers: int | None = None, progress=None) -> ImportResult:
+    """
+    Импорт множества книг: items — пути или пары (имя, байты). При большом
+    числе книг — в пуле процессов. progress(done, total) — после каждой книги.
+    """
+    t0 = time.perf_counter()
+    items = list(items)
+    total = len(items)
+    workers = workers or os.cpu_count() or 1
+
+    results = [None] * total
+    if workers > 1 and total >= MIN_PARALLEL_FILES:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_size = max(1, total // (workers * 8))  # несколько частей на процесс — для выравнивания
+            for i, result in enumerate(pool.map(_import_one, items, chunksize=chunk_size)):
+                results[i] = result
+                if progress:
+                    progress(i + 1, total)
+    else:
+        for i, item in enumerate(items):
+            results[i] = _import_one(item)
+            if progress:
+                progress(i + 1, total)
+
+    plans, errors = [], []
+    for item, (imported, error) in zip(items, results):
+        if error is not None:
+            errors.append(ImportFileError(item[0] if isinstance(item, tuple) else item, error))
+        else:
+            plans.extend(imported)
+    return ImportResult(plans=plans, errors=errors, elapsed=time.perf_counter() - t0)
+
+
+def batch_frame(plans):
+    """
+    Импортированные планы во входном формате пакетного планирования
+    (planner.batch): ДА или длительность по контролю. Явные даты начала и
+    порядок контролей ДЗО в этот формат не входят.
+    """
+    import pandas as pd
+
+    from planner.batch import COL_DZO, COL_START, input_columns
+
+    records = []
+    for p in plans:
+        rec = {COL_DZO: p.input.dzo_name, COL_START: p.input.info_date.strftime("%d.%m.%Y")}
+        for ci in p.input.controls:
+            rec[ci.name] = (str(ci.dur) if ci.dur else "ДА") if ci.enabled else ""
+        records.append(rec)
+    return pd.DataFrame(records, columns=input_columns()).fillna("")
+
+
+def save_imported(plans, repository, status: str | None = None) -> list[tuple[int, int]]:
+    """
+    Импортированные планы — в хранилище (planner.repository) одной транзакцией.
+    """
+    from planner.repository import STATUS_DRAFT
+
+    items = [
+        (schedule(p.input), {k: getattr(p.meta, k) for k in ("goals", "objects", "group_rt", "group_dzo")}, None)
+        for p in plans
+    ]
+    return repository.save_many(items, status or STATUS_DRAFT)
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт планов из выгруженных книг Excel")
+    parser.add_argument("paths", nargs="+", help="книги .xlsx или папки с ними")
+    parser.add_argument("--db", default=None, help="сохранить планы в хранилище SQLite")
+    parser.add_argument("--batch", default=None, help="записать входную таблицу пакетного планирования (.csv/.xlsx)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию — все ядра)")
+    args = parser.parse_args(argv)
+
+    files = [f for path in args.paths for f in excel_files(path)]
+
+    def progress(done, total):
+        print(f"\rПрочитано книг: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    result = import_workbooks(files, workers=args.workers, progress=progress)
+    print(file=sys.stderr)
+    print(f"Книг: {len(files)}, планов: {len(result.plans)}, ошибок: {len(result.errors)}, "
+          f"время: {result.elapsed:.2f} с", file=sys.stderr)
+    for p in result.plans:
+        for w in p.warnings:
+            print(f"  {p.source}: {w}", file=sys.stderr)
+    for e in result.errors:
+        print(f"  {e.message}", file=sys.stderr)
+
+    if args.db and result.plans:
+        from planner.repository import PlanRepository
+
+        repo = PlanRepository(args.db)
+        saved = save_imported(result.plans, repo)
+        repo.close()
+        print(f"Сохранено в {args.db}: планов {len(saved)}", file=sys.stderr)
+    if args.batch and result.plans:
+        df = batch_frame(result.plans)
+        if args.batch.lower().endswith(".csv"):
+            df.to_csv(args.batch, sep=";", index=False, encoding="utf-8-sig")
+        else:
+            df.to_excel(args.batch, index=False)
+        print(f"Входная таблица пакетного планирования -> {args.batch}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
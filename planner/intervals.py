@@ -0,0 +1,326 @@
+"""
+Интервальный индекс задач хранимых планов (в памяти процесса): «какие ДЗО
+проводят пентест в 10–28 марта», «пересекается ли новый план с проверками
+той же команды в других планах».
+
+Интервалы разбиты по команде и классу длины ([2^k; 2^(k+1)) дней), внутри
+части отсортированы по началу. Интервал класса k, пересекающий [lo; hi], начинается
+в [lo − 2^(k+1) + 2; hi] — это два бинарных поиска на класс и отбор по концу
+среди найденных; лишних кандидатов не больше, чем интервалов того же класса
+у границы периода. Новые интервалы копятся в буфере (просматривается
+целиком) и вливаются в отсортированные массивы, когда буфер вырастет;
+удаление — пометка строк, сжатие при перестройке.
+
+Даты — порядковые номера дней (date.toordinal), как в planner.repository.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from planner.catalog import TEAM_KEYWORDS
+
+# Буфер вставок вливается в основные массивы при росте больше
+# max(MIN_BUFFER, размер / BUFFER_FRACTION); удалённые строки вычищаются при
+# перестройке, если их больше DEAD_FRACTION от всех строк
+MIN_BUFFER = 4096
+BUFFER_FRACTION = 16
+DEAD_FRACTION = 0.25
+
+# Коды команд: 0 — задача без команды, далее по порядку TEAM_KEYWORDS
+TEAMS = (None, *TEAM_KEYWORDS)
+
+
+@dataclass(frozen=True)
+class TaskSpan:
+    """
+    Задача хранимого плана, найденная индексом.
+    """
+    plan_id: int
+    dzo_name: str
+    task: str
+    team: str | None
+    start: date
+    end: date
+
+
+class IntervalIndex:
+    """
+    Интервалы [start; end] (целые, end включительно) со строковыми атрибутами
+    по номеру строки: plan — план, task — код задачи, team — код команды.
+    Запросы возвращают номера строк; вставка и удаление — по плану.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Столбцы по номеру строки (растут удвоением, строки не переиспользуются)
+        self._n = 0
+        self.plan = np.zeros(0, dtype=np.int64)
+        self.task = np.zeros(0, dtype=np.int32)
+        self.team = np.zeros(0, dtype=np.int8)
+        self.start = np.zeros(0, dtype=np.int32)
+        self.end = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=np.bool_)
+        self._plan_rows: dict[int, np.ndarray] = {}
+        self._dead = 0
+        # Отсортированная часть: по команде и классу длины — (команда, класс,
+        # начала, концы, строки)
+        self._levels: list[tuple[int, int, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._sorted_rows = 0
+        # Буфер: строки, ещё не влитые в отсортированную часть
+        self._buffer = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._n - self._dead
+
+    # --- ИЗМЕНЕНИЕ ---
+
+    def _grow(self, need: int) -> None:
+        size = len(self.plan)
+        if need <= size:
+            return
+        size = max(need, 2 * size, 1024)
+        for name in ("plan", "task", "team", "start", "end", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def add(self, plan, task, team, start, end) -> None:
+        """
+        Добавление строк (массивы одной длины). Строки плана, уже бывшего в
+        индексе, добавляются к его строкам — для замены сначала remove_plan.
+        """
+        start = np.asarray(start, dtype=np.int32)
+        end = np.asarray(end, dtype=np.int32)
+        if np.any(end < start):
+            raise ValueError("Окончание интервала раньше начала")
+        plan = np.asarray(plan, dtype=np.int64)
+        with self._lock:
+            lo, hi = self._n, self._n + len(start)
+            self._grow(hi)
+            self.plan[lo:hi] = plan
+            self.task[lo:hi] = task
+            self.team[lo:hi] = team
+            self.start[lo:hi] = start
+            self.end[lo:hi] = end
+            self._alive[lo:hi] = True
+            self._n = hi
+            rows = np.arange(lo, hi, dtype=np.int64)
+            order = np.argsort(plan, kind="stable")
+            ids, first = np.unique(plan[order], return_index=True)
+            for p, part in zip(ids.tolist(), np.split(rows[order], first[1:])):
+                prev = self._plan_rows.get(p)
+                self._plan_rows[p] = part if prev is None else np.concatenate((prev, part))
+            self._buffer = np.concatenate((self._buffer, rows))
+            if len(self._buffer) > max(MIN_BUFFER, self._sorted_rows // BUFFER_FRACTION):
+                self._rebuild()
+
+    def remove_plan(self, plan_id: int) -> int:
+        """
+        Удаление строк плана; -> число удалённых строк.
+        """
+        with self._lock:
+            rows = self._plan_rows.pop(plan_id, None)
+            if rows is None:
+                return 0
+            self._alive[rows] = False
+            self._dead += len(rows)
+            if self._dead > DEAD_FRACTION * self._n and self._dead > MIN_BUFFER:
+                self._rebuild()
+            return len(rows)
+
+    def _rebuild(self) -> None:
+        """
+        Слияние буфера с отсортированной частью (и сжатие удалённых строк).
+        """
+        if self._dead > DEAD_FRACTION * self._n:
+            self._compact()
+        rows = np.flatnonzero(self._alive[:self._n])
+        start, end = self.start[rows], self.end[rows]
+        level = np.log2((end - start + 1).astype(np.float64)).astype(np.int64)
+        part = self.team[rows].astype(np.int64) * 64 + level
+        order = np.lexsort((start, part))
+        rows, start, end, part = rows[order], start[order], end[order], part[order]
+        bounds = np.flatnonzero(np.diff(part)) + 1
+        self._levels = [
+            (int(part[a]) // 64, int(part[a]) % 64, start[a:b], end[a:b], rows[a:b])
+            for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(rows)])
+            if b > a
+        ]
+        self._sorted_rows = len(rows)
+        self._buffer = np.zeros(0, dtype=np.int64)
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self._alive[:self._n])
+        remap = np.full(self._n, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        for name in ("plan", "task", "team", "start", "end", "_alive"):
+            setattr(self, name, getattr(self, name)[keep].copy())
+        self._plan_rows = {p: remap[rows] for p, rows in self._plan_rows.items()}
+        self._n = len(keep)
+        self._dead = 0
+
+    # --- ЗАПРОСЫ ---
+
+    def overlapping(self, lo: int, hi: int, team: int | None = None, task: int | None = None,
+                    exclude_plan: int | None = None) -> np.ndarray:
+        """
+        Строки интервалов, пересекающих [lo; hi] (с фильтром по команде,
+        задаче и без строк плана exclude_plan), по возрастанию номера строки.
+        """
+        # Ключи поиска — того же типа, что массивы: с int Python searchsorted
+        # приводил бы весь массив к int64 (O(n) на запрос)
+        lo32, hi32 = np.int32(lo), np.int32(hi)
+        with self._lock:
+            parts = []
+            for part_team, k, start, end, rows in self._levels:
+                if team is not None and part_team != team:
+                    continue
+                a = start.searchsorted(np.int32(lo - (2 << k) + 2))
+                b = start.searchsorted(hi32, side="right")
+                if b > a:
+                    parts.append(rows[a:b][end[a:b] >= lo32])
+            if len(self._buffer):
+                buf = self._buffer
+                parts.append(buf[(self.start[buf] <= hi32) & (self.end[buf] >= lo32)])
+            found = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+            keep = self._alive[found]
+            if team is not None:
+                keep &= self.team[found] == team
+            if task is not None:
+                keep &= self.task[found] == task
+            if exclude_plan is not None:
+                keep &= self.plan[found] != exclude_plan
+            return np.sort(found[keep])
+
+    def stabbing(self, day: int, **filters) -> np.ndarray:
+        """
+        Строки интервалов, содержащих день day.
+        """
+        return self.overlapping(day, day, **filters)
+
+
+# --- ЗАДАЧИ ХРАНИМЫХ ПЛАНОВ ---
+
+class TaskIndex:
+    """
+    IntervalIndex задач планов из хранилища с названиями ДЗО и задач.
+    Обновляется по уведомлениям хранилища о сохранённых планах.
+    """
+
+    def __init__(self):
+        self.index = IntervalIndex()
+        self._names: dict[str, int] = {}
+        self._dzo: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _task_code(self, name: str) -> int:
+        return self._names.setdefault(name, len(self._names))
+
+    def add_rows(self, rows) -> None:
+        """
+        rows — (plan_id, ДЗО, задача, команда, начало, окончание) с датами
+        порядковыми номерами (planner.repository.PlanRepository.task_rows).
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        for r in rows:
+            self._dzo[r[0]] = r[1]
+        team_index = {t: i for i, t in enumerate(TEAMS)}
+        self.index.add(
+            [r[0] for r in rows],
+            [self._task_code(r[2]) for r in rows],
+            [team_index.get(r[3], 0) for r in rows],
+            [r[4] for r in rows],
+            [r[5] for r in rows],
+        )
+
+    def replace_plans(self, plan_ids, rows) -> None:
+        """
+        Новые строки для изменившихся планов (старые строки удаляются).
+        """
+        for plan_id in plan_ids:
+            self.index.remove_plan(plan_id)
+            self._dzo.pop(plan_id, None)
+        self.add_rows(rows)
+
+    def spans(self, found: np.ndarray) -> list[TaskSpan]:
+        names = list(self._names)
+        ix = self.index
+        return [
+            TaskSpan(p, self._dzo.get(p, ""), names[t], TEAMS[c], date.fromordinal(s), date.fromordinal(e))
+            for p, t, c, s, e in zip(ix.plan[found].tolist(), ix.task[found].tolist(), ix.team[found].tolist(),
+                                     ix.start[found].tolist(), ix.end[found].tolist())
+        ]
+
+    def overlapping(self, start: date, end: date, team: str | None = None, task: str | None = None,
+                    exclude_plan: int | None = None) -> list[TaskSpan]:
+        """
+        Задачи, идущие хотя бы один день периода [start; end] (по дате начала).
+        team — только задачи команды, task — только задачи с таким названием.
+        """
+        if task is not None and task not in self._names:
+            return []
+        found = self.index.overlapping(
+            start.toordinal(), end.toordinal(),
+            team=TEAMS.index(team) if team is not None else None,
+            task=self._names[task] if task is not None else None,
+            exclude_plan=exclude_plan,
+        )
+        return sorted(self.spans(found), key=lambda s: (s.start, s.plan_id))
+
+    def conflicts(self, plan, team_of, exclude_plan: int | None = None) -> dict[str, list[TaskSpan]]:
+        """
+        Пересечения задач плана с задачами той же команды в других хранимых
+        планах: {задача: [задачи других планов]}. team_of(имя) -> команда или None.
+        """
+        result = {}
+        for t in plan.tasks:
+            team = team_of(t.name)
+            if team is None:
+                continue
+            found = self.overlapping(t.start, t.end, team=team, exclude_plan=exclude_plan)
+            if found:
+                result[t.name] = found
+        return result
+
+
+_indexes: dict[str, TaskIndex] = {}
+_indexes_lock = threading.Lock()
+# Планы, записанные в хранилище после последнего обращения к его индексу:
+# подписка только помечает их, строки перечитываются при следующем обращении
+_stale: dict[str, set[int]] = {}
+_stale_lock = threading.Lock()
+
+
+def _invalidate(path: str, plan_ids) -> None:
+    with _stale_lock:
+        _stale[path].update(plan_ids)
+
+
+def get_task_index(repo) -> TaskIndex:
+    """
+    Общий для процесса индекс задач хранилища repo: строится при первом
+    обращении; планы, сохранённые в repo после предыдущего обращения
+    (подписка repo.subscribe), перечитываются перед возвратом индекса.
+    """
+    with _indexes_lock:
+        index = _indexes.get(repo.path)
+        if index is None:
+            index = _indexes[repo.path] = TaskIndex()
+            _stale[repo.path] = set()
+            repo.subscribe(lambda plan_ids: _invalidate(repo.path, plan_ids))
+            index.add_rows(repo.task_rows())
+            return index
+        with _stale_lock:
+            plan_ids = sorted(_stale[repo.path])
+            _stale[repo.path].clear()
+        if plan_ids:
+            index.replace_plans(plan_ids, repo.task_rows(plan_ids))
+        return index
@@ -0,0 +1,284 @@
+"""
+Фоновые выгрузки: очередь заданий на пуле процессов и дисковый кэш файлов.
+
+Страница ставит задание (submit) и сразу продолжает работу; задание строит
+файл в пуле процессов, готовый файл попадает в ArtifactStore — каталог с
+ограничением по суммарному размеру и сроку хранения. Ключ задания — отпечаток
+входных данных (planner.cache.fingerprint): повторный запрос той же выгрузки
+получает уже готовый файл или уже поставленное задание, а не новую сборку.
+
+Функции заданий выполняются в другом процессе, поэтому должны быть функциями
+уровня модуля: fn(*args, path) пишет результат в файл path.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import BrokenExecutor, Future
+from dataclasses import dataclass, field
+
+DEFAULT_STORE_DIR = os.environ.get("EXPORT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "planner-exports")
+DEFAULT_MAX_BYTES = 1 << 30          # 1 ГБ
+DEFAULT_TTL = 24 * 3600              # сутки с последнего обращения
+MAX_JOBS = 1024                      # завершённых заданий, которые помнит очередь
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_TEMP_PREFIX = ".tmp-"
+
+
+# --- ДИСКОВЫЙ КЭШ ФАЙЛОВ ---
+
+class ArtifactStore:
+    """
+    Каталог готовых файлов «<ключ>.<расширение>». Файл, к которому не
+    обращались дольше ttl секунд, удаляется; при превышении max_bytes
+    удаляются давно не использованные. Время обращения — mtime файла.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def temp_path(self, ext: str) -> str:
+        """
+        Путь для сборки файла в том же каталоге: готовый файл переносится
+        на место атомарно (os.replace), недописанный под ключом не виден.
+        """
+        return os.path.join(self.root, f"{_TEMP_PREFIX}{uuid.uuid4().hex}.{ext}")
+
+    def get(self, key: str, ext: str) -> str | None:
+        """
+        Путь к готовому файлу или None (нет или истёк срок).
+        """
+        path = self.path(key, ext)
+        with self._lock:
+            try:
+                if time.time() - os.stat(path).st_mtime > self.ttl:
+                    self._remove(path)
+                    raise FileNotFoundError(path)
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return path
+
+    def put(self, key: str, ext: str, temp_path: str) -> str:
+        """
+        Перенос собранного файла под ключ и вытеснение лишнего.
+        """
+        path = self.path(key, ext)
+        with self._lock:
+            os.replace(temp_path, path)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.root):
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+            # Брошенные временные файлы (упавший процесс) удаляются по тому же сроку
+            if now - st.st_mtime > self.ttl and entry.path != keep:
+                self._remove(entry.path)
+            elif not entry.name.startswith(_TEMP_PREFIX):
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                self._remove(path)
+                total -= size
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+            self.evictions += 1
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        files = [e for e in os.scandir(self.root) if e.is_file() and not e.name.startswith(_TEMP_PREFIX)]
+        return {
+            "name": "artifacts",
+            "size": len(files),
+            "bytes": sum(e.stat().st_size for e in files),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# --- ОЧЕРЕДЬ ЗАДАНИЙ ---
+
+@dataclass
+class Job:
+    key: str
+    ext: str
+    title: str
+    submitted: float = field(default_factory=time.time)
+    finished: float | None = None
+    path: str | None = None      # готовый файл в ArtifactStore
+    error: str | None = None
+    future: Future | None = field(default=None, repr=False)
+
+    @property
+    def state(self) -> str:
+        if self.error is not None:
+            return FAILED
+        if self.path is not None:
+            return DONE
+        return RUNNING if self.future is not None and self.future.running() else QUEUED
+
+    @property
+    def pending(self) -> bool:
+        return self.state in (QUEUED, RUNNING)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.submitted
+
+
+def _run_job(fn, args, path):
+    """
+    Выполняется в процессе-исполнителе.
+    """
+    fn(*args, path)
+    return path
+
+
+class JobQueue:
+    """
+    Очередь выгрузок на пуле из workers процессов: задания с одинаковым ключом
+    объединяются, готовые файлы берутся из ArtifactStore. Пул создаётся при
+    первом задании и пересоздаётся, если его процесс погиб (например, по
+    нехватке памяти), — иначе очередь перестала бы принимать задания.
+    """
+
+    def __init__(self, store: ArtifactStore, workers: int | None = None):
+        self.store = store
+        self.workers = workers or max((os.cpu_count() or 1) // 2, 1)
+        self._executor = None
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _discard_pool(self, pool) -> None:
+        if self._executor is pool:
+            self._executor = None
+            pool.shutdown(wait=False)
+
+    def submit(self, key: str, ext: str, fn, *args, title: str = "") -> Job:
+        """
+        Задание на файл с ключом key: готовый файл из кэша, уже идущее
+        задание с тем же ключом или новое задание fn(*args, path).
+        Упавшее задание при повторном запросе ставится заново.
+        """
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is not None and job.pending:
+                return job
+            path = self.store.get(key, ext)
+            if path is not None:
+                if job is None or job.path != path:
+                    now = time.time()
+                    job = self._jobs[key] = Job(key, ext, title, submitted=now, finished=now, path=path)
+                return job
+            job = self._jobs[key] = Job(key, ext, title)
+            temp_path = self.store.temp_path(ext)
+            pool = self._pool()
+            try:
+                job.future = pool.submit(_run_job, fn, args, temp_path)
+            except BrokenExecutor:
+                self._discard_pool(pool)
+                pool = self._pool()
+                job.future = pool.submit(_run_job, fn, args, temp_path)
+        job.future.add_done_callback(lambda fut: self._finish(job, fut, temp_path, pool))
+        return job
+
+    def _finish(self, job: Job, fut: Future, temp_path: str, pool) -> None:
+        path = error = None
+        try:
+            fut.result()
+            path = self.store.put(job.key, job.ext, temp_path)
+        except Exception as e:  # ошибка задания показывается на странице, а не роняет очередь
+            error = f"{type(e).__name__}: {e}"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if isinstance(e, BrokenExecutor):
+                with self._lock:
+                    self._discard_pool(pool)
+        # По path/error задание считается завершённым — finished заполняется раньше
+        with self._lock:
+            job.finished = time.time()
+            job.path, job.error = path, error
+
+    def _prune(self) -> None:
+        """
+        Под self._lock: забывает завершённые задания, чей файл вытеснен из
+        кэша или старше срока хранения, а сверх MAX_JOBS — самые давние.
+        """
+        now = time.time()
+        for key, job in list(self._jobs.items()):
+            if job.pending:
+                continue
+            if (job.path is not None and not os.path.exists(job.path)) or now - job.finished > self.store.ttl:
+                del self._jobs[key]
+        excess = len(self._jobs) - MAX_JOBS
+        if excess > 0:
+            finished = sorted((job for job in self._jobs.values() if not job.pending), key=lambda job: job.finished)
+            for job in finished[:excess]:
+                del self._jobs[job.key]
+
+    def get(self, key: str) -> Job | None:
+        return self._jobs.get(key)
+
+    def jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_queues: dict[str, JobQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_job_queue(root: str = DEFAULT_STORE_DIR) -> JobQueue:
+    """
+    Общая для процесса очередь выгрузок (все сессии) с кэшем в каталоге root.
+    """
+    with _queues_lock:
+        queue = _queues.get(root)
+        if queue is None:
+            queue = _queues[root] = JobQueue(ArtifactStore(root))
+        return queue
+
+
+def read_artifact(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
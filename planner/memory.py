@@ -0,0 +1,119 @@
+"""
+Память, которую занимает одна сессия страницы.
+
+deep_sizeof() обходит граф объектов значения session_state; объекты, общие
+для всех сессий процесса (справочник, планы и артефакты в кэшах), не
+учитываются. Объект с методом nbytes() (PlanState) считает себя сам.
+
+Запуск (одна сессия через streamlit.testing, оценка на N сессий):
+    python -m planner.memory main2.py --sessions 1000
+"""
+
+import argparse
+import os
+import sys
+import types
+
+import numpy as np
+
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, shared: set | None = None, _seen: set | None = None) -> int:
+    """
+    Размер объекта со всем, на что он ссылается (байт), без объектов из shared (id).
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or (shared and id(obj) in shared) or isinstance(obj, _SKIP_TYPES):
+        return 0
+    seen.add(id(obj))
+
+    own = getattr(obj, "nbytes", None)
+    if callable(own):
+        return own()
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) if obj.base is None else sys.getsizeof(obj) + deep_sizeof(obj.base, shared, seen)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += deep_sizeof(k, shared, seen) + deep_sizeof(v, shared, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += deep_sizeof(v, shared, seen)
+    else:
+        if hasattr(obj, "__dict__"):
+            size += deep_sizeof(vars(obj), shared, seen)
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if hasattr(obj, slot):
+                    size += deep_sizeof(getattr(obj, slot), shared, seen)
+    return size
+
+
+def shared_ids() -> set:
+    """
+    id объектов, общих для всех сессий процесса: справочник и значения кэшей.
+    """
+    from planner.cache import figure_cache, schedule_cache, workbook_cache
+    from planner.catalog import get_catalog
+
+    ids = {id(get_catalog())}
+    for cache in (schedule_cache, workbook_cache, figure_cache):
+        ids.update(id(v) for v in cache.values())
+    return ids
+
+
+def session_memory(items) -> list[tuple[str, int]]:
+    """
+    [(ключ, байт), ...] по парам (ключ, значение) session_state, по убыванию размера.
+    """
+    shared = shared_ids()
+    seen = set()
+    rows = [(str(k), sys.getsizeof(k) + deep_sizeof(v, shared, seen)) for k, v in items]
+    return sorted(rows, key=lambda r: -r[1])
+
+
+def measure(script: str) -> tuple[list[tuple[str, int]], int]:
+    """
+    Одна сессия: все включаемые контроли отмечены, план рассчитан.
+    Возвращает размеры значений по ключам и полный размер состояния сессии
+    вместе со служебными данными виджетов Streamlit.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(script), default_timeout=120)
+    at.run()
+    at.text_input[0].input("ДЗО")
+    for cb in at.checkbox:
+        cb.check()
+    at.run()
+    at.button[0].click()
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"Исключение при прогоне {script}: {at.exception[0].value}")
+    rows = session_memory(at.session_state.items())
+    internal = getattr(at.session_state._state, "_state", None)  # SessionState (внутренний объект Streamlit)
+    total = deep_sizeof(internal, shared_ids()) if internal is not None else sum(size for _, size in rows)
+    return rows, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память одной сессии страницы Streamlit")
+    parser.add_argument("script", nargs="?", default="main2.py", help="скрипт страницы")
+    parser.add_argument("--sessions", type=int, default=1000, help="для скольких сессий дать оценку")
+    parser.add_argument("--top", type=int, default=10, help="сколько ключей показать")
+    args = parser.parse_args(argv)
+
+    rows, total = measure(args.script)
+    print(f"Ключей session_state: {len(rows)}, значения: {sum(size for _, size in rows) / 1024:.1f} КБ, "
+          f"всего с состоянием виджетов: {total / 1024:.1f} КБ")
+    for key, size in rows[:args.top]:
+        print(f"  {size / 1024:9.1f} КБ  {key}")
+    print(f"Оценка на {args.sessions} сессий: {total * args.sessions / 2**20:.1f} МБ "
+          f"(без общих справочника и кэшей)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Профилирование прогонов страницы (включается явно).
+
+SessionProfiler хранит историю замеров одной сессии: время именованных секций
+(мс), число чтений и записей session_state за прогон и размеры артефактов
+(байт). По завершении прогона в JSON-лог (одна запись в строке) пишутся замеры
+прогона и p50/p95 по истории сессии. NullProfiler — заглушка с тем же
+интерфейсом, когда профилирование выключено.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+HISTORY_SIZE = 200
+
+# Счётчики обращений к состоянию — на поток прогона (каждая сессия Streamlit
+# выполняет скрипт в своём потоке); считаются, только пока идёт прогон.
+_local = threading.local()
+_instrumented = set()
+
+
+def instrument_mapping(cls) -> None:
+    """
+    Оборачивает методы доступа класса-словаря (SessionStateProxy) счётчиками
+    чтений/записей. Повторный вызов для того же класса ничего не делает.
+    """
+    if cls in _instrumented:
+        return
+    _instrumented.add(cls)
+
+    def wrap(method, attr):
+        def counted(self, *args, **kwargs):
+            counts = getattr(_local, "counts", None)
+            if counts is not None:
+                counts[attr] += 1
+            return method(self, *args, **kwargs)
+        counted.__name__ = method.__name__
+        counted.__wrapped__ = method
+        return counted
+
+    for name, attr in (("__getitem__", "reads"), ("__contains__", "reads"),
+                       ("__setitem__", "writes"), ("__delitem__", "writes")):
+        setattr(cls, name, wrap(getattr(cls, name), attr))
+
+
+def percentile(values, q: float) -> float:
+    """
+    Перцентиль с линейной интерполяцией (q от 0 до 100).
+    """
+    data = sorted(values)
+    if not data:
+        return 0.0
+    pos = (len(data) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (pos - lo)
+
+
+class SessionProfiler:
+    enabled = True
+
+    def __init__(self, session_id: str, log_path: str | None = None, history: int = HISTORY_SIZE):
+        self.session_id = session_id
+        self.log_path = log_path
+        self.history = defaultdict(lambda: deque(maxlen=history))  # метрика -> последние значения
+        self.last = {}            # метрика -> значение в последнем прогоне
+        self.runs = 0
+        self._run = None          # (вид, t0, секции, размеры) текущего прогона
+
+    # --- ПРОГОН ---
+
+    def begin_run(self, kind: str = "script") -> None:
+        self._run = (kind, time.perf_counter(), {}, {})
+        _local.counts = {"reads": 0, "writes": 0}
+
+    def end_run(self) -> dict | None:
+        if self._run is None:
+            return None
+        kind, t0, sections, sizes = self._run
+        counts = getattr(_local, "counts", None) or {"reads": 0, "writes": 0}
+        _local.counts = None
+        self._run = None
+        self.runs += 1
+
+        metrics = {f"{kind}.total": (time.perf_counter() - t0) * 1000}
+        metrics.update(sections)
+        metrics["state.reads"] = counts["reads"]
+        metrics["state.writes"] = counts["writes"]
+        for name, value in metrics.items():
+            self.history[name].append(value)
+        self.last = {**metrics, **sizes}
+        for name, value in sizes.items():
+            self.history[name].append(value)
+
+        record = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "session": self.session_id,
+            "run": kind,
+            "sections_ms": {k: round(v, 3) for k, v in metrics.items() if not k.startswith("state.")},
+            "state_reads": counts["reads"],
+            "state_writes": counts["writes"],
+            "sizes_bytes": sizes,
+            "p50": {k: round(percentile(v, 50), 3) for k, v in self.history.items()},
+            "p95": {k: round(percentile(v, 95), 3) for k, v in self.history.items()},
+        }
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    @contextmanager
+    def run(self, kind: str):
+        """
+        Отдельный прогон (например, перезапуск фрагмента); внутри уже идущего
+        прогона — просто секция.
+        """
+        if self._run is not None:
+            with self.section(kind):
+                yield
+            return
+        self.begin_run(kind)
+        try:
+            yield
+        finally:
+            self.end_run()
+
+    # --- ЗАМЕРЫ ---
+
+    @contextmanager
+    def section(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._run is not None:
+                sections = self._run[2]
+                sections[name] = sections.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+    def record_size(self, name: str, nbytes: int) -> None:
+        if self._run is not None:
+            self._run[3][name] = int(nbytes)
+
+    def summary(self) -> list[dict]:
+        """
+        Строки для таблицы: метрика, последний прогон, p50, p95, число замеров.
+        """
+        return [
+            {
+                "Метрика": name,
+                "Последний": round(self.last[name], 2) if name in self.last else None,
+                "p50": round(percentile(values, 50), 2),
+                "p95": round(percentile(values, 95), 2),
+                "Замеров": len(values),
+            }
+            for name, values in sorted(self.history.items())
+        ]
+
+
+class NullProfiler:
+    """
+    Профилирование выключено: все операции ничего не делают.
+    """
+    enabled = False
+
+    def begin_run(self, kind: str = "script") -> None:
+        pass
+
+    def end_run(self) -> None:
+        return None
+
+    def run(self, kind: str):
+        return nullcontext()
+
+    def section(self, name: str):
+        return nullcontext()
+
+    def record_size(self, name: str, nbytes: int) -> None:
+        pass
+
+    def summary(self) -> list:
+        return []
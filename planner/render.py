@@ -0,0 +1,296 @@
+"""
+Статичная диаграмма Ганта плана в SVG и PNG — без браузера и kaleido.
+
+Повторяет вид build_gantt_figure: цвета категорий, задачи по дате начала
+сверху вниз, длительность (раб. дн) внутри бара, красная обводка критического
+пути; нерабочие дни производственного календаря затенены. Разметка считается
+один раз (gantt_layout) и рисуется двумя способами: текстом SVG и через
+Pillow (ImageDraw) для PNG.
+"""
+
+import importlib.util
+import io
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from planner.catalog import CATEGORY_COLORS
+from planner.engine import Plan
+from planner.gantt import CRITICAL_LINE_COLOR, CRITICAL_LINE_WIDTH
+from planner.workdays import get_calendar
+
+WIDTH = 1200
+ROW_HEIGHT = 26
+FONT_SIZE = 12
+MAX_LABEL_WIDTH = 360
+LEGEND_HEIGHT = 36
+AXIS_HEIGHT = 34
+MIN_TICK_SPACING = 70   # пикселей между подписями оси дат
+
+BACKGROUND = "#ffffff"
+GRID_COLOR = "#e5e9f0"
+HOLIDAY_COLOR = "#f2f3f5"
+TEXT_COLOR = "#2a3f5f"
+BAR_TEXT_COLOR = "#ffffff"
+FONT_FAMILY = "DejaVu Sans, Arial, sans-serif"
+
+# Средняя ширина символа в долях кегля — для оценки ширины текста без шрифта
+_CHAR_WIDTH = 0.6
+
+
+@dataclass(frozen=True)
+class Rect:
+    x: float
+    y: float
+    w: float
+    h: float
+    fill: str
+    stroke: str | None = None
+    stroke_width: float = 0
+
+
+@dataclass(frozen=True)
+class Text:
+    x: float
+    y: float          # середина строки
+    text: str
+    fill: str = TEXT_COLOR
+    anchor: str = "start"   # start | middle | end
+    size: int = FONT_SIZE
+
+
+@dataclass(frozen=True)
+class Line:
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    color: str = GRID_COLOR
+
+
+@dataclass(frozen=True)
+class GanttLayout:
+    width: int
+    height: int
+    # Порядок отрисовки: фон и нерабочие дни, сетка, бары и легенда, подписи
+    background: tuple
+    lines: tuple
+    rects: tuple
+    texts: tuple
+
+
+def _text_width(text: str, size: int = FONT_SIZE) -> float:
+    return len(text) * size * _CHAR_WIDTH
+
+
+def _fit(text: str, width: float, size: int = FONT_SIZE) -> str:
+    """
+    Текст, обрезанный с «…» под ширину.
+    """
+    n = int(width // (size * _CHAR_WIDTH))
+    return text if len(text) <= n else text[:max(n - 1, 0)] + "…"
+
+
+def _ticks(first: date, last: date, px_per_day: float) -> tuple[list[date], str]:
+    """
+    Подписи оси дат: дни, недели (понедельники), месяцы, кварталы или годы —
+    самый мелкий шаг, при котором подписи не налезают друг на друга.
+    """
+    days = (last - first).days + 1
+    if px_per_day >= MIN_TICK_SPACING:
+        return [first + timedelta(days=i) for i in range(days)], "%d.%m"
+    if 7 * px_per_day >= MIN_TICK_SPACING:
+        monday = first + timedelta(days=-first.weekday() % 7)
+        return [monday + timedelta(weeks=i) for i in range((last - monday).days // 7 + 1)], "%d.%m"
+    for months, fmt in ((1, "%m.%Y"), (3, "%m.%Y"), (12, "%Y")):
+        if 30.4 * months * px_per_day >= MIN_TICK_SPACING or months == 12:
+            y, m = first.year, first.month
+            m = (m - 1) // months * months + 1
+            ticks = []
+            while date(y, m, 1) <= last:
+                if date(y, m, 1) >= first:
+                    ticks.append(date(y, m, 1))
+                y, m = (y + 1, m + months - 12) if m + months > 12 else (y, m + months)
+            return ticks, fmt
+
+
+def _holiday_runs(first: date, last: date, dzo_name: str) -> list[tuple[int, int]]:
+    """
+    Отрезки нерабочих дней [от; до) в днях от first.
+    """
+    days = np.arange(np.datetime64(first, "D"), np.datetime64(last, "D") + 1)
+    off = ~get_calendar(dzo_name).is_workday_array(days)
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], off, [False])).astype(np.int8)))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def gantt_layout(plan: Plan, width: int = WIDTH) -> GanttLayout:
+    """
+    Геометрия диаграммы: прямоугольники, линии сетки и подписи в пикселях.
+    """
+    if not plan.tasks:
+        raise ValueError("В плане нет задач — диаграмму строить не из чего")
+    tasks = sorted(plan.tasks, key=lambda t: t.start)
+    first = min(t.start for t in tasks)
+    last = max(t.end for t in tasks)
+
+    label_w = min(max(_text_width(t.name) for t in tasks) + 16, MAX_LABEL_WIDTH)
+    x0, x1 = label_w, width - 16
+    y0 = LEGEND_HEIGHT
+    height = int(y0 + len(tasks) * ROW_HEIGHT + AXIS_HEIGHT)
+    n_days = (last - first).days + 1
+    px_per_day = (x1 - x0) / n_days
+
+    def x(d: date) -> float:
+        return x0 + (d - first).days * px_per_day
+
+    background = [Rect(0, 0, width, height, BACKGROUND)]
+    lines, rects, texts = [], [], []
+
+    # Нерабочие дни — только если день шире пикселя, иначе фон превращается в сплошную заливку
+    if px_per_day >= 1:
+        plot_h = len(tasks) * ROW_HEIGHT
+        for a, b in _holiday_runs(first, last, plan.input.dzo_name):
+            background.append(Rect(x0 + a * px_per_day, y0, (b - a) * px_per_day, plot_h, HOLIDAY_COLOR))
+
+    ticks, fmt = _ticks(first, last, px_per_day)
+    axis_y = y0 + len(tasks) * ROW_HEIGHT
+    for d in ticks:
+        lines.append(Line(x(d), y0, x(d), axis_y))
+        texts.append(Text(x(d), axis_y + AXIS_HEIGHT / 2, d.strftime(fmt), anchor="middle"))
+    lines.append(Line(x0, axis_y, x1, axis_y, TEXT_COLOR))
+
+    # Легенда — категории в порядке справочника, только встречающиеся в плане
+    lx = x0
+    present = {t.category for t in tasks}
+    for category, color in CATEGORY_COLORS.items():
+        if category in present:
+            rects.append(Rect(lx, LEGEND_HEIGHT / 2 - 6, 12, 12, color))
+            texts.append(Text(lx + 18, LEGEND_HEIGHT / 2, category))
+            lx += 18 + _text_width(category) + 24
+
+    bar_h = ROW_HEIGHT * 0.8
+    for i, t in enumerate(tasks):
+        cy = y0 + (i + 0.5) * ROW_HEIGHT
+        texts.append(Text(x0 - 8, cy, _fit(t.name, label_w - 16), anchor="end"))
+        bx, bw = x(t.start), ((t.end - t.start).days + 1) * px_per_day
+        rects.append(Rect(
+            bx, cy - bar_h / 2, bw, bar_h, CATEGORY_COLORS[t.category],
+            CRITICAL_LINE_COLOR if t.critical else None, CRITICAL_LINE_WIDTH if t.critical else 0,
+        ))
+        label = str(t.duration)
+        if _text_width(label) + 4 <= bw:
+            texts.append(Text(bx + bw / 2, cy, label, BAR_TEXT_COLOR, "middle"))
+
+    return GanttLayout(width, height, tuple(background), tuple(lines), tuple(rects), tuple(texts))
+
+
+# --- SVG ---
+
+def _svg_rect(r: Rect) -> str:
+    stroke = f' stroke="{r.stroke}" stroke-width="{r.stroke_width}"' if r.stroke else ""
+    return f'<rect x="{r.x:.1f}" y="{r.y:.1f}" width="{r.w:.1f}" height="{r.h:.1f}" fill="{r.fill}"{stroke}/>'
+
+
+def gantt_svg(plan: Plan, width: int = WIDTH) -> str:
+    """
+    Диаграмма Ганта плана в SVG (строка).
+    """
+    lay = gantt_layout(plan, width)
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{lay.width}" height="{lay.height}" '
+        f'viewBox="0 0 {lay.width} {lay.height}" font-family="{FONT_FAMILY}" font-size="{FONT_SIZE}">'
+    ]
+    for r in lay.background:
+        out.append(_svg_rect(r))
+    for ln in lay.lines:
+        out.append(f'<line x1="{ln.x1:.1f}" y1="{ln.y1:.1f}" x2="{ln.x2:.1f}" y2="{ln.y2:.1f}" stroke="{ln.color}"/>')
+    for r in lay.rects:
+        out.append(_svg_rect(r))
+    for t in lay.texts:
+        out.append(
+            f'<text x="{t.x:.1f}" y="{t.y:.1f}" fill="{t.fill}" text-anchor="{t.anchor}" '
+            f'dominant-baseline="central">{escape(t.text)}</text>'
+        )
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+# --- PNG (Pillow) ---
+
+_PIL_ANCHOR = {"start": "lm", "middle": "mm", "end": "rm"}
+
+
+# Системный DejaVuSans (Debian/Ubuntu: пакет fonts-dejavu-core)
+SYSTEM_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+def _font_path() -> str | None:
+    """
+    Шрифт с кириллицей для PNG: переменная окружения GANTT_FONT, DejaVuSans из
+    поставки matplotlib (без импорта самого пакета) или системный DejaVuSans.
+    """
+    candidates = [os.environ.get("GANTT_FONT")]
+    spec = importlib.util.find_spec("matplotlib")
+    if spec is not None and spec.submodule_search_locations:
+        candidates.append(os.path.join(spec.submodule_search_locations[0], "mpl-data", "fonts", "ttf", "DejaVuSans.ttf"))
+    candidates.append(SYSTEM_FONT_PATH)
+    return next((path for path in candidates if path and os.path.exists(path)), None)
+
+
+@lru_cache(maxsize=8)
+def _font(size: int):
+    from PIL import ImageFont
+
+    path = _font_path()
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=4096)
+def _text_mask(text: str, size: int, anchor: str):
+    """
+    Отрисованная подпись (маска "L") и смещение от точки привязки. Подписи
+    повторяются из плана в план (задачи, даты, длительности), а растеризация
+    FreeType — основная цена PNG, поэтому маски кэшируются.
+    """
+    from PIL import Image, ImageDraw
+
+    font = _font(size)
+    left, top, right, bottom = font.getbbox(text, anchor=anchor)
+    mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font, anchor=anchor)
+    return mask, left, top
+
+
+def gantt_png(plan: Plan, width: int = WIDTH, scale: float = 1.0) -> bytes:
+    """
+    Диаграмма Ганта плана в PNG; scale — множитель разрешения (2 — для печати).
+    """
+    from PIL import Image, ImageDraw
+
+    lay = gantt_layout(plan, width)
+    image = Image.new("RGB", (round(lay.width * scale), round(lay.height * scale)), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    def rect(r: Rect):
+        box = (r.x * scale, r.y * scale, (r.x + r.w) * scale, (r.y + r.h) * scale)
+        draw.rectangle(box, fill=r.fill)
+        if r.stroke:
+            draw.rectangle(box, outline=r.stroke, width=max(round(r.stroke_width * scale), 1))
+
+    for r in lay.background[1:]:  # фон уже залит при создании изображения
+        rect(r)
+    for ln in lay.lines:
+        draw.line((ln.x1 * scale, ln.y1 * scale, ln.x2 * scale, ln.y2 * scale), fill=ln.color, width=max(round(scale), 1))
+    for r in lay.rects:
+        rect(r)
+    for t in lay.texts:
+        mask, dx, dy = _text_mask(t.text, round(t.size * scale), _PIL_ANCHOR[t.anchor])
+        image.paste(t.fill, (round(t.x * scale) + dx, round(t.y * scale) + dy), mask)
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
@@ -0,0 +1,637 @@
+"""
+Хранилище планов в SQLite: входные данные и текстовые поля формы по ревизиям,
+рассчитанные задачи текущей ревизии и индексы для выборок.
+
+Даты хранятся порядковыми номерами дней (date.toordinal). Выборки по периоду
+идут по индексам R*Tree (plan_spans — сроки планов, task_spans — сроки задач
+команд Ростелеком); если SQLite собран без R*Tree, вместо них используются
+обычные таблицы с B-деревом по началу периода.
+
+Запуск (наполнение и замер выборок):
+    python -m planner.repository plans.sqlite3 --fill 100000
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from planner.catalog import TEAM_KEYWORDS, TEAM_PENTEST, get_catalog
+from planner.engine import ControlInput, Plan, PlanInput
+
+DEFAULT_DB_PATH = os.environ.get("PLAN_DB", "plans.sqlite3")
+SCHEMA_VERSION = 1
+
+STATUS_DRAFT = "Черновик"
+STATUS_APPROVED = "Согласован"
+STATUS_ACTIVE = "В работе"
+STATUS_DONE = "Завершён"
+STATUSES = (STATUS_DRAFT, STATUS_APPROVED, STATUS_ACTIVE, STATUS_DONE)
+
+# Текстовые поля формы, которые хранятся вместе с ревизией (как в PlanMeta)
+META_FIELDS = ("goals", "objects", "group_rt", "group_dzo")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    dzo_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    revision INTEGER NOT NULL,          -- текущая ревизия
+    start_day INTEGER NOT NULL,         -- дата начала контроля ИБ
+    end_day INTEGER NOT NULL,           -- окончание плана
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_dzo ON plans (dzo_name);
+CREATE INDEX IF NOT EXISTS plans_status ON plans (status);
+CREATE INDEX IF NOT EXISTS plans_start ON plans (start_day);
+CREATE INDEX IF NOT EXISTS plans_end ON plans (end_day);
+CREATE INDEX IF NOT EXISTS plans_updated ON plans (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS revisions (
+    plan_id INTEGER NOT NULL REFERENCES plans (id),
+    revision INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    end_day INTEGER NOT NULL,
+    input TEXT NOT NULL,                -- PlanInput в JSON
+    meta TEXT NOT NULL,                 -- текстовые поля формы в JSON
+    PRIMARY KEY (plan_id, revision)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    plan_id INTEGER NOT NULL REFERENCES plans (id),
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    team TEXT,
+    start_day INTEGER NOT NULL,
+    end_day INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    critical INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_plan ON tasks (plan_id);
+"""
+
+# Интервальные индексы: (id, начало, конец); у task_spans ещё код команды
+_SPANS_RTREE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS plan_spans USING rtree_i32 (id, lo, hi);
+CREATE VIRTUAL TABLE IF NOT EXISTS task_spans USING rtree_i32 (id, lo, hi, team_lo, team_hi, +plan_id);
+"""
+_SPANS_BTREE = """
+CREATE TABLE IF NOT EXISTS plan_spans (id INTEGER PRIMARY KEY, lo INTEGER, hi INTEGER);
+CREATE INDEX IF NOT EXISTS plan_spans_lo ON plan_spans (lo, hi);
+CREATE TABLE IF NOT EXISTS task_spans (
+    id INTEGER PRIMARY KEY, lo INTEGER, hi INTEGER, team_lo INTEGER, team_hi INTEGER, plan_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS task_spans_team ON task_spans (team_lo, lo, hi);
+"""
+
+
+@dataclass(frozen=True)
+class PlanSummary:
+    plan_id: int
+    dzo_name: str
+    status: str
+    revision: int
+    start: date
+    end: date
+    updated_at: str
+
+
+@dataclass(frozen=True)
+class StoredPlan:
+    plan_id: int
+    revision: int
+    status: str
+    created_at: str
+    input: PlanInput
+    meta: dict          # goals, objects, group_rt, group_dzo
+
+
+@dataclass(frozen=True)
+class TaskOverlap:
+    """
+    Две задачи одной команды из разных планов, идущие одновременно.
+    """
+    team: str
+    plan_id: int
+    dzo_name: str
+    task: str
+    other_plan_id: int
+    other_dzo_name: str
+    other_task: str
+    start: date         # начало пересечения
+    end: date           # окончание пересечения
+
+
+# --- СЕРИАЛИЗАЦИЯ ВХОДА ---
+
+def input_to_json(plan_input: PlanInput) -> str:
+    """
+    Компактный JSON входа: контроли только с заданными значениями.
+    """
+    controls = []
+    for ci in plan_input.controls:
+        if not (ci.enabled or ci.dur is not None or ci.start or ci.order is not None):
+            continue
+        rec = {"name": ci.name}
+        if ci.enabled:
+            rec["enabled"] = True
+        if ci.dur is not None:
+            rec["dur"] = int(ci.dur)
+        if ci.start:
+            rec["start"] = ci.start.isoformat()
+        if ci.order is not None:
+            rec["order"] = int(ci.order)
+        controls.append(rec)
+    return json.dumps(
+        {"dzo_name": plan_input.dzo_name, "info_date": plan_input.info_date.isoformat(), "controls": controls},
+        ensure_ascii=False, separators=(",", ":"),
+    )
+
+
+def input_from_json(text: str) -> PlanInput:
+    data = json.loads(text)
+    controls = tuple(
+        ControlInput(
+            name=rec["name"],
+            enabled=rec.get("enabled", False),
+            dur=rec.get("dur"),
+            start=date.fromisoformat(rec["start"]) if rec.get("start") else None,
+            order=rec.get("order"),
+        )
+        for rec in data.get("controls", [])
+    )
+    return PlanInput(dzo_name=data["dzo_name"], info_date=date.fromisoformat(data["info_date"]), controls=controls)
+
+
+def _team_code(team: str) -> int:
+    """
+    Код команды в task_spans — по порядку команд в TEAM_KEYWORDS (стабилен между процессами).
+    """
+    teams = list(TEAM_KEYWORDS)
+    if team not in teams:
+        raise ValueError(f"Неизвестная команда «{team}»")
+    return teams.index(team) + 1
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _summary(row) -> PlanSummary:
+    plan_id, dzo_name, status, revision, start_day, end_day, updated_at = row
+    return PlanSummary(plan_id, dzo_name, status, revision, date.fromordinal(start_day),
+                       date.fromordinal(end_day), updated_at)
+
+
+# Параметров в одном запросе (ограничение SQLite на число переменных)
+_MAX_SQL_ARGS = 900
+
+# date.toordinal() для 1970-01-01 — начало отсчёта дней в колоночной выгрузке
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_SUMMARY_COLUMNS = "p.id, p.dzo_name, p.status, p.revision, p.start_day, p.end_day, p.updated_at"
+
+
+class PlanRepository:
+    """
+    Хранилище планов. Одно соединение на процесс (запросы сессий Streamlit
+    идут из разных потоков и сериализуются блокировкой); запись пакетами —
+    одной транзакцией на вызов.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.execute("PRAGMA cache_size=-65536")      # 64 МБ страниц в памяти
+        self._db.execute("PRAGMA mmap_size=268435456")
+        self._listeners = []
+        with self._lock:
+            self._migrate()
+
+    def _migrate(self) -> None:
+        db = self._db
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"Хранилище {self.path} создано более новой версией (схема {version})")
+        db.executescript(_SCHEMA)
+        try:
+            db.executescript(_SPANS_RTREE)
+        except sqlite3.OperationalError:  # SQLite без модуля R*Tree
+            db.executescript(_SPANS_BTREE)
+        db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def subscribe(self, callback) -> None:
+        """
+        callback(plan_ids) после каждой записи планов (новые планы, ревизии,
+        копии) — например, для обновления индексов в памяти (planner.intervals).
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, plan_ids: list[int]) -> None:
+        for callback in self._listeners:
+            callback(plan_ids)
+
+    # --- ЗАПИСЬ ---
+
+    def _write(self, cur, plan: Plan, meta: dict | None, status: str, plan_id: int | None) -> tuple[int, int]:
+        catalog = get_catalog()
+        start_day = plan.input.info_date.toordinal()
+        end_day = (plan.overall_end or plan.input.info_date).toordinal()
+        now = _now()
+        if plan_id is None:
+            cur.execute(
+                "INSERT INTO plans (dzo_name, status, revision, start_day, end_day, updated_at) VALUES (?, ?, 1, ?, ?, ?)",
+                (plan.input.dzo_name, status, start_day, end_day, now),
+            )
+            plan_id, revision = cur.lastrowid, 1
+        else:
+            row = cur.execute("SELECT revision FROM plans WHERE id = ?", (plan_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"План №{plan_id} не найден в хранилище")
+            revision = row[0] + 1
+            cur.execute(
+                "UPDATE plans SET dzo_name = ?, status = ?, revision = ?, start_day = ?, end_day = ?, updated_at = ? "
+                "WHERE id = ?",
+                (plan.input.dzo_name, status, revision, start_day, end_day, now, plan_id),
+            )
+            cur.execute("DELETE FROM task_spans WHERE id IN (SELECT id FROM tasks WHERE plan_id = ?)", (plan_id,))
+            cur.execute("DELETE FROM tasks WHERE plan_id = ?", (plan_id,))
+            cur.execute("DELETE FROM plan_spans WHERE id = ?", (plan_id,))
+
+        meta = {k: (meta or {}).get(k, "") for k in META_FIELDS}
+        cur.execute(
+            "INSERT INTO revisions (plan_id, revision, created_at, status, end_day, input, meta) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (plan_id, revision, now, status, end_day, input_to_json(plan.input), json.dumps(meta, ensure_ascii=False)),
+        )
+        cur.execute("INSERT INTO plan_spans (id, lo, hi) VALUES (?, ?, ?)", (plan_id, start_day, end_day))
+
+        spans = []
+        for t in plan.tasks:
+            team = catalog[t.name].team if t.name in catalog else None
+            cur.execute(
+                "INSERT INTO tasks (plan_id, name, category, team, start_day, end_day, duration, critical) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (plan_id, t.name, t.category, team, t.start.toordinal(), t.end.toordinal(), t.duration, int(t.critical)),
+            )
+            if team is not None:
+                code = _team_code(team)
+                spans.append((cur.lastrowid, t.start.toordinal(), t.end.toordinal(), code, code, plan_id))
+        cur.executemany(
+            "INSERT INTO task_spans (id, lo, hi, team_lo, team_hi, plan_id) VALUES (?, ?, ?, ?, ?, ?)", spans
+        )
+        return plan_id, revision
+
+    def save(self, plan: Plan, meta: dict | None = None, status: str = STATUS_DRAFT,
+             plan_id: int | None = None) -> tuple[int, int]:
+        """
+        Сохраняет план: plan_id=None — новый план, иначе — новая ревизия
+        существующего. Возвращает (plan_id, ревизия).
+        """
+        return self.save_many([(plan, meta, plan_id)], status)[0]
+
+    def save_many(self, items, status: str = STATUS_DRAFT) -> list[tuple[int, int]]:
+        """
+        Пакетная запись одной транзакцией. items — Plan или (Plan, meta, plan_id).
+        """
+        if status not in STATUSES:
+            raise ValueError(f"Неизвестный статус плана «{status}»")
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                result = []
+                for item in items:
+                    plan, meta, plan_id = (item, None, None) if isinstance(item, Plan) else item
+                    result.append(self._write(cur, plan, meta, status, plan_id))
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        self._notify([plan_id for plan_id, _ in result])
+        return result
+
+    def set_status(self, plan_id: int, status: str) -> None:
+        if status not in STATUSES:
+            raise ValueError(f"Неизвестный статус плана «{status}»")
+        with self._lock:
+            self._db.execute("UPDATE plans SET status = ?, updated_at = ? WHERE id = ?", (status, _now(), plan_id))
+
+    def duplicate(self, plan_id: int) -> int:
+        """
+        Копия текущей ревизии плана как нового плана (черновик, ревизия 1).
+        """
+        stored = self.load(plan_id)
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                cur.execute(
+                    "INSERT INTO plans (dzo_name, status, revision, start_day, end_day, updated_at) "
+                    "SELECT dzo_name, ?, 1, start_day, end_day, ? FROM plans WHERE id = ?",
+                    (STATUS_DRAFT, _now(), plan_id),
+                )
+                new_id = cur.lastrowid
+                cur.execute(
+                    "INSERT INTO revisions (plan_id, revision, created_at, status, end_day, input, meta) "
+                    "SELECT ?, 1, ?, ?, end_day, input, meta FROM revisions WHERE plan_id = ? AND revision = ?",
+                    (new_id, _now(), STATUS_DRAFT, plan_id, stored.revision),
+                )
+                cur.execute("INSERT INTO plan_spans (id, lo, hi) SELECT ?, lo, hi FROM plan_spans WHERE id = ?",
+                            (new_id, plan_id))
+                for task_id, *row in cur.execute(
+                    "SELECT id, name, category, team, start_day, end_day, duration, critical FROM tasks WHERE plan_id = ?",
+                    (plan_id,),
+                ).fetchall():
+                    cur.execute(
+                        "INSERT INTO tasks (plan_id, name, category, team, start_day, end_day, duration, critical) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (new_id, *row),
+                    )
+                    cur.execute(
+                        "INSERT INTO task_spans (id, lo, hi, team_lo, team_hi, plan_id) "
+                        "SELECT ?, lo, hi, team_lo, team_hi, ? FROM task_spans WHERE id = ?",
+                        (cur.lastrowid, new_id, task_id),
+                    )
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        self._notify([new_id])
+        return new_id
+
+    # --- ЧТЕНИЕ ---
+
+    def load(self, plan_id: int, revision: int | None = None) -> StoredPlan:
+        """
+        Вход и текстовые поля плана (по умолчанию — текущая ревизия).
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT r.revision, r.status, r.created_at, r.input, r.meta FROM revisions r "
+                "JOIN plans p ON p.id = r.plan_id WHERE r.plan_id = ? AND r.revision = COALESCE(?, p.revision)",
+                (plan_id, revision),
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"План №{plan_id}" + (f", ревизия {revision}," if revision else "") + " не найден")
+        rev, status, created_at, input_json, meta_json = row
+        return StoredPlan(plan_id, rev, status, created_at, input_from_json(input_json), json.loads(meta_json))
+
+    def history(self, plan_id: int) -> list[tuple[int, str, str, date]]:
+        """
+        Ревизии плана: (ревизия, создана, статус, окончание плана), новые первыми.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT revision, created_at, status, end_day FROM revisions WHERE plan_id = ? ORDER BY revision DESC",
+                (plan_id,),
+            ).fetchall()
+        return [(rev, created, status, date.fromordinal(end)) for rev, created, status, end in rows]
+
+    def get(self, plan_id: int) -> PlanSummary | None:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_SUMMARY_COLUMNS} FROM plans p WHERE p.id = ?", (plan_id,)).fetchone()
+        return _summary(row) if row else None
+
+    def find(self, dzo_name: str | None = None, status: str | None = None, limit: int = 200) -> list[PlanSummary]:
+        """
+        Планы по названию ДЗО (точное совпадение или префикс с «*») и статусу,
+        недавно изменённые первыми.
+        """
+        where, args = [], []
+        if dzo_name:
+            if dzo_name.endswith("*"):
+                prefix = dzo_name[:-1]
+                where.append("p.dzo_name >= ? AND p.dzo_name < ?")
+                args += [prefix, prefix + "\U0010ffff"]
+            else:
+                where.append("p.dzo_name = ?")
+                args.append(dzo_name)
+        if status:
+            where.append("p.status = ?")
+            args.append(status)
+        sql = f"SELECT {_SUMMARY_COLUMNS} FROM plans p"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.updated_at DESC, p.id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*args, limit)).fetchall()
+        return [_summary(r) for r in rows]
+
+    def active_between(self, start: date, end: date, status: str | None = None,
+                       limit: int | None = None) -> list[PlanSummary]:
+        """
+        Планы, идущие хотя бы один день периода [start, end] (например, «все
+        контроли, активные в марте»), по дате начала.
+        """
+        sql = (f"SELECT {_SUMMARY_COLUMNS} FROM plan_spans s JOIN plans p ON p.id = s.id "
+               "WHERE s.lo <= ? AND s.hi >= ?")
+        args = [end.toordinal(), start.toordinal()]
+        if status:
+            sql += " AND p.status = ?"
+            args.append(status)
+        sql += " ORDER BY p.start_day, p.id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [_summary(r) for r in rows]
+
+    def overlapping(self, start: date, end: date, team: str = TEAM_PENTEST, plan_id: int | None = None,
+                    limit: int = 1000) -> list[TaskOverlap]:
+        """
+        Пары задач команды team из разных планов, идущие одновременно в периоде
+        [start, end] («пересекающиеся пентесты»). plan_id — только пересечения
+        с задачами этого плана.
+        """
+        code = _team_code(team)
+        lo, hi = start.toordinal(), end.toordinal()
+        columns = """
+            SELECT a.plan_id, pa.dzo_name, ta.name, b.plan_id, pb.dzo_name, tb.name,
+                   MAX(a.lo, b.lo, ?), MIN(a.hi, b.hi, ?)
+        """
+        overlap = "b.team_lo <= ? AND b.team_hi >= ? AND b.lo <= a.hi AND b.hi >= a.lo AND b.lo <= ? AND b.hi >= ?"
+        if plan_id is None:
+            # все задачи команды в периоде — по индексу, к каждой — пересекающиеся
+            sql = columns + f"""
+                FROM task_spans a
+                JOIN task_spans b ON {overlap} AND b.plan_id != a.plan_id AND b.id > a.id
+                JOIN tasks ta ON ta.id = a.id
+                JOIN tasks tb ON tb.id = b.id
+                JOIN plans pa ON pa.id = a.plan_id
+                JOIN plans pb ON pb.id = b.plan_id
+                WHERE a.team_lo <= ? AND a.team_hi >= ? AND a.lo <= ? AND a.hi >= ?
+                LIMIT ?
+            """
+            args = [lo, hi, code, code, hi, lo, code, code, hi, lo, limit]
+        else:
+            # задачи плана — по индексу tasks_plan
+            sql = columns + f"""
+                FROM tasks ta
+                JOIN task_spans a ON a.id = ta.id
+                JOIN task_spans b ON {overlap} AND b.plan_id != ta.plan_id
+                JOIN tasks tb ON tb.id = b.id
+                JOIN plans pa ON pa.id = ta.plan_id
+                JOIN plans pb ON pb.id = b.plan_id
+                WHERE ta.plan_id = ? AND ta.team = ? AND a.lo <= ? AND a.hi >= ?
+                LIMIT ?
+            """
+            args = [lo, hi, code, code, hi, lo, plan_id, team, hi, lo, limit]
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [
+            TaskOverlap(team, pa, da, ta, pb, db, tb, date.fromordinal(s), date.fromordinal(e))
+            for pa, da, ta, pb, db, tb, s, e in rows
+        ]
+
+    def task_rows(self, plan_ids=None) -> list[tuple]:
+        """
+        Задачи текущих ревизий планов (всех или plan_ids): (plan_id, ДЗО,
+        задача, команда, начало, окончание), даты — порядковые номера дней.
+        """
+        sql = ("SELECT t.plan_id, p.dzo_name, t.name, t.team, t.start_day, t.end_day "
+               "FROM tasks t JOIN plans p ON p.id = t.plan_id")
+        with self._lock:
+            if plan_ids is None:
+                return self._db.execute(sql).fetchall()
+            plan_ids = list(plan_ids)
+            rows = []
+            for i in range(0, len(plan_ids), _MAX_SQL_ARGS):
+                chunk = plan_ids[i:i + _MAX_SQL_ARGS]
+                rows += self._db.execute(
+                    f"{sql} WHERE t.plan_id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            return rows
+
+    def schedule_rows(self, plan_ids=None) -> list[tuple]:
+        """
+        Задачи текущих ревизий планов (всех или plan_ids) для колоночной
+        выгрузки: (ревизия, ДЗО, задача, категория, начало, окончание,
+        длительность, критическая); даты — дни от 1970-01-01, как в
+        planner.gantt.TimelineData. Порядок — по планам и задачам.
+        """
+        sql = (f"SELECT p.revision, p.dzo_name, t.name, t.category, t.start_day - {_EPOCH_ORDINAL}, "
+               f"t.end_day - {_EPOCH_ORDINAL}, t.duration, t.critical "
+               "FROM tasks t JOIN plans p ON p.id = t.plan_id")
+        with self._lock:
+            if plan_ids is None:
+                return self._db.execute(f"{sql} ORDER BY t.plan_id, t.id").fetchall()
+            plan_ids = sorted(set(plan_ids))
+            rows = []
+            for i in range(0, len(plan_ids), _MAX_SQL_ARGS):
+                chunk = plan_ids[i:i + _MAX_SQL_ARGS]
+                rows += self._db.execute(
+                    f"{sql} WHERE t.plan_id IN ({', '.join('?' * len(chunk))}) ORDER BY t.plan_id, t.id", chunk
+                ).fetchall()
+            return rows
+
+    def count_active(self, start: date, end: date) -> int:
+        """
+        Число планов, идущих в периоде [start, end] (только индекс plan_spans).
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM plan_spans WHERE lo <= ? AND hi >= ?", (end.toordinal(), start.toordinal())
+            ).fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(path: str = DEFAULT_DB_PATH) -> PlanRepository:
+    """
+    Общее для процесса хранилище по пути к файлу базы.
+    """
+    with _repositories_lock:
+        repo = _repositories.get(path)
+        if repo is None:
+            repo = _repositories[path] = PlanRepository(path)
+        return repo
+
+
+def _synthetic_plans(n: int, seed: int = 0):
+    """
+    n планов со случайным набором контролей и датами начала в пределах пяти лет.
+    """
+    import random
+    from datetime import timedelta
+
+    from planner.engine import schedule
+
+    rnd = random.Random(seed)
+    names = get_catalog().input_controls
+    for i in range(n):
+        info_date = date(2025, 1, 1) + timedelta(days=rnd.randrange(5 * 365))
+        controls = tuple(ControlInput(name, enabled=rnd.random() < 0.6) for name in names)
+        yield schedule(PlanInput(dzo_name=f"ДЗО {i % 5000:04d}", info_date=info_date, controls=controls))
+
+
+def main(argv=None):
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Хранилище планов: наполнение и замер выборок")
+    parser.add_argument("path", nargs="?", default=DEFAULT_DB_PATH, help="файл базы SQLite")
+    parser.add_argument("--fill", type=int, default=0, help="добавить столько синтетических планов")
+    parser.add_argument("--batch", type=int, default=5000, help="планов в одной транзакции")
+    args = parser.parse_args(argv)
+
+    repo = PlanRepository(args.path)
+    if args.fill:
+        t0 = time.perf_counter()
+        batch = []
+        for plan in _synthetic_plans(args.fill):
+            batch.append(plan)
+            if len(batch) == args.batch:
+                repo.save_many(batch)
+                batch = []
+        if batch:
+            repo.save_many(batch)
+        print(f"Добавлено планов: {args.fill} за {time.perf_counter() - t0:.1f} с")
+
+    def timed(label, func, rounds=20):
+        times = []
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - t0)
+        print(f"  {statistics.median(times) * 1000:8.2f} мс  {label}: {len(result)}")
+
+    print(f"Планов в хранилище: {repo.count()}")
+    march = (date(2026, 3, 1), date(2026, 3, 31))
+    timed("планы по ДЗО", lambda: repo.find("ДЗО 0042"))
+    timed("черновики (последние 200)", lambda: repo.find(status=STATUS_DRAFT))
+    timed("активные в марте 2026", lambda: repo.active_between(*march))
+    timed("число активных в марте 2026", lambda: [repo.count_active(*march)])
+    timed("активные 10.03.2026", lambda: repo.active_between(date(2026, 3, 10), date(2026, 3, 10)))
+    timed("пересечения пентестов в неделю 02–08.03.2026 (до 1000)",
+          lambda: repo.overlapping(date(2026, 3, 2), date(2026, 3, 8)))
+    last = repo.find(limit=1)
+    if last:
+        timed("загрузка плана", lambda: [repo.load(last[0].plan_id)])
+        timed("пересечения пентестов плана", lambda: repo.overlapping(date(2025, 1, 1), date(2031, 1, 1),
+                                                                      plan_id=last[0].plan_id))
+    repo.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
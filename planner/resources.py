@@ -0,0 +1,202 @@
+"""
+Состав группы как ресурсы и выравнивание планов нескольких ДЗО по загрузке команд.
+
+Состав группы — текст из формы, по участнику в строке: «ФИО, должность».
+Команда участника определяется по ключевым словам должности (TEAM_KEYWORDS),
+ёмкость — сколько задач он ведёт одновременно: 1, либо число в конце строки
+через «;» («Иванов И.И., пентестер; 2»).
+
+level_plans — списочный планировщик: задачи всех планов берутся в порядке
+раннего старта (при равенстве — меньшего позднего старта), каждая занимает
+первого освободившегося участника своей команды. Связи внутри плана
+сохраняются, задержка переносится на последователей. Задачи без команды и
+команды, которых нет в составе, не ограничиваются.
+"""
+
+import heapq
+import re
+import time
+from dataclasses import dataclass
+from datetime import date
+
+from planner.catalog import PLAN_START, TEAM_KEYWORDS, get_catalog
+from planner.graph import FS
+from planner.workdays import get_calendar
+
+_CAPACITY_RE = re.compile(r";\s*(\d+)\s*$")
+
+
+@dataclass(frozen=True)
+class Resource:
+    name: str
+    position: str = ""
+    team: str | None = None
+    capacity: int = 1
+
+
+@dataclass(frozen=True)
+class LeveledTask:
+    dzo_name: str
+    name: str
+    team: str | None
+    assignee: str | None
+    start: date
+    end: date
+    delay: int  # сдвиг старта относительно плана без ограничений, раб. дн.
+
+
+@dataclass(frozen=True)
+class LevelingResult:
+    tasks: list             # LeveledTask всех планов
+    plan_delays: dict       # ДЗО -> сдвиг окончания плана, раб. дн.
+    elapsed: float          # секунды
+
+    @property
+    def delayed(self) -> list:
+        return [t for t in self.tasks if t.delay > 0]
+
+
+# --- СОСТАВ ГРУППЫ ---
+
+def team_of_position(position: str) -> str | None:
+    text = position.lower()
+    for team, keywords in TEAM_KEYWORDS.items():
+        if any(k in text for k in keywords):
+            return team
+    return None
+
+
+def parse_roster(text: str) -> list[Resource]:
+    """
+    Участники из текста «ФИО, должность[; ёмкость]» (пустые строки пропускаются).
+    """
+    resources = []
+    for line in (text or "").splitlines():
+        line = line.strip().lstrip("-•*").strip()
+        if not line:
+            continue
+        capacity = 1
+        m = _CAPACITY_RE.search(line)
+        if m:
+            capacity = max(int(m.group(1)), 1)
+            line = line[:m.start()].strip()
+        name, _, position = (part.strip() for part in line.partition(","))
+        resources.append(Resource(name, position, team_of_position(position), capacity))
+    return resources
+
+
+def team_capacity(resources) -> dict:
+    """
+    Суммарная ёмкость по командам.
+    """
+    capacity = {}
+    for r in resources:
+        if r.team is not None:
+            capacity[r.team] = capacity.get(r.team, 0) + r.capacity
+    return capacity
+
+
+# --- ВЫРАВНИВАНИЕ ---
+
+def level_plans(plans, resources) -> LevelingResult:
+    """
+    Совместное выравнивание планов по составу команд. Время — индексы рабочих
+    дней из расчёта плана (Plan.cpm); планы с собственным календарём ДЗО
+    считаются в его индексах. Сложность O(N log N) по числу задач.
+    """
+    t0 = time.perf_counter()
+    catalog = get_catalog()
+
+    # Очередь свободных мест каждой команды: (рабочий день, с которого свободно, №, участник)
+    units = {}
+    for r in resources:
+        if r.team is None:
+            continue
+        heap = units.setdefault(r.team, [])
+        for _ in range(r.capacity):
+            heap.append((0, len(heap), r.name))
+    for heap in units.values():
+        heapq.heapify(heap)
+
+    # Готовые к планированию задачи: (ранний старт, поздний старт, № плана, № задачи)
+    ready = []
+    earliest, pending, new_es, new_ef, assignees = [], [], [], [], []
+    for p, plan in enumerate(plans):
+        graph, cpm = plan.graph, plan.cpm
+        fixed = dict(cpm.fixed)
+        earliest.append([fixed.get(v, 0) for v in range(len(graph))])
+        pending.append([0 if v in fixed else len(graph.preds[v]) for v in range(len(graph))])
+        new_es.append([0] * len(graph))
+        new_ef.append([0] * len(graph))
+        assignees.append([None] * len(graph))
+        for v in range(len(graph)):
+            if pending[p][v] == 0:
+                ready.append((earliest[p][v], cpm.ls[v], p, v))
+    heapq.heapify(ready)
+
+    while ready:
+        start, _, p, v = heapq.heappop(ready)
+        plan = plans[p]
+        graph, dur = plan.graph, plan.cpm.durations[v]
+        control = catalog.controls.get(graph.names[v])
+        team = control.team if control else None
+
+        if team in units:
+            free, n, who = heapq.heappop(units[team])
+            start = max(start, free)
+            heapq.heappush(units[team], (start + max(dur, 1), n, who))
+            assignees[p][v] = who
+        new_es[p][v], new_ef[p][v] = start, start + dur - 1
+
+        for s, kind, lag in graph.succs[v]:
+            if pending[p][s] == 0:  # зафиксированный старт
+                continue
+            bound = new_ef[p][v] + 1 + lag if kind == FS else start + lag
+            earliest[p][s] = max(earliest[p][s], bound)
+            pending[p][s] -= 1
+            if pending[p][s] == 0:
+                heapq.heappush(ready, (earliest[p][s], plan.cpm.ls[s], p, s))
+
+    tasks, plan_delays = [], {}
+    for p, plan in enumerate(plans):
+        graph, cpm = plan.graph, plan.cpm
+        cal = get_calendar(plan.input.dzo_name)
+        for t in plan.tasks:
+            v = graph.index[t.name]
+            delay = new_es[p][v] - cpm.es[v]
+            if delay > 0:
+                try:
+                    start = cal.workday_at(new_es[p][v])
+                    end = cal.workday_at(new_ef[p][v]) if cpm.durations[v] > 0 else start
+                except ValueError:
+                    raise ValueError(
+                        f"План ДЗО «{plan.input.dzo_name}» после выравнивания выходит за пределы "
+                        f"производственного календаря — состава команд не хватает на все проверки"
+                    ) from None
+            else:
+                start, end = t.start, t.end
+            tasks.append(LeveledTask(
+                plan.input.dzo_name, t.name, catalog[t.name].team, assignees[p][v], start, end, delay
+            ))
+        finish = max((new_ef[p][v] for v in range(len(graph)) if graph.names[v] != PLAN_START), default=cpm.finish)
+        name = plan.input.dzo_name
+        plan_delays[name] = max(plan_delays.get(name, 0), finish - cpm.finish, 0)
+
+    return LevelingResult(tasks=tasks, plan_delays=plan_delays, elapsed=time.perf_counter() - t0)
+
+
+def leveling_frames(result: LevelingResult):
+    """
+    (сдвиги планов, сдвинутые задачи) — DataFrame для страницы.
+    """
+    import pandas as pd
+
+    plans_df = pd.DataFrame(
+        sorted(((dzo, d) for dzo, d in result.plan_delays.items() if d > 0), key=lambda x: -x[1]),
+        columns=["ДЗО", "Сдвиг окончания (раб. дн)"],
+    )
+    tasks_df = pd.DataFrame(
+        [(t.dzo_name, t.name, t.team, t.assignee, t.start, t.end, t.delay) for t in result.delayed],
+        columns=["ДЗО", "Задача", "Команда", "Исполнитель", "Начало", "Окончание", "Сдвиг (раб. дн)"],
+    )
+    return plans_df, tasks_df
@@ -0,0 +1,211 @@
+"""
+Риск сроков плана (Монте-Карло): длительности контролей с диапазоном
+«минимум / наиболее вероятная / максимум» разыгрываются по распределению PERT,
+и все сэмплы плана считаются одним векторным проходом по графу задач —
+по тем же правилам и производственному календарю, что и engine.schedule.
+
+Диапазоны задаются в справочнике (dur_min/dur_max) или переданы явно; у контроля
+без диапазона длительность точная. Если длительность в плане изменена, диапазон
+справочника масштабируется к ней. Результат — процентили даты завершения и
+контроли, которые чаще всего определяют окончание: контроль на критическом
+пути сэмпла или контроль категории, сумма которой задала длительность
+проверки в БИБ (max(∑ ДЗО, ∑ БИБ) + 5).
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from planner.catalog import (
+    CAT_DZO,
+    CAT_INSTRUMENTAL,
+    PIB_EXTRA_DAYS,
+    PIB_NAME,
+    PLAN_START,
+    REPORT_DUR,
+    REPORT_NAME,
+    Catalog,
+    get_catalog,
+)
+from planner.engine import PlanInput, control_duration, plan_graph
+from planner.graph import backward_pass_batch, forward_pass_batch
+from planner.workdays import WorkCalendar, get_calendar
+
+RISK_SAMPLES = 100_000
+RISK_PERCENTILES = (50, 80, 95)
+RISK_SEED = 0            # одинаковый план — одинаковые процентили при каждом перезапуске
+PERT_LAMBDA = 4          # вес наиболее вероятного значения в PERT
+
+
+@dataclass(frozen=True)
+class RiskDriver:
+    name: str
+    category: str
+    share: float          # доля сэмплов, в которых контроль определяет окончание
+    correlation: float    # корреляция длительности с окончанием (nan — длительность точная)
+
+
+@dataclass(frozen=True)
+class RiskResult:
+    finish: np.ndarray            # окончание плана по сэмплам, datetime64[D], (K,)
+    ranges: dict                  # имя -> (минимум, наиболее вероятная, максимум)
+    drivers: tuple[RiskDriver, ...]
+    elapsed: float                # секунды
+
+    def __len__(self) -> int:
+        return len(self.finish)
+
+    def percentile(self, p: float) -> date:
+        """
+        Дата, к которой план завершается с вероятностью p %.
+        """
+        days = np.percentile(self.finish.astype(np.int64), p, method="inverted_cdf")
+        return np.datetime64(int(days), "D").astype(date)
+
+    def percentiles(self, ps=RISK_PERCENTILES) -> dict[int, date]:
+        return {p: self.percentile(p) for p in ps}
+
+    def probability(self, by: date) -> float:
+        """
+        Вероятность завершить план не позже by.
+        """
+        return float(np.mean(self.finish <= np.datetime64(by, "D")))
+
+    def distribution(self):
+        """
+        Доля сэмплов по датам окончания (DataFrame с индексом-датой) — для
+        гистограммы без 100 тыс. точек на графике.
+        """
+        import pandas as pd
+
+        days, counts = np.unique(self.finish, return_counts=True)
+        return pd.DataFrame(
+            {"Доля сэмплов, %": counts / max(len(self), 1) * 100},
+            index=pd.Index(days.astype("datetime64[ns]"), name="Окончание"),
+        )
+
+    def drivers_frame(self):
+        """
+        Контроли по убыванию доли сэмплов, в которых они определяют окончание.
+        """
+        import pandas as pd
+
+        return pd.DataFrame({
+            "Контроль": [d.name for d in self.drivers],
+            "Категория": [d.category for d in self.drivers],
+            "Длительность (мин / вер. / макс)": [
+                " / ".join(map(str, self.ranges[d.name])) if d.name in self.ranges else "—" for d in self.drivers
+            ],
+            "Определяет окончание, %": [round(d.share * 100, 1) for d in self.drivers],
+            "Корреляция с окончанием": [round(d.correlation, 2) + 0.0 for d in self.drivers],
+        })
+
+
+def duration_ranges(plan_input: PlanInput, catalog: Catalog | None = None) -> dict:
+    """
+    Диапазоны длительностей включённых контролей по справочнику:
+    {имя: (минимум, наиболее вероятная, максимум)}. Наиболее вероятная —
+    длительность в плане, границы справочника масштабируются к ней.
+    """
+    catalog = catalog or get_catalog()
+    ranges = {}
+    for ci in plan_input.controls:
+        if not ci.enabled or ci.name not in catalog or catalog[ci.name].dur_range is None:
+            continue
+        lo, base, hi = catalog[ci.name].dur_range
+        likely = control_duration(ci, catalog)
+        ranges[ci.name] = (
+            min(max(round(lo * likely / base), 1), likely),
+            likely,
+            max(round(hi * likely / base), likely),
+        )
+    return ranges
+
+
+def sample_pert(low: int, likely: int, high: int, n: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    n длительностей (целые раб. дни) по распределению PERT на [low; high].
+    """
+    if high == low:
+        return np.full(n, likely, dtype=np.int64)
+    span = high - low
+    a = 1 + PERT_LAMBDA * (likely - low) / span
+    b = 1 + PERT_LAMBDA * (high - likely) / span
+    return np.rint(low + span * rng.beta(a, b, n)).astype(np.int64)
+
+
+def _correlation(x: np.ndarray, y: np.ndarray) -> float:
+    x = x - x.mean()
+    sx, sy = x.std(), y.std()
+    if not sx or not sy:
+        return float("nan")
+    return float(np.mean(x * (y - y.mean())) / (sx * sy))
+
+
+def simulate(plan_input: PlanInput, ranges: dict | None = None, samples: int = RISK_SAMPLES,
+             calendar: WorkCalendar | None = None, seed: int | None = RISK_SEED) -> RiskResult:
+    """
+    samples сэмплов плана одним проходом: сэмплы — столбцы массивов (V, K),
+    цикл идёт только по задачам графа. ranges — {имя: (мин, вер., макс)}
+    (по умолчанию duration_ranges); явно заданные даты начала учитываются.
+    """
+    t0 = time.perf_counter()
+    catalog = get_catalog()
+    cal = calendar or get_calendar(plan_input.dzo_name)
+    graph, controls = plan_graph(plan_input, catalog)
+    ranges = duration_ranges(plan_input, catalog) if ranges is None else dict(ranges)
+    for name, (lo, likely, hi) in ranges.items():
+        if name not in controls:
+            raise ValueError(f"«{name}»: контроль не включён в план")
+        if not 1 <= lo <= likely <= hi:
+            raise ValueError(f"«{name}»: диапазон длительности {lo}–{likely}–{hi} должен быть 1 ≤ мин ≤ вер. ≤ макс")
+
+    rng = np.random.default_rng(seed)
+    sampled = {name: sample_pert(*ranges[name], samples, rng) for name in controls if name in ranges}
+    durations = np.empty((len(graph), samples), dtype=np.int64)
+    sums = {CAT_DZO: np.zeros(samples, dtype=np.int64), CAT_INSTRUMENTAL: np.zeros(samples, dtype=np.int64)}
+    for name, ci in controls.items():
+        v = graph.index[name]
+        durations[v] = sampled[name] if name in sampled else control_duration(ci, catalog)
+        sums[catalog[name].category] += durations[v]
+    pib = graph.index[PIB_NAME]
+    durations[pib] = np.maximum(sums[CAT_DZO], sums[CAT_INSTRUMENTAL]) + PIB_EXTRA_DAYS
+    durations[graph.index[REPORT_NAME]] = REPORT_DUR
+    durations[graph.index[PLAN_START]] = 1 if cal.is_workday(plan_input.info_date) else 0
+
+    fixed = {graph.index[PLAN_START]: cal.index(plan_input.info_date)}
+    for name, ci in controls.items():
+        if ci.start:
+            fixed[graph.index[name]] = cal.index(ci.start)
+
+    es, ef = forward_pass_batch(graph, durations, fixed)
+    ls, _ = backward_pass_batch(graph, durations, es, ef)
+    tasks = [v for v, name in enumerate(graph.names) if name != PLAN_START]
+    last = ef[tasks].max(axis=0)
+    critical = ls <= es
+
+    # Категория, чья сумма задала длительность проверки в БИБ (при равенстве — обе)
+    binding = {
+        CAT_DZO: critical[pib] & (sums[CAT_DZO] >= sums[CAT_INSTRUMENTAL]),
+        CAT_INSTRUMENTAL: critical[pib] & (sums[CAT_INSTRUMENTAL] >= sums[CAT_DZO]),
+    }
+    finish_days = last.astype(np.float64)
+    drivers = []
+    for name in controls:
+        v = graph.index[name]
+        category = catalog[name].category
+        drives = critical[v] | binding[category]
+        drivers.append(RiskDriver(
+            name, category, float(drives.mean()),
+            _correlation(sampled[name], finish_days) if name in sampled else float("nan"),
+        ))
+    drivers.sort(key=lambda d: (-d.share, -np.nan_to_num(d.correlation, nan=-1.0)))
+
+    return RiskResult(
+        finish=cal.workdays_at(last),
+        ranges=ranges,
+        drivers=tuple(drivers),
+        elapsed=time.perf_counter() - t0,
+    )
@@ -0,0 +1,101 @@
+"""
+Отчёт о холодном старте страницы: сколько длится первый прогон скрипта в
+свежем процессе и какие модули он импортирует (по данным python -X importtime).
+
+Запуск:
+    python -m planner.startup main2.py --top 15
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+# Зависимости, которые не должны загружаться до первого показа формы
+HEAVY_MODULES = ("pandas", "plotly", "xlsxwriter", "openpyxl", "pyarrow")
+
+_MARKER = "--- app ---"
+
+# Выполняется в отдельном процессе: Streamlit и тестовый стенд импортируются
+# до маркера, всё после маркера — импорты самого приложения.
+_PROBE = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+sys.stderr.write({_MARKER!r} + "\\n")
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "first_run": elapsed,
+    "exceptions": [str(e.value) for e in at.exception],
+    "modules": sorted(set(sys.modules) - before),
+}}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """
+    Импорты верхнего уровня после маркера: [(модуль, собственное мкс, кумулятивное мкс), ...].
+    """
+    rows = []
+    started = False
+    for line in stderr.splitlines():
+        if line.strip() == _MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок таблицы
+        name = parts[2]
+        if name.startswith("  "):  # вложенный импорт
+            continue
+        rows.append((name.strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def measure(script: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, script],
+        capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"Не удалось выполнить {script}:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(proc.stderr)
+    loaded = {m.split(".")[0] for m in result.pop("modules")}
+    result["imports"] = sorted(imports, key=lambda r: -r[2])
+    result["import_total"] = sum(r[2] for r in imports) / 1e6
+    result["heavy_loaded"] = [m for m in HEAVY_MODULES if m in loaded]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчёт о холодном старте страницы Streamlit")
+    parser.add_argument("script", nargs="?", default="main2.py", help="скрипт страницы")
+    parser.add_argument("--top", type=int, default=15, help="сколько импортов показать")
+    parser.add_argument("--json", dest="json_path", help="сохранить отчёт в JSON")
+    args = parser.parse_args(argv)
+
+    report = measure(args.script)
+    print(f"Первый прогон {args.script}: {report['first_run']:.2f} с "
+          f"(из них импорты приложения: {report['import_total']:.2f} с)")
+    print("Импорты верхнего уровня (кумулятивно, мс):")
+    for name, _, cumulative in report["imports"][:args.top]:
+        print(f"  {cumulative / 1000:9.1f}  {name}")
+    heavy = ", ".join(report["heavy_loaded"]) or "нет"
+    print(f"Тяжёлые зависимости, загруженные при первом прогоне: {heavy}")
+    for e in report["exceptions"]:
+        print(f"Исключение при прогоне: {e}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report["exceptions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
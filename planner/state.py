@@ -0,0 +1,152 @@
+"""
+Компактное состояние формы плана одной сессии.
+
+Вместо пяти строковых ключей session_state на контроль ({kb}_check/_start/_dur/
+_end/_order) настройки всех включаемых контролей хранятся столбцами NumPy в
+одном объекте PlanState. Рассчитанные значения (окончание, длительность
+проверки в БИБ и отчета) в состоянии не хранятся — их даёт план.
+"""
+
+import sys
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from planner.catalog import CAT_DZO, Catalog
+from planner.engine import MAX_CONTROL_VALUE, ControlInput, PlanInput
+
+FIELDS = ("check", "start", "dur", "order")
+
+_NAT = np.datetime64("NaT", "D")
+
+
+@lru_cache(maxsize=8)
+def _layout(catalog: Catalog) -> tuple[tuple[str, ...], dict]:
+    """
+    Имена строк и индекс имя -> строка; общие для всех сессий с этим каталогом.
+    """
+    names = catalog.input_controls
+    return names, {name: i for i, name in enumerate(names)}
+
+
+class PlanState:
+    """
+    Настройки включаемых контролей (строки — catalog.input_controls):
+    enabled — включён; start — явно заданная дата начала (NaT — по правилам);
+    dur — длительность (0 — из справочника); order — порядок ДЗО (0 — по умолчанию).
+    version растёт при изменении состояния в обход виджетов строк (редактор,
+    новый справочник) — по нему виджеты пересоздаются с новыми значениями.
+    """
+    __slots__ = ("catalog", "names", "index", "enabled", "start", "dur", "order", "version")
+
+    def __init__(self, catalog: Catalog, version: int = 0):
+        self.catalog = catalog
+        self.names, self.index = _layout(catalog)
+        n = len(self.names)
+        self.enabled = np.zeros(n, dtype=np.bool_)
+        self.start = np.full(n, _NAT, dtype="datetime64[D]")
+        self.dur = np.zeros(n, dtype=np.int32)
+        self.order = np.zeros(n, dtype=np.int32)
+        self.version = version
+
+    def for_catalog(self, catalog: Catalog) -> "PlanState":
+        """
+        Состояние под новый справочник: значения переносятся по имени контроля.
+        """
+        if catalog is self.catalog:
+            return self
+        state = PlanState(catalog, self.version + 1)
+        for name, i in state.index.items():
+            j = self.index.get(name)
+            if j is not None:
+                state.enabled[i], state.start[i] = self.enabled[j], self.start[j]
+                state.dur[i], state.order[i] = self.dur[j], self.order[j]
+        return state
+
+    # --- ДОСТУП ПО ПОЛЯМ ---
+
+    def get(self, name: str, field: str):
+        """
+        Значение поля в виде, который ждут виджеты: bool, date/None, int.
+        Для dur и order вместо «не задано» — значение из справочника.
+        """
+        i = self.index[name]
+        if field == "check":
+            return bool(self.enabled[i])
+        if field == "start":
+            d = self.start[i]
+            return None if np.isnat(d) else d.astype(date)
+        if field == "dur":
+            return int(self.dur[i]) or self.catalog[name].dur
+        if field == "order":
+            return int(self.order[i]) or self.catalog[name].default_order
+        raise KeyError(field)
+
+    def set(self, name: str, field: str, value) -> None:
+        """
+        Запись значения виджета; None для start/dur/order — вернуть значение по умолчанию.
+        dur и order вне 0..MAX_CONTROL_VALUE — ValueError (состояние не меняется).
+        """
+        i = self.index[name]
+        if field == "check":
+            self.enabled[i] = bool(value)
+        elif field == "start":
+            self.start[i] = _NAT if value is None else np.datetime64(value, "D")
+        elif field in ("dur", "order"):
+            value = 0 if value is None else int(value)
+            if not 0 <= value <= MAX_CONTROL_VALUE:
+                raise ValueError(f"«{name}»: значение {value} вне диапазона 1..{MAX_CONTROL_VALUE}")
+            getattr(self, field)[i] = value
+        else:
+            raise KeyError(field)
+
+    def update(self, values: dict) -> None:
+        """
+        Пакет правок {(имя, поле): значение} в обход виджетов строк.
+        """
+        for (name, field), value in values.items():
+            self.set(name, field, value)
+        self.version += 1
+
+    def load(self, plan_input: PlanInput) -> None:
+        """
+        Состояние по сохранённому входу плана (хранилище): контроли, которых
+        нет во входе, сбрасываются, неизвестные справочнику — пропускаются.
+        """
+        self.enabled[:] = False
+        self.start[:] = _NAT
+        self.dur[:] = 0
+        self.order[:] = 0
+        values = {}
+        for ci in plan_input.controls:
+            if ci.name in self.index:
+                values.update({(ci.name, "check"): ci.enabled, (ci.name, "start"): ci.start,
+                               (ci.name, "dur"): ci.dur, (ci.name, "order"): ci.order})
+        self.update(values)
+
+    # --- ВХОД РАСЧЁТА ---
+
+    def plan_input(self, dzo_name: str, info_date: date) -> PlanInput:
+        dzo = self.catalog.category(CAT_DZO)
+        starts = self.start.astype(object)  # datetime64[D] -> date / None одним вызовом
+        controls = tuple(
+            ControlInput(
+                name=name,
+                enabled=bool(self.enabled[i]),
+                dur=int(self.dur[i]) or None,
+                start=starts[i],
+                order=(int(self.order[i]) or None) if name in dzo else None,
+            )
+            for i, name in enumerate(self.names)
+        )
+        return PlanInput(dzo_name=dzo_name, info_date=info_date, controls=controls)
+
+    def nbytes(self) -> int:
+        """
+        Собственная память объекта: сам объект и столбцы (имена, индекс и
+        справочник общие для всех сессий и не учитываются).
+        """
+        return sys.getsizeof(self) + sum(
+            sys.getsizeof(a) for a in (self.enabled, self.start, self.dur, self.order)
+        )
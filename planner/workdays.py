@@ -0,0 +1,279 @@
+"""
+Производственный календарь: рабочие дни с учётом праздников и переносов.
+
+Календарь строится один раз на диапазон лет в виде битовой карты рабочих дней
+и массива префиксных сумм, поэтому «прибавить N рабочих дней», «следующий
+рабочий день» и «число рабочих дней между датами» считаются за O(1).
+
+Праздники известны только на годы, заполненные в файле календаря: для дат вне
+них считаются лишь сб/вс: календарь один раз выдаёт CalendarCoverageWarning,
+точная проверка даты — WorkCalendar.covers.
+"""
+
+import json
+import warnings
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CALENDAR_PATH = Path(__file__).with_name("data") / "calendar_ru.json"
+
+# Диапазон лет, на который строится карта (вне данных файла — только сб/вс)
+YEAR_MIN = 2000
+YEAR_MAX = 2100
+
+# date.toordinal() для 1970-01-01 — начало отсчёта datetime64[D]
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class CalendarCoverageWarning(UserWarning):
+    """
+    Дата вне лет, на которые заполнен производственный календарь.
+    """
+
+
+def _parse_dates(values) -> set:
+    return {date.fromisoformat(v) if isinstance(v, str) else v for v in values}
+
+
+class WorkCalendar:
+    """
+    Неизменяемый календарь рабочих дней на диапазоне [first_year; last_year].
+
+    Рабочий день — пн–пт, кроме праздников (holidays), плюс перенесённые
+    рабочие выходные (workdays). covered_years — (первый, последний) год,
+    на который известны праздники (по умолчанию — весь диапазон).
+    """
+
+    __slots__ = ("first_day", "last_day", "covered_from", "covered_to", "holidays", "workdays",
+                 "_base", "_is_work", "_prefix", "_work_ordinals", "_lo", "_hi", "_k_lo", "_k_hi", "_warned")
+
+    def __init__(self, first_year: int = YEAR_MIN, last_year: int = YEAR_MAX,
+                 holidays=(), workdays=(), covered_years: tuple[int, int] | None = None):
+        self.first_day = date(first_year, 1, 1)
+        self.last_day = date(last_year, 12, 31)
+        covered_first, covered_last = covered_years or (first_year, last_year)
+        self.covered_from = max(date(covered_first, 1, 1), self.first_day)
+        self.covered_to = min(date(covered_last, 12, 31), self.last_day)
+        self.holidays = frozenset(_parse_dates(holidays))
+        self.workdays = frozenset(_parse_dates(workdays))
+
+        self._base = self.first_day.toordinal()
+        n_days = self.last_day.toordinal() - self._base + 1
+
+        # 1. Битовая карта: пн–пт рабочие (ordinal 1 = понедельник)
+        ordinals = np.arange(self._base, self._base + n_days, dtype=np.int64)
+        is_work = ((ordinals - 1) % 7) < 5
+
+        # 2. Праздники и переносы из производственного календаря
+        for d in self.holidays:
+            if self.first_day <= d <= self.last_day:
+                is_work[d.toordinal() - self._base] = False
+        for d in self.workdays:
+            if self.first_day <= d <= self.last_day:
+                is_work[d.toordinal() - self._base] = True
+
+        # 3. prefix[i] — число рабочих дней строго до дня i
+        prefix = np.zeros(n_days + 1, dtype=np.int32)
+        np.cumsum(is_work, out=prefix[1:])
+
+        self._is_work = is_work
+        self._prefix = prefix
+        self._work_ordinals = ordinals[is_work].astype(np.int32)
+        # Заполненные годы: смещения дней [lo; hi) и номера рабочих дней [lo; hi)
+        self._lo = self.covered_from.toordinal() - self._base
+        self._hi = self.covered_to.toordinal() - self._base + 1
+        self._k_lo, self._k_hi = int(prefix[self._lo]), int(prefix[self._hi])
+        self._warned = False
+
+        for arr in (self._is_work, self._prefix, self._work_ordinals):
+            arr.setflags(write=False)
+
+    # --- ВНУТРЕННИЕ ИНДЕКСЫ ---
+
+    def _warn_uncovered(self) -> None:
+        # Одно предупреждение на календарь: проверка стоит в горячем пути
+        if self._warned:
+            return
+        self._warned = True
+        warnings.warn(
+            f"Праздники производственного календаря известны на {self.covered_from.year}–"
+            f"{self.covered_to.year} гг.; для дат вне этих лет учитываются только сб/вс",
+            CalendarCoverageWarning,
+            stacklevel=4,
+        )
+
+    def _offset(self, d: date) -> int:
+        i = d.toordinal() - self._base
+        if not self._lo <= i < self._hi:
+            if i < 0 or i >= len(self._is_work):
+                raise ValueError(
+                    f"Дата {d.strftime('%d.%m.%Y')} вне диапазона производственного календаря "
+                    f"({self.first_day.year}–{self.last_day.year})"
+                )
+            self._warn_uncovered()
+        return i
+
+    def covers(self, d: date) -> bool:
+        """
+        Известны ли праздники на дату d (год заполнен в файле календаря).
+        """
+        return self.covered_from <= d <= self.covered_to
+
+    def index(self, d: date) -> int:
+        """
+        Номер первого рабочего дня, приходящегося на d или позже
+        (= число рабочих дней строго до d).
+        """
+        return int(self._prefix[self._offset(d)])
+
+    def workday_at(self, k: int) -> date:
+        """
+        Дата рабочего дня с номером k (нумерация с 0 от начала календаря).
+        """
+        if not self._k_lo <= k < self._k_hi:
+            if k < 0 or k >= len(self._work_ordinals):
+                raise ValueError("Выход за пределы производственного календаря")
+            self._warn_uncovered()
+        return date.fromordinal(int(self._work_ordinals[k]))
+
+    # --- ВЕКТОРНЫЕ ВАРИАНТЫ (массивы numpy datetime64[D]) ---
+
+    def _offsets(self, days) -> np.ndarray:
+        offsets = np.asarray(days, dtype="datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL - self._base
+        if offsets.size and (offsets.min() < 0 or offsets.max() >= len(self._is_work)):
+            raise ValueError(
+                f"Даты вне диапазона производственного календаря ({self.first_day.year}–{self.last_day.year})"
+            )
+        if offsets.size and (offsets.min() < self._lo or offsets.max() >= self._hi):
+            self._warn_uncovered()
+        return offsets
+
+    def indices(self, days) -> np.ndarray:
+        """
+        index() для массива дат.
+        """
+        return self._prefix[self._offsets(days)].astype(np.int64)
+
+    def workdays_at(self, k) -> np.ndarray:
+        """
+        workday_at() для массива номеров рабочих дней -> datetime64[D].
+        """
+        k = np.asarray(k, dtype=np.int64)
+        if k.size and (k.min() < 0 or k.max() >= len(self._work_ordinals)):
+            raise ValueError("Выход за пределы производственного календаря")
+        if k.size and (k.min() < self._k_lo or k.max() >= self._k_hi):
+            self._warn_uncovered()
+        return (self._work_ordinals[k].astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+    def is_workday_array(self, days) -> np.ndarray:
+        return self._is_work[self._offsets(days)]
+
+    # --- ОПЕРАЦИИ С РАБОЧИМИ ДНЯМИ ---
+
+    def is_workday(self, d: date) -> bool:
+        return bool(self._is_work[self._offset(d)])
+
+    def end_date_by_workdays(self, start: date, duration_workdays: int) -> date:
+        """
+        Дата окончания при заданном количестве рабочих дней, считая start включительно.
+        Если start — нерабочий день, отсчёт идёт с ближайшего рабочего дня после него.
+        """
+        if duration_workdays <= 0:
+            return start
+        return self.workday_at(self.index(start) + int(duration_workdays) - 1)
+
+    def next_workday(self, d: date) -> date:
+        """
+        Следующий рабочий день после даты d.
+        """
+        return self.workday_at(int(self._prefix[self._offset(d) + 1]))
+
+    def add_workdays(self, d: date, n: int) -> date:
+        """
+        Сдвиг на n рабочих дней: n > 0 — n-й рабочий день после d,
+        n < 0 — |n|-й рабочий день до d, n = 0 — сама дата d.
+        """
+        if n == 0:
+            return d
+        i = self._offset(d)
+        if n > 0:
+            return self.workday_at(int(self._prefix[i + 1]) + n - 1)
+        return self.workday_at(int(self._prefix[i]) + n)
+
+    def workdays_between(self, start: date, end: date) -> int:
+        """
+        Число рабочих дней в интервале [start; end] включительно (0, если end < start).
+        """
+        if end < start:
+            return 0
+        return int(self._prefix[self._offset(end) + 1] - self._prefix[self._offset(start)])
+
+    def with_overrides(self, holidays=(), workdays=()) -> "WorkCalendar":
+        """
+        Новый календарь с дополнительными нерабочими / рабочими днями
+        (например, локальные праздники ДЗО).
+        """
+        extra_holidays = _parse_dates(holidays)
+        extra_workdays = _parse_dates(workdays)
+        return WorkCalendar(
+            self.first_day.year,
+            self.last_day.year,
+            holidays=(self.holidays - extra_workdays) | extra_holidays,
+            workdays=(self.workdays - extra_holidays) | extra_workdays,
+            covered_years=(self.covered_from.year, self.covered_to.year),
+        )
+
+
+# --- ЗАГРУЗКА ИЗ ФАЙЛА ---
+
+@lru_cache(maxsize=None)
+def _load_calendar_data(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=64)
+def load_calendar(path: str = str(DEFAULT_CALENDAR_PATH), dzo_name: str = "") -> WorkCalendar:
+    """
+    Календарь из JSON-файла производственного календаря.
+    Если для ДЗО заданы переопределения (dzo_overrides), они применяются поверх общего календаря.
+    """
+    data = _load_calendar_data(path)
+
+    if dzo_name:
+        override = data.get("dzo_overrides", {}).get(dzo_name.strip())
+        base = load_calendar(path, "")
+        if not override:
+            return base
+        return base.with_overrides(override.get("holidays", []), override.get("workdays", []))
+
+    holidays, workdays = set(), set()
+    years = data.get("years", {})
+    for year_data in years.values():
+        holidays |= _parse_dates(year_data.get("holidays", []))
+        workdays |= _parse_dates(year_data.get("workdays", []))
+
+    covered = (min(map(int, years)), max(map(int, years))) if years else None
+    return WorkCalendar(YEAR_MIN, YEAR_MAX, holidays=holidays, workdays=workdays, covered_years=covered)
+
+
+def get_calendar(dzo_name: str = "") -> WorkCalendar:
+    """
+    Календарь по умолчанию (с учётом переопределений для ДЗО, если они есть).
+    """
+    return load_calendar(str(DEFAULT_CALENDAR_PATH), dzo_name or "")
+
+
+def end_date_by_workdays(start: date, duration_workdays: int) -> date:
+    return get_calendar().end_date_by_workdays(start, duration_workdays)
+
+
+def next_workday(d: date) -> date:
+    return get_calendar().next_workday(d)
+
+
+def workdays_between(start: date, end: date) -> int:
+    return get_calendar().workdays_between(start, end)
@@ -0,0 +1,213 @@
+"""
+Загрузка портфеля по рабочим дням: сколько проверок (ДЗО) и контролей каждой
+категории идут в каждый рабочий день.
+
+Интервалы задач не разворачиваются по дням: каждый даёт +1 в свой первый
+рабочий день и −1 в первый рабочий день после окончания (разностный массив по
+номерам рабочих дней производственного календаря), счётчики по дням —
+накопленная сумма. Задачи приходят столбцами planner.gantt.TimelineData.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from planner.catalog import CATEGORY_COLORS
+from planner.gantt import TimelineData
+from planner.workdays import get_calendar
+
+ALL_TASKS = "Все контроли"
+AUDITS = "Проверки (ДЗО)"
+WORKLOAD_METRICS = (ALL_TASKS, AUDITS, *CATEGORY_COLORS)
+
+WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+HEATMAP_COLORSCALE = "YlOrRd"
+HEATMAP_CELL_PX = 18
+
+
+@dataclass(frozen=True)
+class Workload:
+    """
+    Загрузка по рабочим дням периода: days — даты (datetime64[D]),
+    counts[категория, день] — число идущих контролей категории
+    (порядок CATEGORY_COLORS), audits[день] — число ДЗО, чья проверка идёт.
+    """
+    days: np.ndarray
+    counts: np.ndarray
+    audits: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def total(self) -> np.ndarray:
+        return self.counts.sum(axis=0)
+
+    def metric(self, name: str) -> np.ndarray:
+        """
+        Ряд по дням для показателя из WORKLOAD_METRICS.
+        """
+        if name == ALL_TASKS:
+            return self.total
+        if name == AUDITS:
+            return self.audits
+        return self.counts[list(CATEGORY_COLORS).index(name)]
+
+
+def interval_counts(group, first, stop, n_groups: int, n_days: int) -> np.ndarray:
+    """
+    Число интервалов [first; stop) каждой группы, покрывающих день 0..n_days-1
+    -> массив (n_groups, n_days). Разностный массив: bincount начал минус
+    bincount концов и накопленная сумма — O(интервалов + дней).
+    """
+    first = np.clip(first, 0, n_days)
+    stop = np.clip(stop, 0, n_days)
+    keep = first < stop
+    group = np.asarray(group, dtype=np.int64)[keep]
+    width = n_days + 1
+    size = n_groups * width
+    diff = (
+        np.bincount(group * width + first[keep], minlength=size)
+        - np.bincount(group * width + stop[keep], minlength=size)
+    )
+    return np.cumsum(diff.reshape(n_groups, width)[:, :n_days], axis=1).astype(np.int32)
+
+
+def _lane_spans(data: TimelineData) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Период проверки каждого ДЗО: от начала первой задачи до конца последней.
+    """
+    n = len(data.lanes)
+    start = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+    end = np.full(n, np.iinfo(np.int32).min, dtype=np.int32)
+    np.minimum.at(start, data.lane, data.start)
+    np.maximum.at(end, data.lane, data.end)
+    return start, end
+
+
+def workload(data: TimelineData, period: tuple | None = None, calendar=None) -> Workload:
+    """
+    Загрузка по рабочим дням period (по умолчанию — весь портфель) по общему
+    производственному календарю. Задача занимает рабочие дни с начала по
+    окончание включительно.
+    """
+    cal = calendar or get_calendar()
+    lo, hi = period or data.period
+    k0, k1 = cal.index(lo), cal.index(hi + timedelta(days=1))
+    n_days = k1 - k0
+    days = cal.workdays_at(np.arange(k0, k1))
+
+    def workday_range(start, end):
+        # [номер первого рабочего дня >= start; номер первого рабочего дня > end)
+        return (cal.indices(start.astype("datetime64[D]")) - k0,
+                cal.indices((end + 1).astype("datetime64[D]")) - k0)
+
+    first, stop = workday_range(data.start, data.end)
+    counts = interval_counts(data.category, first, stop, len(CATEGORY_COLORS), n_days)
+    if len(data.lanes):
+        first, stop = workday_range(*_lane_spans(data))
+        audits = interval_counts(np.zeros(len(first), dtype=np.int64), first, stop, 1, n_days)[0]
+    else:
+        audits = np.zeros(n_days, dtype=np.int32)
+    return Workload(days, counts, audits)
+
+
+def tasks_on(data: TimelineData, day: date) -> np.ndarray:
+    """
+    Индексы задач, идущих в день day.
+    """
+    d = int(np.datetime64(day, "D").astype(np.int64))
+    return np.flatnonzero((data.start <= d) & (data.end >= d))
+
+
+def day_frame(data: TimelineData, day: date):
+    """
+    Задачи, идущие в день day (DataFrame: ДЗО, задача, категория, начало, окончание).
+    """
+    import pandas as pd
+
+    idx = tasks_on(data, day)
+    return pd.DataFrame({
+        "ДЗО": np.asarray(data.lanes, dtype=object)[data.lane[idx]],
+        "Задача": np.asarray(data.names, dtype=object)[data.task[idx]],
+        "Категория": np.asarray(list(CATEGORY_COLORS), dtype=object)[data.category[idx]],
+        "Начало": data.start[idx].astype("datetime64[D]"),
+        "Окончание": data.end[idx].astype("datetime64[D]"),
+    })
+
+
+# --- КАЛЕНДАРЬ-ТЕПЛОВАЯ КАРТА ---
+
+def _weeks(days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Номер дня недели (0 — понедельник) и понедельник недели для каждого дня.
+    """
+    d = days.astype(np.int64)
+    weekday = (d + 3) % 7  # 1970-01-01 — четверг
+    return weekday, d - weekday
+
+
+def build_workload_heatmap(load: Workload, metric: str = ALL_TASKS):
+    """
+    Календарь-тепловая карта: столбец — неделя, строка — день недели, цвет —
+    показатель metric; нерабочие дни пустые. Во всплывающей подсказке —
+    проверки и контроли по категориям за день. Клик по клетке выбирает день
+    (x — понедельник недели, y — номер дня недели).
+    """
+    import plotly.graph_objects as go
+
+    weekday, monday = _weeks(load.days)
+    first = int(monday.min()) if len(load) else 0
+    n_weeks = (int(monday.max()) - first) // 7 + 1 if len(load) else 0
+    week = (monday - first) // 7
+
+    z = np.full((7, n_weeks), np.nan)
+    z[weekday, week] = load.metric(metric)
+    # Подсказка: дата, проверки, контроли по категориям
+    custom = np.full((7, n_weeks, 2 + len(CATEGORY_COLORS)), "", dtype=object)
+    custom[weekday, week, 0] = [d.strftime("%d.%m.%Y") for d in load.days.astype(date)]
+    custom[weekday, week, 1] = load.audits
+    for c in range(len(CATEGORY_COLORS)):
+        custom[weekday, week, 2 + c] = load.counts[c]
+    rows = [i for i in range(7) if not np.isnan(z[i]).all()] or list(range(5))
+
+    hover = "%{customdata[0]}<br>" + f"{AUDITS}: " + "%{customdata[1]}"
+    for c, cat in enumerate(CATEGORY_COLORS):
+        hover += f"<br>{cat}: %{{customdata[{2 + c}]}}"
+
+    fig = go.Figure(go.Heatmap(
+        z=z[rows],
+        x=(np.arange(n_weeks, dtype=np.int64) * 7 + first).astype("datetime64[D]"),
+        y=rows,
+        customdata=custom[rows],
+        colorscale=HEATMAP_COLORSCALE,
+        zmin=0,
+        xgap=2,
+        ygap=2,
+        hoverongaps=False,
+        hovertemplate=hover + "<extra></extra>",
+        colorbar=dict(title=None, thickness=12),
+    ))
+    fig.update_layout(
+        height=len(rows) * HEATMAP_CELL_PX * 2 + 100,
+        margin=dict(t=30, b=30),
+        xaxis=dict(type="date", tickformat="%m.%Y", dtick="M1", ticklabelmode="period", title=None),
+        yaxis=dict(
+            tickmode="array", tickvals=rows, ticktext=[WEEKDAYS[i] for i in rows],
+            autorange="reversed", title=None,
+        ),
+        title=dict(text=metric, font=dict(size=14)),
+    )
+    return fig
+
+
+def clicked_day(point: dict) -> date | None:
+    """
+    День по точке выбора на тепловой карте (st.plotly_chart on_select).
+    """
+    try:
+        monday = date.fromisoformat(str(point["x"])[:10])
+        return monday + timedelta(days=int(point["y"]))
+    except (KeyError, TypeError, ValueError):
+        return None